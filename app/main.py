@@ -1,25 +1,55 @@
-from fastapi import FastAPI, HTTPException
+import time
+_import_started = time.perf_counter()  # startup budget includes module imports
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi.responses import JSONResponse
 import asyncpg
 from services.response_formatter import ResponseFormatter
 from services.llm_service import LLMService
 from services.visualization_service import VisualizationService
 from data.mock_data import MockDataService
-from database.connection import create_tables
+from database.connection import create_tables_async, get_async_pool, close_async_pool
+from database.statements import statements
+from database.models import BusinessIntelligenceView
+from database.schema_registry import schema_registry
+from services.index_advisor import record_query, workload_log
+from services.result_encoder import to_columnar, json_response
+from services.kpi_cache import KPICache
+from services.table_stats import table_stats
+from services.startup import StartupState
+from services.columnar_engine import fetch_rows
+from services.disconnect_guard import disconnect_guard
 import uvicorn
 
 # ────────────────────────────
 # App & Service Initialisation
 # ────────────────────────────
-app = FastAPI(title="ANARIX AI Agent – Pure LLaMA System", version="4.0.0")
+startup = StartupState(started=_import_started)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing slow before yield - uvicorn accepts traffic immediately, setup runs in the background
+    kpi_cache.data_changed_callbacks.append(table_stats.invalidate)
+    startup.start([
+        ("create_tables", create_tables_async),                 # DDL in a worker thread (noop if tables exist)
+        ("schema_registry", schema_registry.ensure_loaded),    # prompt, validation, snapshot fingerprint
+        ("kpi_cache", kpi_cache.start),                        # /visualize KPIs (schedule + ingest NOTIFY)
+    ])
+    startup.mark_serving()
+    yield
+    await startup.stop()
+    await kpi_cache.stop()
+    await workload_log.flush()  # entries still buffered for the workload log
+    await close_async_pool()
+
+app = FastAPI(title="ANARIX AI Agent – Pure LLaMA System", version="4.0.0", lifespan=lifespan)
 
 formatter = ResponseFormatter()
 llm_service = LLMService()  # Pure LLaMA 3.1 service
 viz_service = VisualizationService()
 mock_data = MockDataService()
 
-# create tables (noop if they already exist)
-create_tables()
-
 # ────────────────────────────
 # Helper: async PG connection
 # ────────────────────────────
@@ -36,29 +66,52 @@ async def get_pg_connection():
         print("❌ PostgreSQL connection failed:", e)
         return None
 
+kpi_cache = KPICache(get_pg_connection, get_async_pool, viz_service, mock_data)
+
 # ────────────────────────────
 # Health-check
 # ────────────────────────────
 @app.get("/")
 async def health():
+    stats = await table_stats.get()
     return {
         "status": "ANARIX AI Agent - Pure LLaMA 3.1",
         "version": "4.0.0",
         "ai_model": "LLaMA 3.1 8B - Zero Patterns",
         "mode": "Pure AI Generation",
-        "endpoints": ["/query", "/visualize/total-sales", "/visualize/roas", "/visualize/highest-cpc"]
+        "endpoints": ["/query", "/visualize/total-sales", "/visualize/roas", "/visualize/highest-cpc", "/stats/statements", "/stats/cancellations", "/stats/ingest", "/ready"],
+        "tables": BusinessIntelligenceView.get_table_info(stats),
+        "table_stats": stats,
+        "schema_fingerprint": schema_registry.fingerprint,
+        "data_version": kpi_cache.data_version
     }
 
+# Readiness probe - 503 until background startup steps have finished, and while any of them failed
+@app.get("/ready")
+async def ready():
+    report = startup.report()
+    if not report["ready"]:
+        return JSONResponse(status_code=503, content=report)
+    return report
+
 # ────────────────────────────
 # PURE LLAMA 3.1 ENDPOINT - NO PATTERN MATCHING
 # ────────────────────────────
-@app.post("/query")
-async def pure_llama_query(request: dict):
+@app.post("/query", dependencies=[Depends(startup.wait_ready)])
+async def pure_llama_query(request: dict, http_request: Request):
     """
     Pure LLaMA 3.1 SQL generation - zero pattern matching
     LLaMA decides everything based on user question and PostgreSQL data
+    Send "format": "columnar" to receive multi-row results as {columns, types, values} arrays
+    Send "engine": "postgres" | "columnar" | "auto" to pick the executor (auto = DuckDB for large scans)
+    The LLaMA call and the SQL are cancelled if the client disconnects
     """
+    return await disconnect_guard.run(http_request, _pure_llama_query(request), "main:/query")
+
+async def _pure_llama_query(request: dict):
     question = request.get("question", "").strip()
+    columnar = request.get("format") == "columnar"
+    engine = request.get("engine", "auto")  # "postgres", "columnar" (DuckDB snapshots) or "auto"
     if not question:
         return {"success": False, "error": "Empty question"}
 
@@ -75,58 +128,60 @@ async def pure_llama_query(request: dict):
         return {"success": False, "error": "No SQL generated"}
 
     # 2. Execute whatever LLaMA generated - NO CLASSIFICATION
-    conn = await get_pg_connection()
-    if not conn:
+    pool = await get_async_pool()
+    if not pool:
         return {"success": False, "error": "Database connection failed"}
 
     try:
-        # Try different execution methods without pattern restrictions
-        result_data = None
-        query_type = "unknown"
-        
-        try:
-            # Try multi-row result first
-            results = await conn.fetch(sql)
-            if results:
-                result_data = [dict(row) for row in results]
-                query_type = "multi_row"
-                record_count = len(results)
-            else:
-                result_data = []
-                query_type = "empty_result"
-                record_count = 0
-        except:
+        async with pool.acquire() as conn:
+            # Try different execution methods without pattern restrictions
+            result_data = None
+            query_type = "unknown"
+            executed_on = "postgresql"
+            exec_start = time.perf_counter()
+
             try:
-                # Try single value
-                single_result = await conn.fetchval(sql)
-                result_data = single_result
-                query_type = "single_value"
-                record_count = 1 if single_result is not None else 0
-            except:
+                # Try multi-row result first (registered SQL runs prepared; large scans may go to DuckDB)
+                results, executed_on = await fetch_rows(conn, sql, engine)
+                if results:
+                    result_data = to_columnar(results) if columnar else [dict(row) for row in results]
+                    query_type = "multi_row"
+                    record_count = len(results)
+                else:
+                    result_data = []
+                    query_type = "empty_result"
+                    record_count = 0
+            except Exception:
                 try:
-                    # Try single row
-                    row = await conn.fetchrow(sql)
-                    if row:
-                        result_data = dict(row)
-                        query_type = "single_row"
-                        record_count = 1
-                    else:
-                        result_data = None
-                        query_type = "no_result"
-                        record_count = 0
-                except Exception as final_error:
-                    await conn.close()
-                    return {
-                        "success": False,
-                        "error": f"Query execution failed: {final_error}",
-                        "generated_sql": sql,
-                        "question": question
-                    }
-        
-        await conn.close()
-        
+                    # Try single value
+                    single_result = await conn.fetchval(sql)
+                    result_data = single_result
+                    query_type = "single_value"
+                    record_count = 1 if single_result is not None else 0
+                except Exception:
+                    try:
+                        # Try single row
+                        row = await conn.fetchrow(sql)
+                        if row:
+                            result_data = dict(row)
+                            query_type = "single_row"
+                            record_count = 1
+                        else:
+                            result_data = None
+                            query_type = "no_result"
+                            record_count = 0
+                    except Exception as final_error:
+                        return {
+                            "success": False,
+                            "error": f"Query execution failed: {final_error}",
+                            "generated_sql": sql,
+                            "question": question
+                        }
+
+        record_query(sql, (time.perf_counter() - exec_start) * 1000, source="main")
+
         # 3. Return pure results without pattern-based formatting
-        return {
+        response = {
             "success": True,
             "question": question,
             "result": result_data,
@@ -134,12 +189,15 @@ async def pure_llama_query(request: dict):
             "record_count": record_count,
             "ai_model": "🤖 LLaMA 3.1 8B (Pure Generation)",
             "generated_sql": sql,
-            "processing_mode": "zero_patterns"
+            "processing_mode": "zero_patterns",
+            "engine": executed_on
         }
-        
+        if columnar:
+            response["result_format"] = "columnar" if query_type == "multi_row" else "raw"
+            return json_response(response)
+        return response
+
     except Exception as e:
-        if conn:
-            await conn.close()
         return {
             "success": False,
             "error": f"Database error: {e}",
@@ -147,63 +205,38 @@ async def pure_llama_query(request: dict):
             "question": question
         }
 
+# Per-statement execution counts and latencies of the prepared-statement registry
+@app.get("/stats/statements")
+async def statement_stats():
+    return statements.stats()
+
+# Requests cancelled because the client went away (LLaMA call / SQL aborted)
+@app.get("/stats/cancellations")
+async def cancellation_stats():
+    return disconnect_guard.stats()
+
+# Last auto-ingest of the watch-folder daemon (python -m database.watcher): time, duration, row counts
+@app.get("/stats/ingest")
+async def ingest_stats():
+    from database.watcher import read_status  # imports the ingest pipeline (pandas) - not needed at startup
+    return read_status() or {"state": "not running"}
+
 # ────────────────────────────
 # VISUALISATION ENDPOINTS
 # ────────────────────────────
-@app.get("/visualize/total-sales")
+# Served from the background-refreshed KPI cache (services/kpi_cache.py);
+# stale entries are returned immediately while a refresh runs in the background
+@app.get("/visualize/total-sales", dependencies=[Depends(startup.wait_ready)])
 async def visualize_sales():
-    conn = await get_pg_connection()
-    if not conn:
-        data, source = mock_data.get_total_sales(), "Mock"
-    else:
-        total = await conn.fetchval("SELECT SUM(total_sales) FROM total_sales")
-        await conn.close()
-        data, source = [{"total_sales": float(total) if total else 0}], "PostgreSQL"
-
-    chart = viz_service.generate_chart("total sales", data, "Total Sales Overview")
-    return {"data_source": source, "data": data, "visualization": chart}
-
-@app.get("/visualize/roas")
-async def visualize_roas():
-    conn = await get_pg_connection()
-    if not conn:
-        data, source = mock_data.get_roas(), "Mock"
-    else:
-        row = await conn.fetchrow(
-            "SELECT AVG(ad_sales/NULLIF(ad_spend,0)) AS avg_roas, "
-            "SUM(ad_sales) AS sales, SUM(ad_spend) AS spend "
-            "FROM ad_sales WHERE ad_spend > 0"
-        )
-        await conn.close()
-        data, source = [{
-            "avg_roas": float(row["avg_roas"]) if row["avg_roas"] else 0,
-            "total_sales": float(row["sales"]) if row["sales"] else 0,
-            "total_ad_spend": float(row["spend"]) if row["spend"] else 0
-        }], "PostgreSQL"
+    return await kpi_cache.get("total_sales")
 
-    chart = viz_service.generate_chart("roas", data, "Return on Ad Spend")
-    return {"data_source": source, "data": data, "visualization": chart}
+@app.get("/visualize/roas", dependencies=[Depends(startup.wait_ready)])
+async def visualize_roas():
+    return await kpi_cache.get("roas")
 
-@app.get("/visualize/highest-cpc")
+@app.get("/visualize/highest-cpc", dependencies=[Depends(startup.wait_ready)])
 async def visualize_cpc():
-    conn = await get_pg_connection()
-    if not conn:
-        data, source = mock_data.get_highest_cpc_product(), "Mock"
-    else:
-        rows = await conn.fetch(
-            "SELECT item_id, MAX(ad_spend/NULLIF(clicks,0)) AS max_cpc, "
-            "AVG(ad_spend/NULLIF(clicks,0)) AS avg_cpc, COUNT(*) AS campaigns "
-            "FROM ad_sales WHERE clicks > 0 "
-            "GROUP BY item_id ORDER BY max_cpc DESC LIMIT 5"
-        )
-        await conn.close()
-        data = [{"product_name": r["item_id"], "highest_cpc": float(r["max_cpc"]),
-                 "avg_cpc": float(r["avg_cpc"]), "campaign_count": r["campaigns"]}
-                for r in rows]
-        source = "PostgreSQL"
-
-    chart = viz_service.generate_chart("cpc", data, "Products by Cost Per Click")
-    return {"data_source": source, "data": data, "visualization": chart}
+    return await kpi_cache.get("highest_cpc")
 
 # ────────────────────────────
 # Entry point
@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, Form
 from fastapi.responses import HTMLResponse, StreamingResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
@@ -5,65 +6,57 @@ from fastapi.staticfiles import StaticFiles
 import asyncio
 import json
 import time
-import plotly.express as px
-import plotly.graph_objects as go
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import base64
-import io
+import os
 import re
 from services.llm_service import LLMService
 from services.visualization_service import VisualizationService
-from database.connection import get_async_connection
+from database.connection import get_async_connection, get_async_pool, close_async_pool
+from database.statements import (
+    statements, CPC_TOP, CPC_UNDER, ROAS_TOP, ROI_TOP, TOTAL_SALES_TOP, AD_SALES_TOP,
+    PRODUCTS_TOP, DEFAULT_TOP, SAFE_CPC, SAFE_SALES, SAFE_DEFAULT
+)
+from services.index_advisor import record_query, workload_log
+from services.result_encoder import to_columnar, json_response
+from services.table_stats import table_stats
+from services.columnar_engine import columnar_engine, fetch_rows
+from services.data_listener import DataChangeListener
+from services.disconnect_guard import disconnect_guard
+from services.chart_renderer import chart_renderer, chart_spec
+from database.schema_registry import schema_registry, ALIASES
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Introspect the queryable schema once (prompt, validation, cache keys)
+    await schema_registry.ensure_loaded()
+    # Chart worker processes start and import matplotlib/plotly in the background
+    warmup = asyncio.create_task(chart_renderer.start())
+    # Ingest NOTIFY: drop cached table stats and re-read the columnar snapshots
+    await data_listener.start()
+    yield
+    warmup.cancel()
+    await data_listener.stop()
+    await chart_renderer.stop()
+    await workload_log.flush()  # entries still buffered for the workload log
+    await close_async_pool()
 
 app = FastAPI(
     title="ANARIX AI Agent - Enhanced BI Platform",
     description="Natural Language to SQL with Advanced Visualizations and Streaming",
-    version="3.0.0"
+    version="3.0.0",
+    lifespan=lifespan
 )
 
 # Mount static files and templates
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
+# ANARIX_PNG_FALLBACK=off skips the matplotlib PNG fallback entirely
+PNG_FALLBACK_ENABLED = os.getenv("ANARIX_PNG_FALLBACK", "on").lower() != "off"
+
 # Initialize services
 llm_service = LLMService()
 viz_service = VisualizationService()
-
-# COMPLETE DATABASE SCHEMA - Your actual table structure
-COMPLETE_SCHEMA = {
-    "ad_sales": {
-        "alias": "a",
-        "columns": {
-            "item_id": "TEXT",
-            "date": "DATE", 
-            "ad_sales": "DECIMAL",
-            "impressions": "INTEGER",
-            "ad_spend": "DECIMAL",
-            "clicks": "INTEGER",
-            "units_sold": "INTEGER"
-        }
-    },
-    "total_sales": {
-        "alias": "t",
-        "columns": {
-            "item_id": "TEXT",
-            "date": "DATE",
-            "total_sales": "DECIMAL", 
-            "total_units_ordered": "INTEGER"
-        }
-    },
-    "eligibility": {
-        "alias": "e",
-        "columns": {
-            "item_id": "TEXT",
-            "eligibility_datetime_utc": "TIMESTAMP",
-            "eligibility": "TEXT",
-            "message": "TEXT"
-        }
-    }
-}
+data_listener = DataChangeListener(get_async_connection, [table_stats.invalidate, columnar_engine.invalidate])
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
@@ -71,9 +64,16 @@ async def home(request: Request):
     return templates.TemplateResponse("query_interface.html", {"request": request})
 
 @app.post("/query", response_class=JSONResponse) 
-async def process_query(question: str = Form(...)):
-    """Enhanced query processing with complete SQL validation and guaranteed visualization"""
-    
+async def process_query(request: Request, question: str = Form(...), format: str = Form("rows"), engine: str = Form("auto")):
+    """
+    Enhanced query processing with complete SQL validation and guaranteed visualization
+    format="columnar" returns data as {columns, types, values} arrays instead of a list of dicts
+    engine="postgres" | "columnar" | "auto" picks the executor (auto = DuckDB snapshots for large scans)
+    LLM call, SQL and chart rendering are skipped/cancelled once the client disconnects
+    """
+    return await disconnect_guard.run(request, _process_query(request, question, format, engine), "query_interface:/query")
+
+async def _process_query(request, question, format, engine):
     start_time = time.time()
     
     try:
@@ -87,57 +87,70 @@ async def process_query(question: str = Form(...)):
             print(f"⚠️ LLM service failed: {llm_error}")
             generated_sql = None
         
-        # 2. If LLM fails or generates invalid SQL, use business logic SQL generation
+        # 2. If LLM fails or generates invalid SQL, use a registered business statement
+        statement, params = None, ()
         if not generated_sql or not is_valid_sql_structure(generated_sql):
             print("🔧 Using business logic SQL generation")
-            generated_sql = generate_business_sql(question)
-            print(f"📝 Business Logic SQL: {generated_sql}")
-        
-        # 3. Validate and fix the SQL
-        validated_sql = validate_sql_completely(generated_sql)
-        print(f"✅ Final validated SQL: {validated_sql}")
+            statement, params = generate_business_sql(question)
+            validated_sql = statements.render(statement, params)
+            print(f"📝 Business Logic SQL ({statement}): {validated_sql}")
+        else:
+            # 3. Validate and fix the SQL
+            validated_sql = validate_sql_completely(generated_sql)
+            print(f"✅ Final validated SQL: {validated_sql}")
         
         # 4. Execute the validated SQL
-        conn = await get_async_connection()
-        if not conn:
+        pool = await get_async_pool()
+        if not pool:
             return {"error": "Database connection failed", "success": False}
         
-        try:
-            records = await conn.fetch(validated_sql)
-            data = [dict(record) for record in records]
-            columns = list(records[0].keys()) if records else []
-            print(f"📊 Query successful: {len(data)} records found")
-            
-        except Exception as db_error:
-            print(f"❌ Database error with validated SQL: {db_error}")
-            # Last resort: generate completely safe SQL
-            safe_sql = generate_safe_fallback_sql(question)
-            print(f"🚨 Using safe fallback SQL: {safe_sql}")
-            
+        async with pool.acquire() as conn:
             try:
-                records = await conn.fetch(safe_sql)
+                exec_start = time.perf_counter()
+                executed_on = "postgresql"
+                if statement:
+                    records = await statements.fetch(conn, statement, *params)
+                else:
+                    records, executed_on = await fetch_rows(conn, validated_sql, engine)
+                record_query(validated_sql, (time.perf_counter() - exec_start) * 1000, source="query_interface")
                 data = [dict(record) for record in records]
                 columns = list(records[0].keys()) if records else []
-                validated_sql = safe_sql
-                print(f"✅ Safe SQL successful: {len(data)} records")
-            except Exception as final_error:
-                await conn.close()
-                return {"error": f"All SQL attempts failed. Final error: {str(final_error)}", "success": False}
-        
-        await conn.close()
+                print(f"📊 Query successful: {len(data)} records found")
+                
+            except Exception as db_error:
+                print(f"❌ Database error with validated SQL: {db_error}")
+                # Last resort: run a completely safe statement
+                statement, params = generate_safe_fallback_sql(question)
+                safe_sql = statements.render(statement, params)
+                print(f"🚨 Using safe fallback SQL: {safe_sql}")
+                
+                try:
+                    exec_start = time.perf_counter()
+                    records = await statements.fetch(conn, statement, *params)
+                    record_query(safe_sql, (time.perf_counter() - exec_start) * 1000, source="query_interface")
+                    data = [dict(record) for record in records]
+                    columns = list(records[0].keys()) if records else []
+                    validated_sql = safe_sql
+                    executed_on = "postgresql"
+                    print(f"✅ Safe SQL successful: {len(data)} records")
+                except Exception as final_error:
+                    return {"error": f"All SQL attempts failed. Final error: {str(final_error)}", "success": False}
+        
+        # Client gone? Skip explanation, charts and insights
+        await disconnect_guard.checkpoint(request)
         
         # 5. Generate explanation
         explanation = generate_enhanced_sql_explanation(validated_sql, question, columns, data)
         
         # 6. Create guaranteed visualization
-        visualization = create_guaranteed_visualization(data, question, columns)
+        visualization = await create_guaranteed_visualization(data, question, columns)
         
         # 7. Generate business insights
         insights = generate_business_insights(data, question)
         
         processing_time = time.time() - start_time
         
-        return {
+        response = {
             "success": True,
             "question": question,
             "generated_sql": validated_sql,
@@ -148,9 +161,17 @@ async def process_query(question: str = Form(...)):
             "visualization": visualization,
             "insights": insights,
             "processing_time": f"{processing_time:.2f}s",
-            "has_visualization": True
+            "has_visualization": True,
+            "engine": executed_on
         }
         
+        if format == "columnar":
+            response["data"] = to_columnar(records, columns)
+            response["data_format"] = "columnar"
+            return json_response(response)
+        
+        return response
+        
     except Exception as e:
         print(f"❌ Complete query processing failed: {e}")
         import traceback
@@ -192,65 +213,32 @@ def validate_sql_completely(sql):
         return "SELECT a.item_id, a.ad_sales, a.ad_spend FROM ad_sales a LIMIT 10"
 
 def fix_table_references(sql):
-    """Fix table references and ensure proper aliases"""
+    """Fix table references and ensure proper aliases (aliases from the schema registry)"""
     
-    # Ensure ad_sales has alias 'a'
-    if 'FROM ad_sales' in sql and ' a ' not in sql:
-        sql = sql.replace('FROM ad_sales', 'FROM ad_sales a')
-    
-    # Ensure total_sales has alias 't'  
-    if 'total_sales' in sql and ' t ' not in sql:
-        sql = sql.replace('JOIN total_sales', 'JOIN total_sales t')
-        sql = sql.replace('FROM total_sales', 'FROM total_sales t')
-    
-    # Ensure eligibility has alias 'e'
-    if 'eligibility' in sql and ' e ' not in sql:
-        sql = sql.replace('JOIN eligibility', 'JOIN eligibility e')
-        sql = sql.replace('FROM eligibility', 'FROM eligibility e')
+    for table, alias in ALIASES.items():
+        if table in sql and f' {alias} ' not in sql:
+            # \b: eligibility must not match the start of eligibility_messages
+            sql = re.sub(rf'\b(JOIN|FROM) {table}\b', rf'\1 {table} {alias}', sql)
     
     return sql
 
 def fix_column_references(sql):
-    """Fix column references based on actual schema"""
+    """Fix column references based on the introspected schema"""
     
-    # Define column mappings - which columns belong to which tables
-    column_mappings = {
-        # ad_sales columns (alias 'a')
-        'impressions': 'a.impressions',
-        'ad_sales': 'a.ad_sales', 
-        'ad_spend': 'a.ad_spend',
-        'clicks': 'a.clicks',
-        'units_sold': 'a.units_sold',
-        
-        # total_sales columns (alias 't')
-        'total_sales': 't.total_sales',
-        'total_units_ordered': 't.total_units_ordered',
-        
-        # eligibility columns (alias 'e') 
-        'eligibility': 'e.eligibility',
-        'message': 'e.message',
-        'eligibility_datetime_utc': 'e.eligibility_datetime_utc',
-        
-        # Common columns (prefer ad_sales alias)
-        'item_id': 'a.item_id',
-        'date': 'a.date'
-    }
+    # Which alias each column belongs to - shared columns (item_id, date) prefer ad_sales
+    column_mappings = schema_registry.column_owners()
+    aliases = list(ALIASES.values())
     
     # Fix incorrect column references
     for column, correct_ref in column_mappings.items():
-        # Fix wrong alias references
-        wrong_patterns = [
-            f't.{column}' if not correct_ref.startswith('t.') else None,
-            f'e.{column}' if not correct_ref.startswith('e.') else None,
-            f'a.{column}' if not correct_ref.startswith('a.') else None,
-            f'i.{column}'  # Fix the 'i' alias that doesn't exist
-        ]
+        # Fix wrong alias references, including the 'i' alias that doesn't exist
+        wrong_patterns = [f'{alias}.{column}' for alias in aliases + ['i']]
         
         for wrong_pattern in wrong_patterns:
-            if wrong_pattern and wrong_pattern in sql:
-                # Only replace if it's not the correct reference
-                if wrong_pattern != correct_ref:
-                    sql = sql.replace(wrong_pattern, correct_ref)
+            if wrong_pattern in sql and wrong_pattern != correct_ref:
+                fixed = re.sub(rf'\b{re.escape(wrong_pattern)}\b', correct_ref, sql)  # e.message_id is not e.message
+                if fixed != sql:
+                    sql = fixed
                     print(f"🔧 Fixed {wrong_pattern} → {correct_ref}")
     
     return sql
@@ -269,174 +257,63 @@ def fix_sql_syntax(sql):
     return sql.strip()
 
 def generate_business_sql(question):
-    """Generate SQL based on business intelligence patterns"""
+    """
+    Pick a registered business-intelligence statement for the question
+    Returns (statement name, parameters) - thresholds and limits are bound, not interpolated
+    """
     
     question_lower = question.lower()
     
     # CPC (Cost Per Click) queries
     if any(term in question_lower for term in ['cpc', 'cost per click']):
         if any(term in question_lower for term in ['highest', 'maximum', 'top']):
-            return """
-            SELECT 
-                a.item_id,
-                a.ad_spend,
-                a.clicks,
-                ROUND((a.ad_spend / NULLIF(a.clicks, 0))::numeric, 2) as cpc
-            FROM ad_sales a
-            WHERE a.clicks > 0 
-            ORDER BY (a.ad_spend / NULLIF(a.clicks, 0)) DESC 
-            LIMIT 1
-            """
+            return CPC_TOP, (1,)
         elif any(term in question_lower for term in ['under', 'below', 'less than']):
             # Extract threshold value
             threshold = 2.0
-            import re
             match = re.search(r'\$?(\d+(?:\.\d+)?)', question)
             if match:
                 threshold = float(match.group(1))
-            
-            return f"""
-            SELECT 
-                a.item_id,
-                a.ad_spend,
-                a.clicks,
-                ROUND((a.ad_spend / NULLIF(a.clicks, 0))::numeric, 2) as cpc
-            FROM ad_sales a
-            WHERE a.clicks > 0 
-            AND (a.ad_spend / NULLIF(a.clicks, 0)) < {threshold}
-            ORDER BY (a.ad_spend / NULLIF(a.clicks, 0)) ASC
-            LIMIT 15
-            """
+            return CPC_UNDER, (threshold, 15)
         else:
-            return """
-            SELECT 
-                a.item_id,
-                a.ad_spend,
-                a.clicks,
-                ROUND((a.ad_spend / NULLIF(a.clicks, 0))::numeric, 2) as cpc
-            FROM ad_sales a
-            WHERE a.clicks > 0 
-            ORDER BY (a.ad_spend / NULLIF(a.clicks, 0)) DESC 
-            LIMIT 10
-            """
+            return CPC_TOP, (10,)
     
     # ROAS (Return on Ad Spend) queries
     elif any(term in question_lower for term in ['roas', 'return on ad spend']):
-        return """
-        SELECT 
-            a.item_id,
-            a.ad_sales,
-            a.ad_spend,
-            ROUND((a.ad_sales / NULLIF(a.ad_spend, 0))::numeric, 2) as roas
-        FROM ad_sales a
-        WHERE a.ad_spend > 0 
-        ORDER BY (a.ad_sales / NULLIF(a.ad_spend, 0)) DESC
-        LIMIT 15
-        """
+        return ROAS_TOP, (15,)
     
     # ROI queries
     elif any(term in question_lower for term in ['roi', 'return on investment']):
-        return """
-        SELECT 
-            a.item_id,
-            t.total_sales,
-            a.ad_spend,
-            ROUND(((t.total_sales - a.ad_spend) / NULLIF(a.ad_spend, 0) * 100)::numeric, 2) as roi_percentage
-        FROM ad_sales a
-        LEFT JOIN total_sales t ON a.item_id = t.item_id
-        WHERE a.ad_spend > 0 AND t.total_sales IS NOT NULL
-        ORDER BY ((t.total_sales - a.ad_spend) / NULLIF(a.ad_spend, 0) * 100) DESC
-        LIMIT 10
-        """
+        return ROI_TOP, (10,)
     
     # Revenue/Sales queries
     elif any(term in question_lower for term in ['revenue', 'sales']):
         if 'total' in question_lower:
-            return """
-            SELECT 
-                t.item_id,
-                t.total_sales,
-                t.total_units_ordered
-            FROM total_sales t
-            ORDER BY t.total_sales DESC
-            LIMIT 15
-            """
+            return TOTAL_SALES_TOP, (15,)
         else:
-            return """
-            SELECT 
-                a.item_id,
-                a.ad_sales,
-                a.impressions,
-                a.clicks,
-                a.units_sold
-            FROM ad_sales a
-            ORDER BY a.ad_sales DESC
-            LIMIT 15
-            """
+            return AD_SALES_TOP, (15,)
     
     # Products/Items queries
     elif any(term in question_lower for term in ['products', 'items', 'show me']):
-        return """
-        SELECT 
-            a.item_id,
-            a.ad_sales,
-            a.ad_spend,
-            a.impressions,
-            a.clicks
-        FROM ad_sales a
-        ORDER BY a.ad_sales DESC
-        LIMIT 20
-        """
+        return PRODUCTS_TOP, (20,)
     
     # Default safe query
     else:
-        return """
-        SELECT 
-            a.item_id,
-            a.ad_sales,
-            a.ad_spend,
-            a.clicks
-        FROM ad_sales a
-        ORDER BY a.ad_sales DESC
-        LIMIT 10
-        """
+        return DEFAULT_TOP, (10,)
 
 def generate_safe_fallback_sql(question):
-    """Generate completely safe SQL as absolute fallback"""
+    """Pick a completely safe registered statement as absolute fallback - (name, parameters)"""
     
     question_lower = question.lower()
     
     if 'cpc' in question_lower:
-        return """
-        SELECT 
-            a.item_id,
-            a.ad_spend,
-            a.clicks
-        FROM ad_sales a
-        WHERE a.clicks > 0
-        ORDER BY a.ad_spend DESC
-        LIMIT 5
-        """
+        return SAFE_CPC, (5,)
     elif 'sales' in question_lower or 'revenue' in question_lower:
-        return """
-        SELECT 
-            a.item_id,
-            a.ad_sales
-        FROM ad_sales a
-        ORDER BY a.ad_sales DESC
-        LIMIT 10
-        """
+        return SAFE_SALES, (10,)
     else:
-        return """
-        SELECT 
-            a.item_id,
-            a.ad_sales,
-            a.ad_spend
-        FROM ad_sales a
-        LIMIT 10
-        """
+        return SAFE_DEFAULT, (10,)
 
-def create_guaranteed_visualization(data, question, columns):
+async def create_guaranteed_visualization(data, question, columns):
     """Create visualization with absolute guarantee of success"""
     
     if not data or len(data) == 0:
@@ -450,139 +327,63 @@ def create_guaranteed_visualization(data, question, columns):
     
     try:
         # Try Plotly first
-        plotly_result = create_plotly_chart(data, question, columns)
+        plotly_result = await create_plotly_chart(data, question, columns)
         if plotly_result['success']:
             return plotly_result
     except:
         pass
     
-    try:
-        # Try Matplotlib as fallback
-        matplotlib_result = create_matplotlib_chart(data, question, columns)
-        if matplotlib_result['success']:
-            return matplotlib_result
-    except:
-        pass
+    if PNG_FALLBACK_ENABLED:
+        try:
+            # Try Matplotlib as fallback
+            matplotlib_result = await create_matplotlib_chart(data, question, columns)
+            if matplotlib_result['success']:
+                return matplotlib_result
+        except:
+            pass
     
     # Guaranteed text-based visualization
     return create_text_chart(data, question, columns)
 
-def create_plotly_chart(data, question, columns):
-    """Create Plotly chart"""
+async def create_plotly_chart(data, question, columns):
+    """Create Plotly chart - figure JSON built in the chart worker pool (services/chart_renderer.py)"""
     try:
-        df = pd.DataFrame(data)
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-        
-        if not numeric_cols:
-            # Create simple data count chart
-            fig = go.Figure(data=go.Bar(
-                x=['Records Found'],
-                y=[len(data)],
-                marker_color='#007bff',
-                text=[str(len(data))],
-                textposition='outside'
-            ))
-            
-            fig.update_layout(
-                title='Query Results Summary',
-                template='plotly_white',
-                height=400
-            )
-        else:
-            # Create chart with numeric data
-            x_col = 'item_id' if 'item_id' in df.columns else df.columns[0]
-            y_col = numeric_cols[0]
-            
-            # Use first 15 records
-            df_chart = df.head(15)
-            
-            fig = go.Figure(data=go.Bar(
-                x=df_chart[x_col].astype(str),
-                y=df_chart[y_col],
-                marker_color='#1f77b4',
-                text=[f'{val:.2f}' for val in df_chart[y_col]],
-                textposition='outside'
-            ))
-            
-            fig.update_layout(
-                title=f'{y_col.replace("_", " ").title()} Analysis',
-                xaxis_title=x_col.replace("_", " ").title(),
-                yaxis_title=y_col.replace("_", " ").title(),
-                template='plotly_white',
-                height=500,
-                xaxis_tickangle=45
-            )
+        rendered = await chart_renderer.render(chart_spec(data, "plotly"))
         
         return {
             "success": True,
             "chart_type": "plotly_bar",
-            "chart_json": fig.to_json(),
+            "chart_json": rendered["payload"],
             "title": f"Business Analysis Results",
-            "data_summary": {"total_records": len(df), "data_quality": "Good"},
+            "data_summary": {"total_records": len(data), "data_quality": "Good"},
             "recommendations": [
-                f"Successfully analyzed {len(df)} records",
+                f"Successfully analyzed {len(data)} records",
                 "Chart shows key business metrics for decision making"
-            ]
+            ],
+            "render_ms": rendered["render_ms"],
+            "chart_cached": rendered["cached"]
         }
         
     except Exception as e:
         return {"success": False, "reason": f"Plotly error: {str(e)}"}
 
-def create_matplotlib_chart(data, question, columns):
-    """Create Matplotlib chart as fallback"""
+async def create_matplotlib_chart(data, question, columns):
+    """Create Matplotlib PNG as fallback - rendered in the chart worker pool, never with pyplot in the API process"""
     try:
-        import matplotlib
-        matplotlib.use('Agg')
-        
-        df = pd.DataFrame(data)
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-        
-        plt.figure(figsize=(10, 6))
-        plt.clf()
-        
-        if numeric_cols:
-            y_col = numeric_cols[0]
-            x_col = 'item_id' if 'item_id' in df.columns else df.columns[0]
-            
-            df_chart = df.head(10)
-            
-            bars = plt.bar(range(len(df_chart)), df_chart[y_col], color='steelblue', alpha=0.8)
-            plt.title(f'{y_col.replace("_", " ").title()} Analysis', fontsize=14, fontweight='bold')
-            plt.xlabel(x_col.replace("_", " ").title())
-            plt.ylabel(y_col.replace("_", " ").title())
-            plt.xticks(range(len(df_chart)), df_chart[x_col].astype(str), rotation=45)
-            
-            # Add value labels
-            for i, bar in enumerate(bars):
-                height = bar.get_height()
-                plt.text(bar.get_x() + bar.get_width()/2., height,
-                        f'{height:.1f}', ha='center', va='bottom')
-        else:
-            # Simple count chart
-            plt.bar(['Data Records'], [len(data)], color='green')
-            plt.title('Query Results Summary')
-            plt.ylabel('Record Count')
-        
-        plt.grid(axis='y', alpha=0.3)
-        plt.tight_layout()
-        
-        # Convert to base64
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode()
-        plt.close()
+        rendered = await chart_renderer.render(chart_spec(data, "matplotlib", "png"))
         
         return {
             "success": True,
             "chart_type": "matplotlib_bar",
-            "chart_base64": image_base64,
+            "chart_base64": rendered["payload"],
             "title": "Business Analysis Chart",
-            "data_summary": {"total_records": len(df), "data_quality": "Good"},
+            "data_summary": {"total_records": len(data), "data_quality": "Good"},
             "recommendations": [
-                f"Chart displays analysis of {len(df)} business records",
+                f"Chart displays analysis of {len(data)} business records",
                 "Use insights for strategic decision making"
-            ]
+            ],
+            "render_ms": rendered["render_ms"],
+            "chart_cached": rendered["cached"]
         }
         
     except Exception as e:
@@ -591,6 +392,8 @@ def create_matplotlib_chart(data, question, columns):
 def create_text_chart(data, question, columns):
     """Create guaranteed text-based chart"""
     try:
+        import pandas as pd
+        
         df = pd.DataFrame(data)
         
         text_chart = "📊 BUSINESS INTELLIGENCE ANALYSIS\n"
@@ -669,6 +472,8 @@ def generate_business_insights(data: list, question: str) -> dict:
     }
     
     try:
+        import pandas as pd
+        
         df = pd.DataFrame(data)
         numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
         
@@ -698,11 +503,17 @@ def generate_business_insights(data: list, question: str) -> dict:
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
+    stats = await table_stats.get()
     return {
         "status": "healthy",
         "service": "ANARIX AI Agent", 
         "version": "3.0.0",
-        "features": ["complete_sql_validation", "schema_aware", "guaranteed_visualization"]
+        "features": ["complete_sql_validation", "schema_aware", "guaranteed_visualization"],
+        "table_stats": stats,
+        "schema_fingerprint": schema_registry.fingerprint,
+        "cancellations": disconnect_guard.stats(),
+        "charts": chart_renderer.stats(),
+        "data_version": data_listener.data_version
     }
 
 if __name__ == "__main__":
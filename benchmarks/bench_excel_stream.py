@@ -0,0 +1,77 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the parent directory to the path to import from database
+sys.path.append(str(Path(__file__).parent.parent))
+
+
+def make_workbook(path, rows, seed=42):
+    """Synthetic ad_sales workbook (data.synthetic_data, openpyxl write-only mode)"""
+    from data.synthetic_data import SyntheticDataGenerator
+
+    SyntheticDataGenerator(rows, seed=seed).write_xlsx("ad_sales", path)
+
+
+def run_mode(mode, path, batch_rows):
+    """Child process: read + prepare COPY records the given way, report rows, seconds and peak RSS"""
+    import pandas as pd
+    from database.bulk_loader import clean_column_names, prepare_records
+    from database.excel_stream import iter_workbook_batches
+
+    start = time.perf_counter()
+    rows = 0
+    if mode == "whole":
+        # The pre-streaming path: whole workbook, then a None-filled copy of it
+        df = clean_column_names(pd.read_excel(path))
+        df = df.where(pd.notnull(df), None)
+        records, _, _ = prepare_records("ad_sales", df)
+        rows = len(records)
+    else:
+        for batch in iter_workbook_batches(path, batch_rows):
+            records, _, _ = prepare_records("ad_sales", batch)
+            rows += len(records)
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    print(json.dumps({"rows": rows, "seconds": time.perf_counter() - start, "peak_mb": peak_mb}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory: pd.read_excel vs streaming workbook reader")
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--batch-rows", type=int, default=50000)
+    parser.add_argument("--path", default=None, help="workbook to use/create (default: temp dir, reused)")
+    parser.add_argument("--modes", nargs="+", default=["stream", "whole"], choices=["stream", "whole"])
+    parser.add_argument("--child", choices=["stream", "whole"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    path = args.path or os.path.join(tempfile.gettempdir(), f"anarix_synthetic_ad_sales_{args.rows}_v3.xlsx")
+    if args.child:
+        run_mode(args.child, path, args.batch_rows)
+        return
+
+    if not os.path.exists(path):
+        print(f"🛠️ Writing {args.rows:,}-row workbook to {path}...")
+        start = time.perf_counter()
+        make_workbook(path, args.rows)
+        print(f"   done in {time.perf_counter() - start:.1f}s")
+    print(f"📄 Workbook: {os.path.getsize(path) / 1024 / 1024:.1f} MB, {args.rows:,} rows")
+
+    print("\n🌊 EXCEL READER MEMORY BENCHMARK")
+    print("=" * 60)
+    for mode in args.modes:
+        output = subprocess.run(
+            [sys.executable, __file__, "--child", mode, "--path", path, "--batch-rows", str(args.batch_rows)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:<8} | {result['rows']:>10,} rows | {result['seconds']:>7.1f}s | peak RSS {result['peak_mb']:>8.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
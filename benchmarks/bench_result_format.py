@@ -0,0 +1,77 @@
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+# Add the parent directory to the path to import from services
+sys.path.append(str(Path(__file__).parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+from services.result_encoder import dumps, to_columnar, orjson
+
+
+def make_records(count, seed=42):
+    """Rows shaped like a typical ad_sales /query result"""
+    rng = random.Random(seed)
+    start = date(2025, 6, 1)
+    return [
+        {
+            "item_id": str(rng.randint(0, 500)),
+            "date": start + timedelta(days=rng.randint(0, 90)),
+            "ad_sales": Decimal(f"{rng.uniform(0, 2000):.2f}"),
+            "impressions": rng.randint(0, 50000),
+            "ad_spend": Decimal(f"{rng.uniform(0, 300):.2f}"),
+            "clicks": rng.randint(0, 800),
+            "units_sold": rng.randint(0, 40),
+            "roas": Decimal(f"{rng.uniform(0, 20):.2f}"),
+        }
+        for _ in range(count)
+    ]
+
+
+def encode_rows(records):
+    """What FastAPI does for a returned dict: jsonable_encoder + json.dumps"""
+    payload = {"success": True, "data": records}
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_columnar(records):
+    payload = {"success": True, "data": to_columnar(records), "data_format": "columnar"}
+    return dumps(payload)
+
+
+def measure(fn, records, repeat):
+    best = float("inf")
+    body = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn(records)
+        best = min(best, time.perf_counter() - start)
+    return len(body), best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare /query row vs columnar payloads")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print("📦 /query RESULT FORMAT BENCHMARK")
+    print(f"   encoder: {'orjson' if orjson else 'stdlib json (install orjson for the fast path)'}")
+    print("=" * 78)
+    print(f"{'rows':>8} | {'rows bytes':>12} {'rows ms':>9} | {'columnar bytes':>14} {'columnar ms':>11} | {'size':>5} {'speed':>6}")
+    print("-" * 78)
+    for count in args.rows:
+        records = make_records(count)
+        row_size, row_time = measure(encode_rows, records, args.repeat)
+        col_size, col_time = measure(encode_columnar, records, args.repeat)
+        print(f"{count:>8,} | {row_size:>12,} {row_time * 1000:>9.1f} | {col_size:>14,} {col_time * 1000:>11.1f} | "
+              f"{row_size / col_size:>4.1f}x {row_time / col_time:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).parent.parent
+HEAVY_MODULES = ("pandas", "numpy", "plotly", "matplotlib", "seaborn", "sqlalchemy", "aiohttp")
+
+# Runs in a fresh interpreter so nothing is already imported
+CHILD = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": seconds,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy_loaded": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def profile(module, cwd):
+    """Import module in a child process with -X importtime; returns timings, RSS and the import profile"""
+    code = CHILD.format(root=str(REPO_ROOT), module=module, heavy=HEAVY_MODULES)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          capture_output=True, text=True, cwd=cwd)
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr else "import failed"}
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append({"module": name, "self_ms": int(self_us) / 1000,
+                            "cumulative_ms": int(cumulative_us) / 1000, "depth": len(indent) // 2})
+    result["profile"] = entries
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start import time and memory of the API workers")
+    parser.add_argument("--modules", nargs="+", default=["app.main", "app.query_interface"])
+    parser.add_argument("--cwd", default=str(REPO_ROOT), help="Working directory (query_interface needs ./static)")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    print("🚀 WORKER COLD-START BENCHMARK")
+    print("=" * 78)
+    for module in args.modules:
+        runs = [profile(module, args.cwd) for _ in range(args.runs)]
+        if "error" in runs[0]:
+            print(f"❌ {module}: {runs[0]['error']}")
+            continue
+        best = min(runs, key=lambda r: r["seconds"])
+        print(f"📦 {module}: {best['seconds']:.3f}s import, {best['max_rss_mb']:.0f} MB RSS")
+        print(f"   heavy modules loaded at import: {', '.join(best['heavy_loaded']) or 'none'}")
+        print("   slowest top-level imports (cumulative):")
+        top_level = [e for e in best["profile"] if e["depth"] == 1]
+        for entry in sorted(top_level, key=lambda e: e["cumulative_ms"], reverse=True)[:args.top]:
+            print(f"     {entry['cumulative_ms']:>8.1f} ms  {entry['module']}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
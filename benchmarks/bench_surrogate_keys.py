@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import asyncpg
+
+# Add the parent directory to the path to import from database
+sys.path.append(str(Path(__file__).parent.parent))
+
+from database.connection import DATABASE_URL
+
+# Join-heavy ROI shapes, each written once with {key}: run on item_id (text) and item_key (integer)
+QUERIES = {
+    "roi_by_day": """
+        SELECT a.{key}, SUM(t.total_sales) AS total_sales, SUM(a.ad_spend) AS ad_spend,
+               ROUND(((SUM(t.total_sales) - SUM(a.ad_spend)) / NULLIF(SUM(a.ad_spend), 0) * 100)::numeric, 2) AS roi
+        FROM ad_sales a JOIN total_sales t ON a.{key} = t.{key} AND a.date = t.date
+        GROUP BY a.{key} ORDER BY roi DESC NULLS LAST LIMIT 20
+    """,
+    "roi_per_item": """
+        SELECT a.{key}, t.total_sales, a.ad_spend,
+               ROUND(((t.total_sales - a.ad_spend) / NULLIF(a.ad_spend, 0) * 100)::numeric, 2) AS roi
+        FROM (SELECT {key}, SUM(ad_spend) AS ad_spend FROM ad_sales GROUP BY {key}) a
+        JOIN (SELECT {key}, SUM(total_sales) AS total_sales FROM total_sales GROUP BY {key}) t ON a.{key} = t.{key}
+        WHERE a.ad_spend > 0 ORDER BY roi DESC LIMIT 20
+    """,
+    "roi_eligible_only": """
+        SELECT a.{key}, SUM(t.total_sales) AS total_sales, SUM(a.ad_spend) AS ad_spend
+        FROM ad_sales a
+        JOIN total_sales t ON a.{key} = t.{key} AND a.date = t.date
+        JOIN eligibility e ON e.{key} = a.{key} AND e.eligibility_datetime_utc::date = a.date
+        WHERE e.eligibility = 'eligible'
+        GROUP BY a.{key} ORDER BY total_sales DESC LIMIT 20
+    """,
+}
+
+
+async def best_of(conn, sql, repeat):
+    best = float("inf")
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = await conn.fetch(sql)
+        best = min(best, time.perf_counter() - start)
+        rows = len(result)
+    return best * 1000, rows
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="item_id (VARCHAR) vs item_key (INTEGER) joins on the live tables")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        missing = await conn.fetchval("SELECT COUNT(*) FROM ad_sales WHERE item_key IS NULL")
+        if missing:
+            print(f"❌ {missing:,} ad_sales rows without item_key - run: python -m database.connection")
+            return
+        counts = {t: await conn.fetchval(f"SELECT COUNT(*) FROM {t}") for t in ("ad_sales", "total_sales", "eligibility")}
+        print("🔑 SURROGATE KEY JOIN BENCHMARK (best of {} runs)".format(args.repeat))
+        print("   " + ", ".join(f"{table} {count:,}" for table, count in counts.items()))
+        print("=" * 72)
+        print(f"{'query':<20} | {'item_id ms':>10} | {'item_key ms':>11} | {'speedup':>7} | rows")
+        print("-" * 72)
+        for name, sql in QUERIES.items():
+            text_ms, text_rows = await best_of(conn, sql.format(key="item_id"), args.repeat)
+            key_ms, key_rows = await best_of(conn, sql.format(key="item_key"), args.repeat)
+            mismatch = "" if text_rows == key_rows else f" ⚠️ {key_rows} on item_key"
+            print(f"{name:<20} | {text_ms:>10.2f} | {key_ms:>11.2f} | {text_ms / key_ms:>6.2f}x | {text_rows}{mismatch}")
+
+        width = await conn.fetchrow("""
+            SELECT AVG(pg_column_size(item_id)) AS text_bytes, AVG(pg_column_size(item_key)) AS key_bytes
+            FROM ad_sales
+        """)
+        print(f"\n📦 Join column width: item_id {width['text_bytes']:.1f} bytes vs item_key {width['key_bytes']:.1f} bytes")
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
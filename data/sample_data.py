@@ -10,6 +10,9 @@ from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
+from database.dictionary import MESSAGE_FUNCTION
+from database.partitions import PARTITIONED_TABLES, default_partition_sql, ensure_partitions
+
 async def create_connection():
     """Create async PostgreSQL connection"""
     try:
@@ -31,30 +34,41 @@ async def ensure_correct_schema(connection):
     # Create ad_sales table (matches your models.py)
     await connection.execute("""
         CREATE TABLE IF NOT EXISTS ad_sales (
-            id SERIAL PRIMARY KEY,
+            id SERIAL,
             item_id VARCHAR(100),
-            date DATE,
+            date DATE NOT NULL,
             ad_sales DECIMAL(15,2) DEFAULT 0,
             impressions INTEGER DEFAULT 0,
             ad_spend DECIMAL(12,2) DEFAULT 0,
             clicks INTEGER DEFAULT 0,
             units_sold INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT NOW()
-        )
+            created_at TIMESTAMP DEFAULT NOW(),
+            PRIMARY KEY (id, date)
+        ) PARTITION BY RANGE (date)
     """)
     
     # Create total_sales table (matches your models.py)  
     await connection.execute("""
         CREATE TABLE IF NOT EXISTS total_sales (
-            id SERIAL PRIMARY KEY,
+            id SERIAL,
             item_id VARCHAR(100),
-            date DATE,
+            date DATE NOT NULL,
             total_sales DECIMAL(15,2) DEFAULT 0,
             total_units_ordered INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT NOW()
-        )
+            created_at TIMESTAMP DEFAULT NOW(),
+            PRIMARY KEY (id, date)
+        ) PARTITION BY RANGE (date)
     """)
     
+    # Eligibility messages are stored once, eligibility keeps their message_id
+    await connection.execute("""
+        CREATE TABLE IF NOT EXISTS eligibility_messages (
+            message_id SERIAL PRIMARY KEY,
+            message TEXT NOT NULL UNIQUE
+        )
+    """)
+    await connection.execute(MESSAGE_FUNCTION)
+
     # Create eligibility table (matches your models.py)
     await connection.execute("""
         CREATE TABLE IF NOT EXISTS eligibility (
@@ -62,11 +76,15 @@ async def ensure_correct_schema(connection):
             item_id VARCHAR(100),
             eligibility_datetime_utc TIMESTAMP,
             eligibility VARCHAR(50),
-            message TEXT,
+            message_id INTEGER,
             created_at TIMESTAMP DEFAULT NOW()
         )
     """)
     
+    # DEFAULT partitions catch any dates outside the monthly partitions
+    for table_name in PARTITIONED_TABLES:
+        await connection.execute(default_partition_sql(table_name))
+    
     print("✅ Verified correct 3-table schema exists")
 
 async def populate_sample_data_for_testing():
@@ -99,6 +117,8 @@ async def populate_sample_data_for_testing():
         # Generate minimal sample data for testing only
         sample_products = ['TEST_PRODUCT_001', 'TEST_PRODUCT_002', 'TEST_PRODUCT_003']
         base_date = datetime.now() - timedelta(days=30)
+        for table_name in PARTITIONED_TABLES:
+            await ensure_partitions(connection, table_name, base_date, base_date + timedelta(days=len(sample_products)))
         
         # Insert minimal ad_sales test data
         for i, product in enumerate(sample_products):
@@ -130,8 +150,8 @@ async def populate_sample_data_for_testing():
         # Insert minimal eligibility test data
         for i, product in enumerate(sample_products):
             await connection.execute("""
-                INSERT INTO eligibility (item_id, eligibility_datetime_utc, eligibility, message)
-                VALUES ($1, $2, $3, $4)
+                INSERT INTO eligibility (item_id, eligibility_datetime_utc, eligibility, message_id)
+                VALUES ($1, $2, $3, encode_message($4))
             """, 
                 product,
                 datetime.now(),
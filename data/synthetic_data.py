@@ -0,0 +1,304 @@
+import argparse
+import asyncio
+import math
+import os
+import re
+import sys
+import time
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the path to import from database
+sys.path.append(str(Path(__file__).parent.parent))
+
+
+TABLES = ("ad_sales", "total_sales", "eligibility")
+# Workbook column order (the headers of the real exports)
+COLUMNS = {
+    "ad_sales": ["date", "item_id", "ad_sales", "impressions", "ad_spend", "clicks", "units_sold"],
+    "total_sales": ["date", "item_id", "total_sales", "total_units_ordered"],
+    "eligibility": ["eligibility_datetime_utc", "item_id", "eligibility", "message"],
+}
+INELIGIBLE_MESSAGES = [
+    "This product's cost to Amazon does not allow us to meet customers’ pricing expectations. Consider "
+    "reducing the cost. It may take a few weeks for your product to become eligible to advertise after "
+    "you reduce the cost.",
+    "This product is either missing important information or contains incorrect information. "
+    "Review in your product inventory.",
+]
+# Mon..Sun demand multipliers
+WEEKDAY_FACTOR = np.array([1.0, 0.95, 0.95, 1.0, 1.1, 1.2, 1.15])
+CHUNK_ROWS = 1_000_000
+XLSX_MAX_ROWS = 1_048_575  # one sheet, minus the header
+SCALE_SUFFIXES = {"": 1, "K": 1_000, "M": 1_000_000}
+
+
+def parse_scale(value: str) -> int:
+    """'1K', '10M', '250000' -> ad_sales row count"""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([KkMm]?)", str(value).strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"Scale must look like 1K, 10M or 250000, got {value!r}")
+    return int(float(match.group(1)) * SCALE_SUFFIXES[match.group(2).upper()])
+
+
+class SyntheticDataGenerator:
+    """
+    Deterministic ad_sales / total_sales / eligibility data at any scale (1K to 100M ad_sales rows)
+    Shaped like the real exports: one ad row per item and day, a long tail of items without
+    impressions, clicks/units drawn from per-item CTR/CVR, total sales = ad units + organic units
+    at a per-item price, and a daily eligibility snapshot of every item whose status rarely flips.
+    Each day has its own seeded RNG, so output depends only on (rows, seed, days) - not on chunking.
+    """
+
+    def __init__(self, rows: int, seed: int = 42, days: Optional[int] = None, start: date = date(2025, 6, 1)):
+        if rows < 1:
+            raise ValueError("rows must be positive")
+        self.rows = rows
+        self.seed = seed
+        self.days = days or min(365, max(14, rows // 1000))
+        self.items = math.ceil(rows / self.days)
+        self.start = pd.Timestamp(start)
+        self._item_profile()
+
+    def _rng(self, *key) -> np.random.Generator:
+        return np.random.default_rng([self.seed, *key])
+
+    def _item_profile(self):
+        rng = self._rng(0)
+        n = self.items
+        self.item_ids = np.arange(n, dtype=np.int64)
+        self.popularity = rng.lognormal(0.0, 1.5, n)                 # heavy-tailed demand
+        self.ad_activity = rng.beta(1.0, 2.0, n)                     # share of days with live ads
+        self.ctr = rng.beta(2.0, 200.0, n)                           # ~1% click-through
+        self.cpc = rng.lognormal(np.log(1.5), 0.5, n)                # cost per click
+        self.cvr = rng.beta(2.0, 18.0, n)                            # ~10% conversion
+        self.price = np.round(rng.lognormal(np.log(100.0), 0.7, n), 2)
+        self.organic_rate = self.popularity * rng.uniform(0.05, 0.5, n)
+        self.message_choice = rng.choice(len(INELIGIBLE_MESSAGES), n, p=[0.9, 0.1])
+        self.initially_eligible = rng.random(n) >= 0.15
+
+    def _days(self) -> Iterator[int]:
+        """Day indexes, stopping once the row budget is spent"""
+        return iter(range(math.ceil(self.rows / self.items)))
+
+    def _day_rows(self, day: int) -> int:
+        return min(self.items, self.rows - day * self.items)
+
+    def _ad_day(self, day: int) -> Dict[str, np.ndarray]:
+        rng = self._rng(1, day)
+        when = self.start + pd.Timedelta(days=day)
+        factor = WEEKDAY_FACTOR[when.dayofweek]
+        active = rng.random(self.items) < self.ad_activity
+        impressions = np.where(active, rng.poisson(self.popularity * 500 * factor), 0)
+        clicks = rng.binomial(impressions, self.ctr)
+        spend = np.round(clicks * self.cpc * rng.lognormal(0.0, 0.1, self.items), 2)
+        units = rng.binomial(clicks, self.cvr)
+        return {"when": when, "impressions": impressions, "clicks": clicks, "spend": spend, "units": units,
+                "factor": factor}
+
+    def _chunks(self, build) -> Iterator[pd.DataFrame]:
+        """Group whole days into ~CHUNK_ROWS frames"""
+        frames, pending = [], 0
+        for day in self._days():
+            frame = build(day)
+            if len(frame):
+                frames.append(frame)
+                pending += len(frame)
+            if pending >= CHUNK_ROWS:
+                yield pd.concat(frames, ignore_index=True)
+                frames, pending = [], 0
+        if frames:
+            yield pd.concat(frames, ignore_index=True)
+
+    def _ad_sales(self, day: int) -> pd.DataFrame:
+        ad = self._ad_day(day)
+        n = self._day_rows(day)
+        return pd.DataFrame({
+            "date": np.full(n, ad["when"].to_datetime64()),
+            "item_id": self.item_ids[:n],
+            "ad_sales": np.round(ad["units"] * self.price, 2)[:n],
+            "impressions": ad["impressions"][:n],
+            "ad_spend": ad["spend"][:n],
+            "clicks": ad["clicks"][:n],
+            "units_sold": ad["units"][:n],
+        })
+
+    def _total_sales(self, day: int) -> pd.DataFrame:
+        ad = self._ad_day(day)  # same per-day RNG - ad units are part of total units
+        rng = self._rng(2, day)
+        n = self._day_rows(day)
+        units = (ad["units"] + rng.poisson(self.organic_rate * ad["factor"]))[:n]
+        sold = units > 0  # like the export, only item-days with orders have a row
+        return pd.DataFrame({
+            "date": np.full(int(sold.sum()), ad["when"].to_datetime64()),
+            "item_id": self.item_ids[:n][sold],
+            "total_sales": np.round(units * self.price[:n], 2)[sold],
+            "total_units_ordered": units[sold],
+        })
+
+    def _eligibility(self, day: int, state: np.ndarray) -> pd.DataFrame:
+        rng = self._rng(3, day)
+        if day:
+            # Items lose eligibility rarely and regain it faster - ~14% ineligible at any time
+            flips = rng.random(self.items) < np.where(state, 0.01, 0.06)
+            state[flips] = ~state[flips]
+        n = self._day_rows(day)
+        # One snapshot of every item per day, taken around 08:50 UTC
+        taken = (self.start + pd.Timedelta(days=day, hours=8, minutes=50)
+                 + pd.Timedelta(milliseconds=int(rng.integers(0, 10_000))))
+        eligible = state[:n].copy()
+        messages = np.array(INELIGIBLE_MESSAGES, dtype=object)[self.message_choice[:n]]
+        return pd.DataFrame({
+            "eligibility_datetime_utc": np.full(n, taken.to_datetime64()),
+            "item_id": self.item_ids[:n],
+            "eligibility": eligible,
+            "message": np.where(eligible, None, messages),
+        })
+
+    def iter_table(self, table: str) -> Iterator[pd.DataFrame]:
+        """Workbook-shaped frames (cleaned column names) of about CHUNK_ROWS rows"""
+        if table == "eligibility":
+            state = self.initially_eligible.copy()
+            return self._chunks(lambda day: self._eligibility(day, state))
+        if table not in COLUMNS:
+            raise ValueError(f"Unknown table {table!r}")
+        return self._chunks(getattr(self, f"_{table}"))
+
+    def write_parquet(self, table: str, path: str) -> int:
+        import pyarrow
+        import pyarrow.parquet
+
+        rows, writer = 0, None
+        try:
+            for df in self.iter_table(table):
+                batch = pyarrow.Table.from_pandas(df, schema=writer.schema if writer else None, preserve_index=False)
+                if writer is None:
+                    writer = pyarrow.parquet.ParquetWriter(path, batch.schema, compression="zstd")
+                writer.write_table(batch)
+                rows += len(df)
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows
+
+    def write_xlsx(self, table: str, path: str) -> int:
+        """Single-sheet workbook like the real export (openpyxl write-only, so memory stays flat)"""
+        import openpyxl
+
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(COLUMNS[table])
+        rows = 0
+        for df in self.iter_table(table):
+            rows += len(df)
+            if rows > XLSX_MAX_ROWS:
+                raise ValueError(f"{table}: more than {XLSX_MAX_ROWS:,} rows do not fit one Excel sheet - "
+                                 "use parquet or db output")
+            frame = df.astype(object).where(df.notna(), None)
+            for row in frame.itertuples(index=False, name=None):
+                sheet.append(row)
+        workbook.save(path)
+        add_dimension(path, f"A1:{chr(ord('A') + len(COLUMNS[table]) - 1)}{rows + 1}")
+        return rows
+
+
+def add_dimension(path, ref):
+    """
+    Write-only workbooks have no <dimension>, so openpyxl would parse the whole sheet once just to
+    size it; Excel always writes one. Insert it so the file behaves like a real export.
+    """
+    import shutil
+    import zipfile
+
+    tmp = path + ".tmp"
+    with zipfile.ZipFile(path) as source, zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as target:
+        for item in source.infolist():
+            with source.open(item) as reader, target.open(item.filename, "w", force_zip64=True) as writer:
+                if item.filename != "xl/worksheets/sheet1.xml":
+                    shutil.copyfileobj(reader, writer)
+                    continue
+                head = reader.read(4096)
+                writer.write(head.replace(b"<sheetViews>", f'<dimension ref="{ref}" /><sheetViews>'.encode(), 1))
+                shutil.copyfileobj(reader, writer)
+    os.replace(tmp, path)
+
+
+async def load_database(generator: SyntheticDataGenerator, dsn: Optional[str] = None) -> Dict[str, int]:
+    """
+    COPY the generated tables straight into PostgreSQL through shadow tables and one swap,
+    then run the post-ingest hooks. The replaced data stays as *_old (python -m database.table_swap rollback)
+    """
+    import asyncpg
+    from database.connection import DATABASE_URL, create_tables, ingest_lock
+    from database.ingest import load_batches
+    from database.post_ingest import post_ingest_hooks
+    from database.table_swap import build_shadow_indexes, create_shadow_view, swap_in
+
+    dsn = dsn or DATABASE_URL
+    async with ingest_lock(dsn):  # the shadows belong to this load until the swap
+        await asyncio.to_thread(create_tables)
+        counts = {}
+        for table in TABLES:
+            report = await load_batches(dsn, table, generator.iter_table(table), swap=True)
+            counts[table] = report["rows"]
+        conn = await asyncpg.connect(dsn)
+        try:
+            for table in TABLES:
+                await build_shadow_indexes(conn, table)
+            await create_shadow_view(conn)
+            await swap_in(conn)
+            await post_ingest_hooks.run(conn, source="synthetic", swapped=True)
+        finally:
+            await conn.close()
+    return counts
+
+
+async def main():
+    """
+    python -m data.synthetic_data --scale 1M --output xlsx     # workbooks for python -m database.ingest --dir
+    python -m data.synthetic_data --scale 100M --output parquet
+    python -m data.synthetic_data --scale 10M --output db
+    """
+    parser = argparse.ArgumentParser(description="Seeded synthetic ad_sales/total_sales/eligibility data")
+    parser.add_argument("--scale", type=parse_scale, default=parse_scale("100K"),
+                        help="ad_sales rows: 1K .. 100M (eligibility is about the same, total_sales fewer)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--days", type=int, default=None, help="date span (default: 14-365 by scale)")
+    parser.add_argument("--output", choices=["parquet", "xlsx", "db"], default="parquet")
+    parser.add_argument("--dir", default=None, help="output directory (default: data/synthetic/<scale>)")
+    args = parser.parse_args()
+
+    generator = SyntheticDataGenerator(args.scale, seed=args.seed, days=args.days)
+    print(f"🧪 Synthetic data: {args.scale:,} ad rows = {generator.items:,} items x {generator.days} days, "
+          f"seed {args.seed}")
+    start = time.perf_counter()
+
+    if args.output == "db":
+        counts = await load_database(generator)
+    else:
+        from database.ingest import WORKBOOKS
+
+        out_dir = args.dir or os.path.join("data", "synthetic", f"{args.scale}")
+        os.makedirs(out_dir, exist_ok=True)
+        counts = {}
+        for table in TABLES:
+            if args.output == "xlsx":
+                path = os.path.join(out_dir, WORKBOOKS[table])
+                counts[table] = generator.write_xlsx(table, path)
+            else:
+                path = os.path.join(out_dir, f"{table}.parquet")
+                counts[table] = generator.write_parquet(table, path)
+            print(f"   📄 {path}")
+
+    seconds = time.perf_counter() - start
+    total = sum(counts.values())
+    print("✅ " + ", ".join(f"{table} {rows:,}" for table, rows in counts.items())
+          + f" in {seconds:.1f}s ({total / seconds:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
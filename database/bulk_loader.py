@@ -0,0 +1,146 @@
+import os
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from database.dictionary import KeyEncoder, loaded_columns
+from database.validation import coerce_batch, describe_issues, merge_reports
+
+
+REJECT_LOG_DIR = os.getenv("ANARIX_REJECT_LOG_DIR", os.path.join("logs", "rejects"))
+
+def clean_column_name(col) -> str:
+    """Workbook header -> PostgreSQL column name"""
+    return (
+        str(col).strip().lower()
+        .replace(' ', '_')
+        .replace('-', '_')
+        .replace('(', '')
+        .replace(')', '')
+        .replace('.', '_')
+        .replace('%', 'percent')
+    )
+
+
+def clean_column_names(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = [clean_column_name(col) for col in df.columns]
+    return df
+
+
+def prepare_records(table: str, df: pd.DataFrame) -> Tuple[List[tuple], pd.DataFrame, Dict[str, Any]]:
+    """
+    Coerce and validate a batch (database.validation) -> (COPY records, rejected rows, validation report)
+    Rejected rows keep their original cells plus a _reject_reason column
+    """
+    columns, reasons, report = coerce_batch(table, df)
+    valid = (reasons == "").to_numpy()
+    records = [row for row, ok in zip(zip(*columns.values()), valid) if ok]
+    rejects = df[~valid].copy()
+    rejects["_reject_reason"] = reasons[~valid]
+    return records, rejects, report
+
+
+def write_reject_log(table: str, rejects: pd.DataFrame, log_dir: str = REJECT_LOG_DIR,
+                     path: Optional[str] = None) -> Optional[str]:
+    """CSV of the rows COPY skipped, one file per load; pass path to append a later batch"""
+    if rejects.empty:
+        return path
+    if path is None:
+        os.makedirs(log_dir, exist_ok=True)
+        path = os.path.join(log_dir, f"{table}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+        rejects.to_csv(path, index_label="source_row")
+    else:
+        rejects.to_csv(path, index_label="source_row", mode="a", header=False)
+    return path
+
+
+async def copy_dataframe(conn, table: str, df: pd.DataFrame, target: Optional[str] = None,
+                         encoder: Optional[KeyEncoder] = None) -> Dict[str, Any]:
+    """
+    Bulk-load a cleaned workbook DataFrame with binary COPY (copy_records_to_table)
+    target overrides the destination (e.g. a staging table shaped like table)
+    encoder fills the integer key columns (item_key, message_id) on the way in
+    """
+    start = time.perf_counter()
+    records, rejects, validation = prepare_records(table, df)
+    if encoder is not None:
+        records = await encoder.encode(table, records)
+    prepared = time.perf_counter()
+    columns = loaded_columns(table, encoded=encoder is not None)
+    if records:
+        await conn.copy_records_to_table(target or table, records=records, columns=columns)
+    seconds = time.perf_counter() - start
+    report = {
+        "table": target or table,
+        "rows": len(records),
+        "rejected": len(rejects),
+        "prepare_seconds": round(prepared - start, 3),
+        "seconds": round(seconds, 3),
+        "rows_per_second": int(len(records) / seconds) if seconds > 0 else None,
+        "reject_log": write_reject_log(table, rejects),
+        "validation": validation,
+    }
+    _print_report(report)
+    return report
+
+
+async def copy_batches(conn, table: str, batches: Iterable[pd.DataFrame], target: Optional[str] = None,
+                       before_copy: Optional[Callable[[pd.DataFrame], Awaitable]] = None,
+                       encoder: Optional[KeyEncoder] = None) -> Dict[str, Any]:
+    """
+    COPY a stream of DataFrame batches (e.g. iter_workbook_batches) - one batch in memory at a time
+    before_copy(batch) runs ahead of each COPY, e.g. to create the partitions the batch needs
+    """
+    start = time.perf_counter()
+    columns = loaded_columns(table, encoded=encoder is not None)
+    rows = rejected = batch_count = 0
+    read_seconds = prepare_seconds = 0.0
+    reject_log = None
+    validation: Dict[str, Any] = {}
+    batches = iter(batches)
+    while True:
+        step = time.perf_counter()
+        df = next(batches, None)
+        read_seconds += time.perf_counter() - step
+        if df is None:
+            break
+        step = time.perf_counter()
+        records, rejects, batch_validation = prepare_records(table, df)
+        if encoder is not None:
+            records = await encoder.encode(table, records)
+        validation = merge_reports(validation, batch_validation)
+        prepare_seconds += time.perf_counter() - step
+        if before_copy is not None:
+            await before_copy(df)
+        if records:
+            await conn.copy_records_to_table(target or table, records=records, columns=columns)
+        reject_log = write_reject_log(table, rejects, path=reject_log)
+        rows += len(records)
+        rejected += len(rejects)
+        batch_count += 1
+    seconds = time.perf_counter() - start
+    report = {
+        "table": target or table,
+        "rows": rows,
+        "rejected": rejected,
+        "batches": batch_count,
+        "read_seconds": round(read_seconds, 3),
+        "prepare_seconds": round(prepare_seconds, 3),
+        "seconds": round(seconds, 3),
+        "rows_per_second": int(rows / seconds) if seconds > 0 else None,
+        "reject_log": reject_log,
+        "validation": validation,
+    }
+    _print_report(report)
+    return report
+
+
+def _print_report(report):
+    print(f"📥 {report['table']}: {report['rows']:,} rows in {report['seconds']:.2f}s "
+          f"({report['rows_per_second'] or 0:,} rows/s)")
+    for issue in describe_issues(report["validation"]):
+        print(f"   🔎 {issue}")
+    if report["rejected"]:
+        print(f"⚠️ {report['table']}: {report['rejected']:,} rows rejected -> {report['reject_log']}")
@@ -1,9 +1,12 @@
 import asyncpg
 import asyncio
+from contextlib import asynccontextmanager
 from sqlalchemy import create_engine, pool
 from sqlalchemy.orm import sessionmaker
-from database.models import Base
+from database.models import Base, BusinessIntelligenceView
+from database.partitions import ensure_partitions_sync
 import os
+import json
 import logging
 
 
@@ -42,13 +45,35 @@ SessionLocal = sessionmaker(
 
 def create_tables():
     """Create all tables for Excel-converted business data"""
+    # DDL needs one connection, not the 20+30 query pool - use a throwaway NullPool engine
+    ddl_engine = create_engine(DATABASE_URL, poolclass=pool.NullPool, future=True)
     try:
         logger.info("Creating tables for ANARIX AI Agent Excel data...")
-        Base.metadata.create_all(bind=engine)
+        Base.metadata.create_all(bind=ddl_engine)
+        # Monthly range partitions for ad_sales/total_sales (DEFAULT + current and upcoming months)
+        with ddl_engine.begin() as connection:
+            ensure_partitions_sync(connection)
+            # item_key column and trigger for fact tables created before dictionary encoding
+            # (imported here: database.dictionary pulls in pandas, which API startup does not need)
+            from database.dictionary import ensure_key_columns_sync
+            ensure_key_columns_sync(connection)
         logger.info("✅ All tables created successfully for ad_sales, total_sales, eligibility")
     except Exception as e:
         logger.error(f"❌ Table creation failed: {e}")
         raise
+    finally:
+        ddl_engine.dispose()
+
+
+async def create_tables_async():
+    """
+    create_tables() for API startup, run in a worker thread so the event loop keeps serving
+    Skipped with ANARIX_SCHEMA_SETUP=skip when migrations run separately (python -m database.connection)
+    """
+    if os.getenv("ANARIX_SCHEMA_SETUP", "startup").lower() == "skip":
+        logger.info("⏭️ Schema setup skipped (ANARIX_SCHEMA_SETUP=skip)")
+        return
+    await asyncio.to_thread(create_tables)
 
 
 def get_database():
@@ -64,7 +89,7 @@ def get_database():
 async def get_async_connection():
     """
     Get optimized async PostgreSQL connection for complex business intelligence queries
-    Configured for unlimited SQL complexity on 8,779+ Excel records
+    Configured for unlimited SQL complexity on the Excel-converted tables
     """
     try:
         connection = await asyncpg.connect(
@@ -80,6 +105,7 @@ async def get_async_connection():
                 'jit': 'off',           # Disable JIT for consistent performance
                 'work_mem': '256MB',    # Increase memory for complex operations
                 'temp_buffers': '32MB', # Buffer for temporary tables in CTEs
+                'enable_partition_pruning': 'on',  # Skip monthly partitions outside date filters
             }
         )
         logger.info("✅ Async database connection established for Excel data processing")
@@ -90,6 +116,46 @@ async def get_async_connection():
         return None
 
 
+_async_pool = None
+
+
+async def get_async_pool():
+    """
+    Shared asyncpg pool for the API handlers
+    Registered statements (database/statements.py) stay prepared for the life of each pooled connection
+    """
+    global _async_pool
+    if _async_pool is None:
+        try:
+            _async_pool = await asyncpg.create_pool(
+                DATABASE_URL,
+                min_size=2,
+                max_size=10,
+                command_timeout=300,
+                statement_cache_size=200,           # room for every registered statement plus LLM SQL
+                max_cached_statement_lifetime=0,    # never expire cached plans of registered statements
+                server_settings={
+                    'application_name': 'ANARIX_AI_Agent',
+                    'jit': 'off',
+                    'work_mem': '256MB',
+                    'temp_buffers': '32MB',
+                    'enable_partition_pruning': 'on',
+                },
+            )
+            logger.info("✅ Async connection pool ready")
+        except Exception as e:
+            logger.error(f"❌ Async connection pool failed: {e}")
+            return None
+    return _async_pool
+
+
+async def close_async_pool():
+    global _async_pool
+    if _async_pool is not None:
+        await _async_pool.close()
+        _async_pool = None
+
+
 async def test_excel_data_connectivity():
     """
     Test connectivity to your Excel-converted tables
@@ -112,12 +178,13 @@ async def test_excel_data_connectivity():
         logger.info(f"   ✔️ eligibility: {eligibility_count:,} records")
         logger.info(f"   🎯 Total business records: {ad_sales_count + total_sales_count + eligibility_count:,}")
         
-        # Test complex join capability
+        # Test complex join capability (distinct keys only - no row fan-out)
         join_test = await conn.fetchval("""
-            SELECT COUNT(DISTINCT COALESCE(a.item_id, t.item_id, e.item_id))
-            FROM ad_sales a
-            FULL OUTER JOIN total_sales t ON a.item_id = t.item_id
-            FULL OUTER JOIN eligibility e ON COALESCE(a.item_id, t.item_id) = e.item_id
+            SELECT COUNT(*) FROM (
+                SELECT item_id FROM ad_sales
+                UNION SELECT item_id FROM total_sales
+                UNION SELECT item_id FROM eligibility
+            ) items
         """)
         logger.info(f"   🔗 Unique products across all tables: {join_test:,}")
         
@@ -130,6 +197,77 @@ async def test_excel_data_connectivity():
         return False
 
 
+async def create_business_view(conn):
+    """
+    (Re)create the pre-aggregated business_intelligence_complete materialized view
+    Replaces the legacy plain view of the same name if it exists
+    """
+    view_name = BusinessIntelligenceView.VIEW_NAME
+    relkind = await conn.fetchval(
+        "SELECT relkind::text FROM pg_class WHERE relname = $1 AND relnamespace = 'public'::regnamespace",
+        view_name
+    )
+    async with conn.transaction():
+        if relkind == 'v':
+            await conn.execute(f"DROP VIEW {view_name}")
+        elif relkind == 'm':
+            await conn.execute(f"DROP MATERIALIZED VIEW {view_name}")
+        for statement in BusinessIntelligenceView.get_materialized_view_sql():
+            await conn.execute(statement)
+    logger.info(f"✅ Materialized view {view_name} created")
+
+
+async def refresh_business_view(conn, analyze=True):
+    """
+    Refresh business_intelligence_complete after an ingest
+    Uses CONCURRENTLY so /query readers are never blocked; creates the view on first run
+    """
+    if analyze:
+        # Fresh planner statistics (reltuples, n_distinct) for the reloaded tables - also read by TableStatsService
+        await conn.execute("ANALYZE ad_sales, total_sales, eligibility")
+    view_name = BusinessIntelligenceView.VIEW_NAME
+    relkind = await conn.fetchval(
+        "SELECT relkind::text FROM pg_class WHERE relname = $1 AND relnamespace = 'public'::regnamespace",
+        view_name
+    )
+    if relkind != 'm':
+        await create_business_view(conn)
+        return
+    await conn.execute(BusinessIntelligenceView.get_refresh_sql(concurrently=True))
+    logger.info(f"✅ Materialized view {view_name} refreshed")
+
+
+async def notify_data_changed(conn, source="ingest", version=None):
+    """
+    Tell running API workers (LISTEN anarix_data_changed) that table data was reloaded
+    With a data version the payload is JSON {"source", "version"}, otherwise just the source
+    """
+    payload = source if version is None else json.dumps({"source": source, "version": version})
+    await conn.execute("SELECT pg_notify('anarix_data_changed', $1)", payload)
+    logger.info(f"🔔 Data change broadcast from {source}")
+
+
+# pg_advisory_lock key held while table data is reloaded or swapped - ingest runs (CLI, watcher),
+# synthetic loads and table_swap rollback/drop-previous never overlap
+INGEST_LOCK_KEY = 0x414E4158  # "ANAX"
+
+
+@asynccontextmanager
+async def ingest_lock(dsn=DATABASE_URL):
+    """
+    Hold the ingest advisory lock for the body of the block, waiting for a running holder first
+    Taken on its own connection, so the session lock is released when the block exits
+    """
+    lock_conn = await asyncpg.connect(dsn)
+    try:
+        if not await lock_conn.fetchval("SELECT pg_try_advisory_lock($1)", INGEST_LOCK_KEY):
+            print("⏳ Another ingest is running - waiting for it to finish...")
+            await lock_conn.execute("SELECT pg_advisory_lock($1)", INGEST_LOCK_KEY)
+        yield
+    finally:
+        await lock_conn.close()  # session lock is released with the connection
+
+
 def initialize_anarix_database():
     """
     Complete ANARIX AI Agent database initialization
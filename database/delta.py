@@ -0,0 +1,118 @@
+import logging
+from typing import Dict
+
+from database.dictionary import loaded_columns
+from database.partitions import PARTITIONED_TABLES, ensure_partitions
+
+
+logger = logging.getLogger(__name__)
+
+# Natural key of each table - a workbook row with the same key is the same fact
+NATURAL_KEYS = {
+    "ad_sales": ("item_id", "date"),
+    "total_sales": ("item_id", "date"),
+    "eligibility": ("item_id", "eligibility_datetime_utc"),
+}
+
+
+def _value_columns(table):
+    """Stored non-key columns; dictionary keys stand in for their text (eligibility.message_id)"""
+    return [column for column in loaded_columns(table) if column not in NATURAL_KEYS[table]]
+
+
+def _row_hash(alias, table):
+    """md5 over the non-key columns - rows hash equal exactly when nothing but the key could differ"""
+    return "md5(ROW(" + ", ".join(f"{alias}.{c}" for c in _value_columns(table)) + ")::text)"
+
+
+# Nullable key columns -> stand-in for NULL, so a NULL key matches itself (eligibility rows without a
+# timestamp would otherwise be deleted and re-inserted on every delta). A plain equality on COALESCE,
+# unlike IS NOT DISTINCT FROM, can still be executed as a hash join.
+NULL_KEY_VALUES = {
+    "eligibility_datetime_utc": "'-infinity'::timestamp",
+}
+
+
+def _key_match(table, left="t", right="s"):
+    conditions = []
+    for column in NATURAL_KEYS[table]:
+        if column in NULL_KEY_VALUES:
+            null = NULL_KEY_VALUES[column]
+            conditions.append(f"COALESCE({left}.{column}, {null}) = COALESCE({right}.{column}, {null})")
+        else:
+            conditions.append(f"{left}.{column} = {right}.{column}")
+    return " AND ".join(conditions)
+
+
+def _count(status: str) -> int:
+    """Row count from an asyncpg command status such as 'UPDATE 12' or 'INSERT 0 7'"""
+    return int(status.split()[-1])
+
+
+async def create_stage(conn, table: str) -> str:
+    """
+    Temp table with the loaded columns of table (types copied, no constraints), dropped at commit
+    Load it with copy_dataframe/copy_batches(..., target=stage, encoder=...), then call apply_delta
+    """
+    stage = f"_stage_{table}"
+    columns = ", ".join(loaded_columns(table))
+    await conn.execute(f"DROP TABLE IF EXISTS {stage}")
+    await conn.execute(f"CREATE TEMP TABLE {stage} ON COMMIT DROP AS SELECT {columns} FROM {table} WITH NO DATA")
+    return stage
+
+
+async def apply_delta(conn, table: str, stage: str, delete_missing: bool = True) -> Dict[str, int]:
+    """
+    Apply a staged workbook to table as set-based changes -> {inserted, updated, deleted, unchanged}
+    Rows are matched on the natural key and compared by content hash; only differing rows are written,
+    so an unchanged workbook leaves the table (and its dead-tuple count) untouched.
+    delete_missing removes rows whose key is no longer in the workbook (the workbook is the full history).
+    Must run inside the transaction that created the stage.
+    """
+    key = ", ".join(NATURAL_KEYS[table])
+    duplicates = await conn.fetchval(
+        f"SELECT COUNT(*) FROM (SELECT 1 FROM {stage} GROUP BY {key} HAVING COUNT(*) > 1) d"
+    )
+    if duplicates:
+        raise ValueError(f"{table}: {duplicates} natural keys ({key}) appear more than once in the workbook")
+
+    await conn.execute(f"ALTER TABLE {stage} ADD COLUMN row_hash text")
+    await conn.execute(f"UPDATE {stage} s SET row_hash = {_row_hash('s', table)}")
+    await conn.execute(f"CREATE INDEX ON {stage} ({key})")
+    await conn.execute(f"ANALYZE {stage}")
+
+    if table in PARTITIONED_TABLES:
+        bounds = await conn.fetchrow(f"SELECT MIN(date) AS first, MAX(date) AS last FROM {stage}")
+        if bounds["first"]:
+            await ensure_partitions(conn, table, bounds["first"], bounds["last"])
+
+    values = _value_columns(table)
+    columns = loaded_columns(table)
+    # PostgreSQL 16's MERGE reports only a combined row count (no RETURNING / NOT MATCHED BY SOURCE),
+    # so the three set-based steps run separately to report exact counts
+    updated = _count(await conn.execute(f"""
+        UPDATE {table} t SET {", ".join(f"{c} = s.{c}" for c in values)}
+        FROM {stage} s
+        WHERE {_key_match(table)} AND {_row_hash('t', table)} <> s.row_hash
+    """))
+    inserted = _count(await conn.execute(f"""
+        INSERT INTO {table} ({", ".join(columns)})
+        SELECT {", ".join(f"s.{c}" for c in columns)} FROM {stage} s
+        WHERE NOT EXISTS (SELECT 1 FROM {table} t WHERE {_key_match(table)})
+    """))
+    deleted = 0
+    if delete_missing:
+        deleted = _count(await conn.execute(f"""
+            DELETE FROM {table} t
+            WHERE NOT EXISTS (SELECT 1 FROM {stage} s WHERE {_key_match(table)})
+        """))
+    staged = await conn.fetchval(f"SELECT COUNT(*) FROM {stage}")
+    counts = {
+        "inserted": inserted,
+        "updated": updated,
+        "deleted": deleted,
+        "unchanged": staged - inserted - updated,
+    }
+    logger.info(f"🔀 {table}: +{inserted:,} inserted, ~{updated:,} updated, -{deleted:,} deleted, "
+                f"{counts['unchanged']:,} unchanged")
+    return counts
@@ -0,0 +1,208 @@
+import logging
+from typing import Dict, List, Optional
+
+import asyncpg
+
+from database.models import Base, BusinessIntelligenceView
+from database.validation import TABLE_COLUMNS
+
+
+logger = logging.getLogger(__name__)
+
+# Key column -> (dictionary table, encoded column); dictionaries only grow, keys are never renumbered
+DICTIONARIES = {
+    "item_key": ("products", "item_id"),
+    "message_id": ("eligibility_messages", "message"),
+}
+
+# Integer key columns of each fact table, in COPY order after TABLE_COLUMNS
+ENCODED_COLUMNS = {
+    "ad_sales": ("item_key",),
+    "total_sales": ("item_key",),
+    "eligibility": ("item_key", "message_id"),
+}
+
+# Keys stored instead of their text: the (highly repetitive) eligibility message lives only in
+# eligibility_messages. item_id stays next to item_key, so SQL written against item_id keeps working
+REPLACING_KEYS = ("message_id",)
+
+# Fills item_key for rows inserted without it (sample data, ad-hoc SQL) and re-encodes changed item_ids,
+# so the NOT NULL key always matches item_id; bulk loads bring their keys and skip the lookup
+KEY_TRIGGER_FUNCTION = """
+    CREATE OR REPLACE FUNCTION encode_item_key() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' AND NEW.item_id IS DISTINCT FROM OLD.item_id
+                AND NEW.item_key IS NOT DISTINCT FROM OLD.item_key THEN
+            NEW.item_key := NULL;
+        END IF;
+        IF NEW.item_key IS NULL THEN
+            INSERT INTO products (item_id) VALUES (NEW.item_id) ON CONFLICT (item_id) DO NOTHING;
+            SELECT item_key INTO NEW.item_key FROM products WHERE item_id = NEW.item_id;
+        END IF;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+"""
+KEY_TRIGGER = "encode_item_key"
+
+# message -> message_id for rows written outside ingest, e.g. INSERT ... VALUES (..., encode_message('...'))
+MESSAGE_FUNCTION = """
+    CREATE OR REPLACE FUNCTION encode_message(message_text text) RETURNS integer AS $$
+        INSERT INTO eligibility_messages (message) VALUES (message_text) ON CONFLICT (message) DO NOTHING;
+        SELECT message_id FROM eligibility_messages WHERE message = message_text;
+    $$ LANGUAGE sql STRICT
+"""
+
+
+def replaced_columns(table: str) -> List[str]:
+    """Workbook columns of table that are stored only as their dictionary key"""
+    return [DICTIONARIES[key][1] for key in ENCODED_COLUMNS.get(table, ()) if key in REPLACING_KEYS]
+
+
+def loaded_columns(table: str, encoded: bool = True) -> List[str]:
+    """
+    COPY column list of table - the workbook columns, or when encoded the stored workbook
+    columns plus the key columns (eligibility can only be loaded encoded)
+    """
+    columns = [column for column, _ in TABLE_COLUMNS[table]]
+    if not encoded:
+        return columns
+    replaced = replaced_columns(table)
+    return [column for column in columns if column not in replaced] + list(ENCODED_COLUMNS.get(table, ()))
+
+
+class KeyEncoder:
+    """
+    Appends dictionary keys to COPY records (item_id -> item_key, message -> message_id)
+    and drops the text the key replaces, so records match loaded_columns(table)
+    Unknown values are added to the dictionary tables over the encoder's own autocommitted
+    connection, so parallel table loads never wait on each other's load transaction.
+    Keys are cached for the life of the encoder (one ingest run).
+    """
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self.conn: Optional[asyncpg.Connection] = None
+        self.cache: Dict[str, Dict[str, int]] = {}
+
+    async def _lookup(self, key_column: str, values: List[str]) -> Dict[str, int]:
+        if self.conn is None:
+            self.conn = await asyncpg.connect(self.dsn)
+        dictionary, source = DICTIONARIES[key_column]
+        # Sorted inserts: two loaders adding overlapping values lock them in the same order
+        await self.conn.execute(f"""
+            INSERT INTO {dictionary} ({source})
+            SELECT v FROM unnest($1::text[]) AS v
+            WHERE NOT EXISTS (SELECT 1 FROM {dictionary} d WHERE d.{source} = v)
+            ORDER BY v
+            ON CONFLICT ({source}) DO NOTHING
+        """, values)
+        rows = await self.conn.fetch(
+            f"SELECT {source}, {key_column} FROM {dictionary} WHERE {source} = ANY($1::text[])", values
+        )
+        return {row[source]: row[key_column] for row in rows}
+
+    async def encode(self, table: str, records: List[tuple]) -> List[tuple]:
+        """Records in TABLE_COLUMNS order -> records in loaded_columns(table) order, keys appended"""
+        if not records or table not in ENCODED_COLUMNS:
+            return records
+        columns = loaded_columns(table, encoded=False)
+        lookups = []
+        for key_column in ENCODED_COLUMNS[table]:
+            index = columns.index(DICTIONARIES[key_column][1])
+            cache = self.cache.setdefault(key_column, {})
+            missing = {row[index] for row in records if row[index] is not None}.difference(cache)
+            if missing:
+                cache.update(await self._lookup(key_column, sorted(missing)))
+            lookups.append((index, cache))
+        replaced = replaced_columns(table)
+        if not replaced:
+            return [row + tuple(cache.get(row[index]) for index, cache in lookups) for row in records]
+        kept = [index for index, column in enumerate(columns) if column not in replaced]
+        return [tuple(row[index] for index in kept) + tuple(cache.get(row[index]) for index, cache in lookups)
+                for row in records]
+
+    async def close(self):
+        if self.conn is not None:
+            await self.conn.close()
+            self.conn = None
+
+
+def backfill_sql(table: str, key_columns: Optional[List[str]] = None) -> List[str]:
+    """Statements that encode rows stored before their key columns existed (the trigger covers new rows)"""
+    statements = []
+    for key_column in key_columns or ENCODED_COLUMNS[table]:
+        dictionary, source = DICTIONARIES[key_column]
+        statements += [
+            f"INSERT INTO {dictionary} ({source}) "
+            f"SELECT DISTINCT {source} FROM {table} f WHERE {key_column} IS NULL AND {source} IS NOT NULL "
+            f"AND NOT EXISTS (SELECT 1 FROM {dictionary} d WHERE d.{source} = f.{source}) "
+            f"ORDER BY 1 ON CONFLICT ({source}) DO NOTHING",
+            f"UPDATE {table} f SET {key_column} = d.{key_column} FROM {dictionary} d "
+            f"WHERE f.{key_column} IS NULL AND d.{source} = f.{source}",
+        ]
+    return statements
+
+
+def key_trigger_sql(table: str) -> str:
+    """BEFORE INSERT/UPDATE trigger keeping table.item_key in step with item_id (cloned to partitions)"""
+    return (f"CREATE TRIGGER {KEY_TRIGGER} BEFORE INSERT OR UPDATE OF item_id, item_key ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION encode_item_key()")
+
+
+def ensure_key_columns_sync(connection):
+    """
+    Bring fact tables created before dictionary encoding up to date: add the key columns and
+    their indexes, encode the existing rows, make item_key NOT NULL behind the encode_item_key
+    trigger, move eligibility.message into eligibility_messages and rebuild the business view
+    Called from database.connection.create_tables with a SQLAlchemy connection; cheap once migrated
+    """
+    from sqlalchemy import text
+
+    connection.execute(text(KEY_TRIGGER_FUNCTION))
+    connection.execute(text(MESSAGE_FUNCTION))
+    view = BusinessIntelligenceView.VIEW_NAME
+    view_exists = connection.execute(text(
+        "SELECT relkind::text FROM pg_class WHERE relname = :name AND relnamespace = 'public'::regnamespace"
+    ), {"name": view}).scalar() == "m"
+    added = []
+    for table, key_columns in ENCODED_COLUMNS.items():
+        columns = {row[0]: row[1] for row in connection.execute(text(
+            "SELECT column_name, is_nullable FROM information_schema.columns "
+            "WHERE table_schema = 'public' AND table_name = :t"
+        ), {"t": table})}
+        new_keys = [key_column for key_column in key_columns if key_column not in columns]
+        for key_column in new_keys:
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {key_column} integer"))
+            added.append(f"{table}.{key_column}")
+        for index in Base.metadata.tables[table].indexes:
+            names = [column.name for column in index.columns]
+            if set(names) & set(key_columns) and connection.execute(
+                    text("SELECT to_regclass(:name)"), {"name": index.name}).scalar() is None:
+                connection.execute(text(f"CREATE INDEX {index.name} ON {table} ({', '.join(names)})"))
+        if not connection.execute(text(
+                "SELECT 1 FROM pg_trigger WHERE tgrelid = CAST(:t AS regclass) AND tgname = :name"
+        ), {"t": table, "name": KEY_TRIGGER}).scalar():
+            connection.execute(text(key_trigger_sql(table)))
+        stale = new_keys + (["item_key"] if columns.get("item_key") == "YES" else [])
+        stale = [key_column for key_column in stale if DICTIONARIES[key_column][1] in columns]
+        if stale:
+            for statement in backfill_sql(table, stale):
+                connection.execute(text(statement))
+        if columns.get("item_key", "YES") == "YES":
+            connection.execute(text(f"ALTER TABLE {table} ALTER COLUMN item_key SET NOT NULL"))
+            logger.info(f"🔑 {table}.item_key encoded and made NOT NULL")
+        for source in replaced_columns(table):
+            if source in columns:
+                # The business view reads the text column - rebuilt below on the key
+                connection.execute(text(f"DROP MATERIALIZED VIEW IF EXISTS {view}"))
+                connection.execute(text(f"ALTER TABLE {table} DROP COLUMN {source}"))
+                added.append(f"{table}.{source} -> dictionary")
+    if not added:
+        return
+
+    if view_exists:
+        connection.execute(text(f"DROP MATERIALIZED VIEW IF EXISTS {view}"))
+        for statement in BusinessIntelligenceView.get_materialized_view_sql():
+            connection.execute(text(statement))
+    logger.info(f"🔑 Dictionary encoding migrated ({', '.join(added)}), existing rows encoded")
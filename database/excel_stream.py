@@ -0,0 +1,102 @@
+import os
+from typing import Iterator, Optional
+
+import pandas as pd
+
+from database.bulk_loader import clean_column_name
+
+
+STREAM_BATCH_ROWS = int(os.getenv("ANARIX_STREAM_BATCH_ROWS", "50000"))
+# Workbooks at least this big are streamed instead of read whole with pd.read_excel
+STREAM_THRESHOLD_MB = float(os.getenv("ANARIX_STREAM_THRESHOLD_MB", "20"))
+
+
+def should_stream(path: str, threshold_mb: float = STREAM_THRESHOLD_MB) -> bool:
+    return os.path.getsize(path) >= threshold_mb * 1024 * 1024
+
+
+def _row_parser():
+    """
+    openpyxl's read-only sheet parser, except parsed <row> elements are detached from <sheetData>
+    (openpyxl only clears them, which still costs ~85 bytes per row for the whole sheet)
+    Built on openpyxl internals (tested with 3.1) - None when they are not there
+    """
+    try:
+        from openpyxl.worksheet._reader import DATA_TAG, ROW_TAG, WorkSheetParser
+        from openpyxl.xml.functions import iterparse
+    except ImportError:
+        return None
+
+    class RowParser(WorkSheetParser):
+        def parse(self):
+            sheet_data = None
+            for event, element in iterparse(self.source, events=("start", "end")):
+                if event == "start":
+                    if element.tag == DATA_TAG:
+                        sheet_data = element
+                elif element.tag == ROW_TAG:
+                    yield self.parse_row(element)
+                    element.clear()
+                    if sheet_data is not None:
+                        sheet_data.remove(element)  # always the first child - O(1)
+
+    return RowParser
+
+
+_INTERNALS = {"worksheet": ("_get_source", "_shared_strings"), "workbook": ("epoch", "_date_formats", "_timedelta_formats")}
+
+
+def _sheet_rows(workbook, worksheet) -> Iterator[list]:
+    """
+    Cell values of each sheet row, in column order
+    RowParser when this openpyxl version has the internals it needs, else the public (slower
+    to free memory, same values) read-only iter_rows
+    """
+    parser_class = _row_parser()
+    if parser_class is None or not all(hasattr(obj, name) for obj, names in
+                                       ((worksheet, _INTERNALS["worksheet"]), (workbook, _INTERNALS["workbook"]))
+                                       for name in names):
+        for values in worksheet.iter_rows(values_only=True):
+            yield list(values)
+        return
+    with worksheet._get_source() as source:
+        parser = parser_class(source, worksheet._shared_strings, data_only=True, epoch=workbook.epoch,
+                              date_formats=workbook._date_formats, timedelta_formats=workbook._timedelta_formats)
+        for _, cells in parser.parse():
+            values = [None] * (cells[-1]["column"] if cells else 0)
+            for cell in cells:
+                values[cell["column"] - 1] = cell["value"]
+            yield values
+
+
+def iter_workbook_batches(path: str, batch_rows: int = STREAM_BATCH_ROWS,
+                          sheet: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    Yield the first (or named) sheet as DataFrames of at most batch_rows rows
+    openpyxl read-only mode parses the sheet XML incrementally, so memory stays at one batch
+    regardless of workbook size; headers are cleaned like clean_column_names
+    """
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.worksheets[0]
+        rows = _sheet_rows(workbook, worksheet)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [clean_column_name(col) for col in header]
+        width = len(columns)
+        batch = []
+        for values in rows:
+            row = values[:width] + [None] * (width - len(values))
+            if all(value is None for value in row):
+                continue  # formatted-but-empty rows
+            batch.append(row)
+            if len(batch) >= batch_rows:
+                yield pd.DataFrame.from_records(batch, columns=columns)
+                batch = []
+        if batch:
+            yield pd.DataFrame.from_records(batch, columns=columns)
+    finally:
+        workbook.close()
@@ -0,0 +1,315 @@
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+
+import asyncpg
+import pandas as pd
+
+from database.bulk_loader import copy_batches, copy_dataframe
+from database.connection import DATABASE_URL, create_tables, ingest_lock
+from database.delta import apply_delta, create_stage
+from database.dictionary import KeyEncoder
+from database.excel_stream import STREAM_BATCH_ROWS, iter_workbook_batches, should_stream
+from database.parquet_cache import parquet_cache, read_workbook_cached
+from database.partitions import PARTITIONED_TABLES, ensure_partitions, prepare_partitions_for_reload
+from database.post_ingest import post_ingest_hooks
+from database.table_swap import build_shadow_indexes, create_shadow, create_shadow_view, drop_shadows, swap_in
+
+
+logger = logging.getLogger(__name__)
+
+# Table -> workbook, in the directory the ingest runs from
+WORKBOOKS = {
+    "ad_sales": "Copy of Product-Level Ad Sales and Metrics (mapped).xlsx",
+    "total_sales": "Copy of Product-Level Total Sales and Metrics (mapped).xlsx",
+    "eligibility": "Copy of Product-Level Eligibility Table (mapped).xlsx",
+}
+
+
+def parse_workbook(path: str, use_cache: bool = True):
+    """
+    Worker-process side: XML parsing is CPU-bound, so each workbook gets its own process
+    An unchanged workbook is read from its Parquet conversion instead (database.parquet_cache)
+    """
+    return read_workbook_cached(path, use_cache)
+
+
+INGEST_MODES = ("replace", "delta")
+
+
+def stream_load_table(dsn: str, table: str, path: str, batch_rows: int = STREAM_BATCH_ROWS,
+                      mode: str = "replace", delete_missing: bool = True, use_cache: bool = True,
+                      swap: bool = True):
+    """Worker-process side of streaming mode: read and COPY batch by batch over the worker's own connection"""
+    return asyncio.run(_stream_load_table(dsn, table, path, batch_rows, mode, delete_missing, use_cache, swap))
+
+
+async def _stream_load_table(dsn, table, path, batch_rows, mode, delete_missing, use_cache, swap):
+    status = {"cache": "off"}
+    batches = (parquet_cache.iter_batches(path, batch_rows, status) if use_cache
+               else iter_workbook_batches(path, batch_rows))
+    report = await load_batches(dsn, table, batches, mode, delete_missing, swap)
+    report["cache"] = status["cache"]
+    return report
+
+
+async def load_batches(dsn: str, table: str, batches, mode: str = "replace", delete_missing: bool = True,
+                       swap: bool = True) -> Dict[str, Any]:
+    """
+    COPY an iterable of cleaned DataFrames into table over a new connection, in one transaction
+    (swap: into the <table>_new shadow; delta: via a stage) - the streaming path's loader
+    """
+    conn = await asyncpg.connect(dsn)
+    encoder = KeyEncoder(dsn)
+    try:
+        async with conn.transaction():
+            if mode == "delta":
+                stage = await create_stage(conn, table)
+                report = await copy_batches(conn, table, batches, target=stage, encoder=encoder)
+                report["changes"] = await apply_delta(conn, table, stage, delete_missing)
+                return report
+            target = await create_shadow(conn, table) if swap else table
+
+            async def create_batch_partitions(batch):
+                dates = pd.to_datetime(batch['date'], errors='coerce').dropna()
+                if len(dates):
+                    await ensure_partitions(conn, target, dates.min(), dates.max())
+
+            before_copy = create_batch_partitions if table in PARTITIONED_TABLES else None
+            if not swap:
+                if table in PARTITIONED_TABLES:
+                    # Months are only known batch by batch: clear everything, create partitions as batches arrive
+                    await prepare_partitions_for_reload(conn, table, [])
+                else:
+                    await conn.execute(f"DELETE FROM {table}")
+            return await copy_batches(conn, table, batches, target=target, before_copy=before_copy,
+                                      encoder=encoder)
+    finally:
+        await encoder.close()
+        await conn.close()
+
+
+class IngestPipeline:
+    """
+    Excel -> PostgreSQL reload for the three business tables
+    Workbooks are parsed in a process pool; each table is cleared and COPY-loaded over its own
+    connection as soon as its workbook is parsed, then the post-ingest hooks run once.
+    Large workbooks (stream=None: by file size) are streamed in row batches inside the worker
+    instead, so memory stays bounded by batch_rows.
+    With swap (mode="replace"), tables are loaded into shadow tables instead and swapped in
+    together after indexing (database.table_swap), so readers never see a half-loaded table.
+    mode="delta" stages each workbook and applies only the changed rows (database.delta);
+    when nothing changed, the post-ingest hooks are skipped.
+    use_cache reads unchanged workbooks from their cached Parquet conversion (database.parquet_cache)
+    Runs are serialized across processes by the ingest advisory lock (database.connection.ingest_lock)
+    """
+
+    def __init__(self, workbooks: Dict[str, str] = None, base_dir: str = ".",
+                 workers: Optional[int] = None, dsn: str = DATABASE_URL, source: str = "ingest",
+                 stream: Optional[bool] = None, batch_rows: int = STREAM_BATCH_ROWS,
+                 mode: str = "replace", delete_missing: bool = True, use_cache: bool = True,
+                 swap: bool = True):
+        if mode not in INGEST_MODES:
+            raise ValueError(f"Unknown ingest mode {mode!r} - expected one of {INGEST_MODES}")
+        self.workbooks = workbooks or WORKBOOKS
+        self.base_dir = base_dir
+        self.workers = workers or min(len(self.workbooks), os.cpu_count() or 1)
+        self.dsn = dsn
+        self.source = source
+        self.stream = stream
+        self.batch_rows = batch_rows
+        self.mode = mode
+        self.delete_missing = delete_missing
+        self.use_cache = use_cache
+        self.swap = swap and mode == "replace"
+        self.timings: Dict[str, float] = {}
+        self.tables: Dict[str, Dict[str, Any]] = {}
+
+    async def run(self) -> Dict[str, Any]:
+        """One reload at a time across processes: waits for a running ingest to finish first"""
+        async with ingest_lock(self.dsn):
+            return await self._run()
+
+    async def _run(self) -> Dict[str, Any]:
+        start = time.perf_counter()
+        paths = {table: os.path.join(self.base_dir, name) for table, name in self.workbooks.items()}
+        missing = [path for path in paths.values() if not os.path.exists(path)]
+        if missing:
+            for path in missing:
+                print(f"❌ File not found: {path}")
+            return {"success": False, "missing": missing}
+
+        stage = time.perf_counter()
+        await asyncio.to_thread(create_tables)  # tables, partitions and indexes (noop when present)
+        self.timings["schema"] = time.perf_counter() - stage
+
+        stage = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                await asyncio.gather(*(self._ingest_table(loop, pool, table, path) for table, path in paths.items()))
+        except Exception:
+            if self.swap:
+                conn = await asyncpg.connect(self.dsn)
+                try:
+                    await drop_shadows(conn, self.workbooks)  # live tables were never touched
+                finally:
+                    await conn.close()
+            raise
+        self.timings["parse+load"] = time.perf_counter() - stage
+
+        changed = self.mode == "replace" or any(
+            sum(report["changes"][op] for op in ("inserted", "updated", "deleted")) for report in self.tables.values()
+        )
+        conn = await asyncpg.connect(self.dsn)
+        try:
+            if self.swap:
+                stage = time.perf_counter()
+                for table in self.workbooks:
+                    await build_shadow_indexes(conn, table)
+                await create_shadow_view(conn, self.workbooks)
+                self.timings["index+view"] = time.perf_counter() - stage
+
+                stage = time.perf_counter()
+                await swap_in(conn, self.workbooks)
+                self.timings["swap"] = time.perf_counter() - stage
+            hooks = None
+            if changed:
+                # ANALYZE, view refresh, data version, snapshots and NOTIFY - each timed (database.post_ingest)
+                hooks = await post_ingest_hooks.run(conn, self.source, self.workbooks, swapped=self.swap)
+                for name, step in hooks["steps"].items():
+                    if step["status"] != "skipped":
+                        self.timings[name] = step["seconds"]
+            else:
+                print("✅ No rows changed - view, snapshots and caches left as they are")
+            counts = {table: await conn.fetchval(f"SELECT COUNT(*) FROM {table}") for table in self.workbooks}
+        finally:
+            await conn.close()
+
+        self.timings["total"] = time.perf_counter() - start
+        self._print_report(counts)
+        failed_hooks = hooks["failed"] if hooks else []
+        return {
+            # The tables are loaded either way; a failed hook means stale views, snapshots or caches
+            "success": not failed_hooks,
+            "mode": self.mode,
+            "changed": changed,
+            "data_version": hooks["data_version"] if hooks else None,
+            "hooks": hooks["steps"] if hooks else {},
+            "failed_hooks": failed_hooks,
+            "tables": self.tables,
+            "counts": counts,
+            "timings": {name: round(seconds, 3) for name, seconds in self.timings.items()},
+        }
+
+    async def _ingest_table(self, loop, pool, table, path):
+        stream = self.stream if self.stream is not None else should_stream(path)
+        if stream:
+            print(f"🌊 Streaming {os.path.basename(path)} in batches of {self.batch_rows:,} rows...")
+            load_start = time.perf_counter()
+            report = await loop.run_in_executor(pool, stream_load_table, self.dsn, table, path, self.batch_rows,
+                                                self.mode, self.delete_missing, self.use_cache, self.swap)
+            report["parse_seconds"] = report["read_seconds"]
+            report["load_seconds"] = round(time.perf_counter() - load_start - report["read_seconds"], 3)
+            self.tables[table] = report
+            return
+
+        print(f"📂 Parsing {os.path.basename(path)}...")
+        df, hit, parse_seconds = await loop.run_in_executor(pool, parse_workbook, path, self.use_cache)
+
+        load_start = time.perf_counter()
+        conn = await asyncpg.connect(self.dsn)
+        encoder = KeyEncoder(self.dsn)  # item_id/message -> integer keys (database.dictionary)
+        try:
+            async with conn.transaction():
+                if self.mode == "delta":
+                    stage = await create_stage(conn, table)
+                    report = await copy_dataframe(conn, table, df, target=stage, encoder=encoder)
+                    report["changes"] = await apply_delta(conn, table, stage, self.delete_missing)
+                elif self.swap:
+                    shadow = await create_shadow(conn, table)
+                    if table in PARTITIONED_TABLES:
+                        dates = pd.to_datetime(df['date'], errors='coerce').dropna()
+                        if len(dates):
+                            await ensure_partitions(conn, shadow, dates.min(), dates.max())
+                    report = await copy_dataframe(conn, table, df, target=shadow, encoder=encoder)
+                # Clear (partition-level TRUNCATE for the date-partitioned tables) and load atomically
+                elif table in PARTITIONED_TABLES:
+                    months = pd.to_datetime(df['date'], errors='coerce').dt.to_period('M').dropna().unique()
+                    await prepare_partitions_for_reload(conn, table, months)
+                    report = await copy_dataframe(conn, table, df, encoder=encoder)
+                else:
+                    await conn.execute(f"DELETE FROM {table}")
+                    report = await copy_dataframe(conn, table, df, encoder=encoder)
+        finally:
+            await encoder.close()
+            await conn.close()
+
+        report["cache"] = ("hit" if hit else "miss") if self.use_cache else "off"
+        report["parse_seconds"] = round(parse_seconds, 3)
+        report["load_seconds"] = round(time.perf_counter() - load_start, 3)
+        self.tables[table] = report
+
+    def _print_report(self, counts):
+        print("\n⏱️ INGEST TIMINGS")
+        print("=" * 60)
+        for table, report in self.tables.items():
+            print(f"   {table:<12} parse {report['parse_seconds']:>6.2f}s | load {report['load_seconds']:>6.2f}s | "
+                  f"{report['rows']:>9,} rows | {report['rejected']:,} rejected | cache {report['cache']}")
+            if "changes" in report:
+                changes = report["changes"]
+                print(f"   {'':<12} +{changes['inserted']:,} inserted | ~{changes['updated']:,} updated | "
+                      f"-{changes['deleted']:,} deleted | {changes['unchanged']:,} unchanged")
+        for name, seconds in self.timings.items():
+            print(f"   {name:<12} {seconds:>6.2f}s")
+        print("\n📊 Row counts: " + ", ".join(f"{table} {count:,}" for table, count in counts.items()))
+
+
+async def run_ingest(base_dir: str = ".", workers: Optional[int] = None, source: str = "ingest",
+                     stream: Optional[bool] = None, batch_rows: int = STREAM_BATCH_ROWS,
+                     mode: str = "replace", delete_missing: bool = True, use_cache: bool = True,
+                     swap: bool = True) -> Dict[str, Any]:
+    return await IngestPipeline(base_dir=base_dir, workers=workers, source=source, stream=stream,
+                                batch_rows=batch_rows, mode=mode, delete_missing=delete_missing,
+                                use_cache=use_cache, swap=swap).run()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Reload ad_sales, total_sales and eligibility from the Excel workbooks")
+    parser.add_argument("--dir", default=".", help="directory holding the workbooks")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: one per workbook)")
+    parser.add_argument("--stream", dest="stream", action="store_true", default=None,
+                        help="always stream workbooks in row batches (default: by file size)")
+    parser.add_argument("--no-stream", dest="stream", action="store_false", help="always read workbooks whole")
+    parser.add_argument("--batch-rows", type=int, default=STREAM_BATCH_ROWS)
+    parser.add_argument("--mode", choices=INGEST_MODES, default="replace",
+                        help="replace: clear and reload; delta: apply only inserted/changed/removed rows")
+    parser.add_argument("--keep-missing", action="store_true",
+                        help="delta mode: keep rows whose key is no longer in the workbook")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always parse the workbooks (ignore and do not write the Parquet cache)")
+    parser.add_argument("--in-place", action="store_true",
+                        help="replace mode: truncate and reload the live tables instead of swapping in shadow tables")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    result = await run_ingest(args.dir, args.workers, stream=args.stream, batch_rows=args.batch_rows,
+                              mode=args.mode, delete_missing=not args.keep_missing, use_cache=not args.no_cache,
+                              swap=not args.in_place)
+    if result["success"]:
+        print("\n✅ Ingest complete")
+    elif result.get("failed_hooks"):
+        print(f"\n❌ Tables loaded, but post-ingest hooks failed: {', '.join(result['failed_hooks'])}")
+    else:
+        print("\n❌ Ingest failed")
+    if not result["success"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
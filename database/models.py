@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, Date, DateTime, Text, Index, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Numeric, Date, DateTime, Text, Index, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -7,14 +7,16 @@ Base = declarative_base()
 
 class AdSales(Base):
     """
-    Ad Sales data from Excel conversion - 3,696 records
+    Ad Sales data from Excel conversion
     Primary table for advertising performance metrics
+    Range-partitioned by month on date (see database/partitions.py)
     """
     __tablename__ = "ad_sales"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     item_id = Column(String(100), index=True, nullable=False)  # Primary join key for business intelligence
-    date = Column(Date, index=True)  # Indexed for time-based analysis
+    item_key = Column(Integer, nullable=False)  # products.item_key - integer join key, filled by trigger if omitted (database/dictionary.py)
+    date = Column(Date, primary_key=True, index=True)  # Partition key - must be part of the primary key
     ad_sales = Column(Numeric(15, 2), nullable=False, default=0)  # Advertising revenue from Excel
     impressions = Column(Integer, nullable=False, default=0)  # Ad impression counts
     ad_spend = Column(Numeric(12, 2), nullable=False, default=0)  # Advertising investment
@@ -25,20 +27,24 @@ class AdSales(Base):
     # Performance optimization indexes for complex queries
     __table_args__ = (
         Index('idx_ad_sales_item_date', 'item_id', 'date'),
+        Index('idx_ad_sales_key_date', 'item_key', 'date'),
         Index('idx_ad_sales_performance', 'ad_sales', 'ad_spend'),
         Index('idx_ad_sales_engagement', 'clicks', 'impressions'),
+        {'postgresql_partition_by': 'RANGE (date)'},
     )
 
 class TotalSales(Base):
     """
-    Total Sales data from Excel conversion - 702 records
+    Total Sales data from Excel conversion
     Overall product revenue and unit sales
+    Range-partitioned by month on date (see database/partitions.py)
     """
     __tablename__ = "total_sales"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     item_id = Column(String(100), index=True, nullable=False)  # Foreign key to ad_sales for JOINs
-    date = Column(Date, index=True)  # Transaction date from Excel
+    item_key = Column(Integer, nullable=False)  # products.item_key - integer join key
+    date = Column(Date, primary_key=True, index=True)  # Partition key - must be part of the primary key
     total_sales = Column(Numeric(15, 2), nullable=False, default=0)  # Total product revenue
     total_units_ordered = Column(Integer, nullable=False, default=0)  # Total units sold
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -46,29 +52,66 @@ class TotalSales(Base):
     # Performance optimization indexes for business intelligence
     __table_args__ = (
         Index('idx_total_sales_item_date', 'item_id', 'date'),
+        Index('idx_total_sales_key_date', 'item_key', 'date'),
         Index('idx_total_sales_revenue', 'total_sales', 'total_units_ordered'),
+        {'postgresql_partition_by': 'RANGE (date)'},
     )
 
 class Eligibility(Base):
     """
-    Eligibility data from Excel conversion - 4,381 records
+    Eligibility data from Excel conversion
     Product compliance and availability status
     """
     __tablename__ = "eligibility"
     
     id = Column(Integer, primary_key=True, index=True)
     item_id = Column(String(100), index=True, nullable=False)  # Foreign key for multi-table analysis
+    item_key = Column(Integer, nullable=False)  # products.item_key - integer join key
     eligibility_datetime_utc = Column(DateTime, index=True)  # Eligibility check timestamp
     eligibility = Column(String(50), nullable=False, index=True)  # 'eligible'/'ineligible' status
-    message = Column(Text)  # Detailed eligibility reason from Excel
+    message_id = Column(Integer)  # eligibility_messages.message_id - the reason text from Excel, stored once
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
     
     # Business intelligence indexes
     __table_args__ = (
         Index('idx_eligibility_item_status', 'item_id', 'eligibility'),
         Index('idx_eligibility_datetime', 'eligibility_datetime_utc'),
+        Index('idx_eligibility_key_datetime', 'item_key', 'eligibility_datetime_utc'),
     )
 
+class Product(Base):
+    """
+    Product dimension - item_id -> compact integer item_key
+    Filled by ingestion and the encode_item_key trigger (database/dictionary.py); keys only grow and are never renumbered.
+    Fact tables keep item_id next to item_key, so SQL written against item_id keeps working
+    """
+    __tablename__ = "products"
+
+    item_key = Column(Integer, primary_key=True, autoincrement=True)
+    item_id = Column(String(100), unique=True, nullable=False)
+
+class EligibilityMessage(Base):
+    """
+    Dictionary of the (highly repetitive) eligibility messages -> message_id
+    eligibility stores only the key; read the text by joining on message_id
+    """
+    __tablename__ = "eligibility_messages"
+
+    message_id = Column(Integer, primary_key=True, autoincrement=True)
+    message = Column(Text, unique=True, nullable=False)
+
+class DataVersion(Base):
+    """
+    Single-row data version counter
+    Bumped by the post-ingest hooks (database/post_ingest.py) whenever table data changes
+    """
+    __tablename__ = "data_version"
+
+    id = Column(Integer, primary_key=True, default=1, autoincrement=False)
+    version = Column(BigInteger, nullable=False, default=0)
+    source = Column(String(100))  # ingest, rollback, ...
+    changed_at = Column(DateTime)
+
 # Legacy table maintained for backward compatibility
 class SalesData(Base):
     """
@@ -93,25 +136,93 @@ class BusinessIntelligenceView:
     Virtual view class for complex business intelligence queries
     Defines the relationships between your Excel-converted tables
     """
+    VIEW_NAME = "business_intelligence_complete"
+
     @staticmethod
-    def get_comprehensive_join_sql():
-        return """
-        SELECT 
-            COALESCE(a.item_id, t.item_id, e.item_id) as item_id,
-            a.ad_sales, a.ad_spend, a.clicks, a.impressions, a.units_sold,
-            t.total_sales, t.total_units_ordered,
-            e.eligibility, e.message, e.eligibility_datetime_utc
-        FROM ad_sales a
-        FULL OUTER JOIN total_sales t ON a.item_id = t.item_id
-        FULL OUTER JOIN eligibility e ON COALESCE(a.item_id, t.item_id) = e.item_id
+    def get_comprehensive_join_sql(tables=None):
+        """
+        Cross-table join at (item_id, date) grain.
+        Each table is aggregated per item and day before joining, so an item
+        with N ad rows and M sales rows yields one row per day, not N x M.
+        Grouping and joins run on the integer item_key; item_id comes from products
+        and the eligibility message from eligibility_messages.
+        tables maps table name -> relation to read instead (shadow tables during a swap reload)
         """
+        tables = {**{name: name for name in ("ad_sales", "total_sales", "eligibility")}, **(tables or {})}
+        return f"""
+        WITH ad AS (
+            SELECT item_key, date,
+                   SUM(ad_sales) AS ad_sales,
+                   SUM(impressions) AS impressions,
+                   SUM(ad_spend) AS ad_spend,
+                   SUM(clicks) AS clicks,
+                   SUM(units_sold) AS units_sold
+            FROM {tables["ad_sales"]}
+            GROUP BY item_key, date
+        ),
+        ts AS (
+            SELECT item_key, date,
+                   SUM(total_sales) AS total_sales,
+                   SUM(total_units_ordered) AS total_units_ordered
+            FROM {tables["total_sales"]}
+            GROUP BY item_key, date
+        ),
+        el AS (
+            -- Latest eligibility snapshot per item and day
+            SELECT DISTINCT ON (item_key, eligibility_datetime_utc::date)
+                   item_key,
+                   eligibility_datetime_utc::date AS date,
+                   eligibility,
+                   message_id,
+                   eligibility_datetime_utc
+            FROM {tables["eligibility"]}
+            ORDER BY item_key, eligibility_datetime_utc::date, eligibility_datetime_utc DESC
+        )
+        SELECT
+            p.item_id,
+            p.item_key,
+            COALESCE(ad.date, ts.date, el.date) AS date,
+            ad.ad_sales, ad.impressions, ad.ad_spend, ad.clicks, ad.units_sold,
+            ts.total_sales, ts.total_units_ordered,
+            el.eligibility, m.message, el.eligibility_datetime_utc
+        FROM ad
+        FULL OUTER JOIN ts ON ts.item_key = ad.item_key AND ts.date = ad.date
+        FULL OUTER JOIN el ON el.item_key = COALESCE(ad.item_key, ts.item_key)
+                          AND el.date = COALESCE(ad.date, ts.date)
+        JOIN products p ON p.item_key = COALESCE(ad.item_key, ts.item_key, el.item_key)
+        LEFT JOIN eligibility_messages m ON m.message_id = el.message_id
+        """
+
+    @classmethod
+    def get_materialized_view_sql(cls, view_name=None, tables=None):
+        """DDL for the pre-aggregated business_intelligence_complete materialized view"""
+        view_name = view_name or cls.VIEW_NAME
+        return [
+            f"CREATE MATERIALIZED VIEW {view_name} AS {cls.get_comprehensive_join_sql(tables)} WITH DATA",
+            # Unique index is required for REFRESH MATERIALIZED VIEW CONCURRENTLY
+            f"CREATE UNIQUE INDEX idx_{view_name}_item_date ON {view_name} (item_id, date)",
+            f"CREATE INDEX idx_{view_name}_date ON {view_name} (date)",
+        ]
+
+    @classmethod
+    def get_refresh_sql(cls, concurrently=True):
+        """Refresh statement; CONCURRENTLY keeps the view readable during refresh"""
+        mode = "CONCURRENTLY " if concurrently else ""
+        return f"REFRESH MATERIALIZED VIEW {mode}{cls.VIEW_NAME}"
     
     @staticmethod
-    def get_table_info():
+    def get_table_info(stats=None):
+        """Table metadata; record counts come from TableStatsService.get() (None if unknown)"""
+        stats = stats or {}
+
+        def records(table):
+            return stats[table]["estimated_rows"] if table in stats else None
+
+        counts = [records(t) for t in ("ad_sales", "total_sales", "eligibility")]
         return {
-            "ad_sales": {"records": 3696, "primary_metrics": ["ad_sales", "ad_spend", "clicks", "impressions"]},
-            "total_sales": {"records": 702, "primary_metrics": ["total_sales", "total_units_ordered"]},
-            "eligibility": {"records": 4381, "primary_metrics": ["eligibility", "message"]},
-            "total_records": 8779,
+            "ad_sales": {"records": counts[0], "primary_metrics": ["ad_sales", "ad_spend", "clicks", "impressions"]},
+            "total_sales": {"records": counts[1], "primary_metrics": ["total_sales", "total_units_ordered"]},
+            "eligibility": {"records": counts[2], "primary_metrics": ["eligibility", "message"]},
+            "total_records": sum(counts) if None not in counts else None,
             "join_key": "item_id"
         }
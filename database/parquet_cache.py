@@ -0,0 +1,186 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import pandas as pd
+
+from database.bulk_loader import clean_column_names
+from database.excel_stream import STREAM_BATCH_ROWS, iter_workbook_batches
+
+
+logger = logging.getLogger(__name__)
+
+PARQUET_CACHE_DIR = os.getenv("ANARIX_PARQUET_CACHE_DIR", os.path.join("data", "parquet_cache"))
+
+
+def _pyarrow():
+    """pyarrow is optional (workbooks are then parsed on every run) and imported on first use"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        return None
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParquetCache:
+    """
+    Excel workbook -> ZSTD Parquet conversion, done once per workbook content
+    Entries are keyed by the workbook's SHA-256; a small <workbook>.json sidecar remembers
+    size/mtime -> hash, so an untouched file is not even re-hashed. Hits are read with
+    memory-mapped Parquet columns instead of re-parsing the sheet XML.
+    One sidecar per workbook, so parallel ingest workers never write the same file.
+    """
+
+    def __init__(self, cache_dir: str = PARQUET_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _meta_path(self, path: str) -> str:
+        return os.path.join(self.cache_dir, os.path.basename(path) + ".json")
+
+    def _parquet_path(self, path: str, sha256: str) -> str:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        return os.path.join(self.cache_dir, f"{stem}.{sha256[:16]}.parquet")
+
+    def _read_meta(self, path: str) -> Dict[str, Any]:
+        try:
+            with open(self._meta_path(path)) as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return {}
+
+    def key(self, path: str) -> str:
+        """Content hash of path - reused from the sidecar while size and mtime are unchanged"""
+        stat = os.stat(path)
+        meta = self._read_meta(path)
+        if meta.get("size") == stat.st_size and meta.get("mtime_ns") == stat.st_mtime_ns:
+            return meta["sha256"]
+        return file_hash(path)
+
+    def lookup(self, path: str) -> Tuple[str, Optional[str]]:
+        """-> (content hash, cached Parquet path or None)"""
+        sha256 = self.key(path)
+        parquet = self._parquet_path(path, sha256)
+        if not os.path.exists(parquet):
+            return sha256, None
+        if self._read_meta(path).get("mtime_ns") != os.stat(path).st_mtime_ns:
+            self._write_meta(path, sha256, parquet)  # touched but identical: skip the re-hash next time
+        return sha256, parquet
+
+    def _write_meta(self, path: str, sha256: str, parquet: str):
+        stat = os.stat(path)
+        meta = {"source": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                "sha256": sha256, "parquet": os.path.basename(parquet)}
+        meta_tmp = self._meta_path(path) + ".tmp"
+        with open(meta_tmp, "w") as handle:
+            json.dump(meta, handle, indent=2)
+        os.replace(meta_tmp, self._meta_path(path))
+
+    def _commit(self, path: str, sha256: str, tmp: str):
+        """Swap the finished Parquet file in, record it in the sidecar and drop older versions"""
+        parquet = self._parquet_path(path, sha256)
+        os.replace(tmp, parquet)
+        self._write_meta(path, sha256, parquet)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(stem + ".") and name.endswith(".parquet") and name != os.path.basename(parquet):
+                os.remove(os.path.join(self.cache_dir, name))
+
+    def _tmp_path(self, path: str) -> str:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return os.path.join(self.cache_dir, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+
+    def read(self, path: str) -> Tuple[pd.DataFrame, bool]:
+        """Whole workbook as a cleaned DataFrame -> (df, cache hit)"""
+        pyarrow = _pyarrow()
+        if pyarrow is None:
+            return clean_column_names(pd.read_excel(path)), False
+
+        sha256, parquet = self.lookup(path)
+        if parquet:
+            return pyarrow.parquet.read_table(parquet, memory_map=True).to_pandas(), True
+
+        df = clean_column_names(pd.read_excel(path))
+        tmp = self._tmp_path(path)
+        try:
+            df.to_parquet(tmp, engine="pyarrow", compression="zstd", index=False)
+            self._commit(path, sha256, tmp)
+        except (pyarrow.ArrowException, OSError) as e:
+            # Mixed-type object columns cannot be written as Parquet - the load still goes ahead
+            logger.warning(f"⚠️ Parquet cache skipped for {os.path.basename(path)}: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return df, False
+
+    def iter_batches(self, path: str, batch_rows: int = STREAM_BATCH_ROWS,
+                     status: Optional[Dict[str, Any]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Streaming counterpart of read(): hits yield Parquet record batches, misses stream the
+        workbook (iter_workbook_batches) and write each batch to the cache file on the way through
+        status (optional dict) receives "cache": "hit" / "miss" once the first batch is requested
+        """
+        status = status if status is not None else {}
+        status["cache"] = "miss"
+        pyarrow = _pyarrow()
+        if pyarrow is None:
+            yield from iter_workbook_batches(path, batch_rows)
+            return
+
+        sha256, parquet = self.lookup(path)
+        if parquet:
+            status["cache"] = "hit"
+            source = pyarrow.parquet.ParquetFile(parquet, memory_map=True)
+            for batch in source.iter_batches(batch_size=batch_rows):
+                yield batch.to_pandas()
+            return
+
+        tmp = self._tmp_path(path)
+        writer = None
+        caching = True
+        complete = False
+        try:
+            for df in iter_workbook_batches(path, batch_rows):
+                if caching:
+                    try:
+                        table = pyarrow.Table.from_pandas(df, schema=writer.schema if writer else None,
+                                                          preserve_index=False)
+                        if writer is None:
+                            writer = pyarrow.parquet.ParquetWriter(tmp, table.schema, compression="zstd")
+                        writer.write_table(table)
+                    except (pyarrow.ArrowException, OSError) as e:
+                        # A later batch that does not fit the first batch's types: stop caching, keep loading
+                        logger.warning(f"⚠️ Parquet cache skipped for {os.path.basename(path)}: {e}")
+                        caching = False
+                yield df
+            complete = True
+        finally:
+            if writer is not None:
+                writer.close()
+            if complete and caching and writer is not None:
+                self._commit(path, sha256, tmp)
+            elif os.path.exists(tmp):
+                os.remove(tmp)
+
+
+parquet_cache = ParquetCache()
+
+
+def read_workbook_cached(path: str, use_cache: bool = True) -> Tuple[pd.DataFrame, bool, float]:
+    """-> (cleaned DataFrame, cache hit, seconds) - the ingest worker's parse step"""
+    start = time.perf_counter()
+    if use_cache:
+        df, hit = parquet_cache.read(path)
+    else:
+        df, hit = clean_column_names(pd.read_excel(path)), False
+    return df, hit, time.perf_counter() - start
@@ -0,0 +1,122 @@
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import asyncpg
+
+from database.connection import DATABASE_URL, notify_data_changed, refresh_business_view
+from services.columnar_engine import export_snapshots
+
+
+logger = logging.getLogger(__name__)
+
+INGEST_TABLES = ("ad_sales", "total_sales", "eligibility")
+
+Hook = Callable[[Any, Dict[str, Any]], Awaitable[Any]]
+
+
+async def analyze_tables(conn, context):
+    """Planner statistics for the reloaded tables (shadow tables were analyzed before their swap)"""
+    if context.get("swapped"):
+        return "skipped"
+    await conn.execute(f"ANALYZE {', '.join(context['tables'])}")
+
+
+async def refresh_view(conn, context):
+    """business_intelligence_complete - a swap already brought its own freshly built view"""
+    if context.get("swapped"):
+        return "skipped"
+    await refresh_business_view(conn, analyze=False)
+
+
+async def bump_data_version(conn, context):
+    """Increment the data_version row; the new number travels with the snapshots and the NOTIFY"""
+    context["data_version"] = await conn.fetchval("""
+        INSERT INTO data_version (id, version, source, changed_at) VALUES (1, 1, $1, now())
+        ON CONFLICT (id) DO UPDATE
+        SET version = data_version.version + 1, source = EXCLUDED.source, changed_at = EXCLUDED.changed_at
+        RETURNING version
+    """, context["source"])
+    return context["data_version"]
+
+
+async def export_columnar_snapshots(conn, context):
+    """Parquet snapshots for the columnar /query engine"""
+    await export_snapshots(conn, data_version=context.get("data_version"))
+
+
+async def broadcast_invalidation(conn, context):
+    """NOTIFY anarix_data_changed - API workers drop table stats and recompute KPIs"""
+    await notify_data_changed(conn, context["source"], context.get("data_version"))
+
+
+class PostIngestHooks:
+    """
+    Ordered chain of steps run once after table data changed (ingest, delta, rollback)
+    Each hook gets the connection and a shared context dict (source, tables, swapped, ...);
+    a failing hook is reported and the chain carries on, so the NOTIFY still goes out.
+    """
+
+    def __init__(self, hooks: Optional[List[Tuple[str, Hook]]] = None):
+        self.hooks: List[Tuple[str, Hook]] = list(hooks or [])
+
+    def register(self, name: str, hook: Hook, before: Optional[str] = None):
+        """Add a hook at the end, or in front of the named one"""
+        names = [existing for existing, _ in self.hooks]
+        position = names.index(before) if before in names else len(self.hooks)
+        self.hooks.insert(position, (name, hook))
+
+    async def run(self, conn, source: str = "ingest", tables=INGEST_TABLES, swapped: bool = False,
+                  **extra) -> Dict[str, Any]:
+        """-> {"data_version", "steps": {name: {"status", "seconds", ...}}}"""
+        context = {"source": source, "tables": list(tables), "swapped": swapped, **extra}
+        steps: Dict[str, Dict[str, Any]] = {}
+        for name, hook in self.hooks:
+            start = time.perf_counter()
+            try:
+                result = await hook(conn, context)
+                step = {"status": "skipped" if result == "skipped" else "ok"}
+            except Exception as e:
+                logger.error(f"❌ Post-ingest hook {name} failed: {e}")
+                step = {"status": "failed", "error": str(e)}
+            step["seconds"] = round(time.perf_counter() - start, 3)
+            steps[name] = step
+        failed = [name for name, step in steps.items() if step["status"] == "failed"]
+        logger.info(f"🪝 Post-ingest hooks for {source}: "
+                    + ", ".join(f"{name} {step['status']} ({step['seconds']:.2f}s)" for name, step in steps.items()))
+        return {"data_version": context.get("data_version"), "failed": failed, "steps": steps}
+
+
+post_ingest_hooks = PostIngestHooks([
+    ("analyze", analyze_tables),
+    ("refresh_view", refresh_view),
+    ("data_version", bump_data_version),
+    ("snapshots", export_columnar_snapshots),
+    ("notify", broadcast_invalidation),
+])
+
+
+async def main():
+    """Run the hook chain by hand, e.g. after editing table data directly in SQL"""
+    parser = argparse.ArgumentParser(description="Run the post-ingest hooks (ANALYZE, view, version, snapshots, NOTIFY)")
+    parser.add_argument("--source", default="manual")
+    args = parser.parse_args()
+
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        result = await post_ingest_hooks.run(conn, source=args.source)
+    finally:
+        await conn.close()
+    for name, step in result["steps"].items():
+        print(f"   {name:<12} {step['status']:<8} {step['seconds']:>6.2f}s {step.get('error', '')}")
+    print(f"\n✅ Data version {result['data_version']}" if not result["failed"] else "\n❌ Some hooks failed")
+    if result["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
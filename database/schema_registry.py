@@ -0,0 +1,173 @@
+import hashlib
+import logging
+import re
+from typing import Dict, List, Optional
+
+from database.models import Base, BusinessIntelligenceView
+
+
+logger = logging.getLogger(__name__)
+
+# Relations the LLM may query, in prompt order, with their conventional SQL aliases
+TABLES = ("ad_sales", "total_sales", "eligibility", "eligibility_messages")
+VIEWS = (BusinessIntelligenceView.VIEW_NAME,)
+ALIASES = {"ad_sales": "a", "total_sales": "t", "eligibility": "e", "eligibility_messages": "m"}
+
+# Bookkeeping columns that are never useful in an answer
+HIDDEN_COLUMNS = {"id", "created_at"}
+
+# Prompt annotations - structure comes from the catalog, these only add meaning
+COLUMN_NOTES = {
+    ("ad_sales", "item_id"): "Primary key for joins",
+    ("ad_sales", "item_key"): "Integer product key - fastest join column (same item as item_id)",
+    ("ad_sales", "ad_sales"): "Revenue from ads",
+    ("ad_sales", "ad_spend"): "Cost of ads",
+    ("ad_sales", "units_sold"): "Units sold via ads",
+    ("total_sales", "item_id"): "Foreign key for joins",
+    ("total_sales", "item_key"): "Integer product key - join on item_key = item_key",
+    ("total_sales", "total_sales"): "Total product revenue",
+    ("total_sales", "total_units_ordered"): "Total units sold",
+    ("eligibility", "item_id"): "Foreign key for joins",
+    ("eligibility", "item_key"): "Integer product key - join on item_key = item_key",
+    ("eligibility", "eligibility"): "Status: 'eligible' or 'ineligible'",
+    ("eligibility", "message_id"): "Reason for eligibility status - JOIN eligibility_messages m ON m.message_id = e.message_id",
+    ("eligibility_messages", "message"): "Eligibility reason text, one row per distinct message",
+}
+VIEW_NOTES = {
+    BusinessIntelligenceView.VIEW_NAME: [
+        "one row per item_id and date",
+        "All three tables summed per item and day, then joined on (item_id, date)",
+        "Prefer this view for questions that combine ad metrics, total sales and eligibility",
+    ],
+}
+
+
+def _display_type(raw: str) -> str:
+    """Catalog/SQLAlchemy type name -> the short form used in the prompt"""
+    raw = raw.lower().replace(", ", ",")
+    match = re.match(r"numeric\((\d+,\d+)\)", raw)
+    if match:
+        return f"DECIMAL({match.group(1)})"
+    if raw.startswith(("character varying", "varchar", "text")):
+        return "TEXT"
+    if raw.startswith(("timestamp", "datetime")):
+        return "TIMESTAMP"
+    return raw.upper()
+
+
+class SchemaRegistry:
+    """
+    Single source of truth for the queryable schema
+    Loaded once from the PostgreSQL catalog at startup (SQLAlchemy models until then);
+    renders the LLM prompt schema, drives SQL validation and fingerprints the schema
+    (checked against the columnar snapshot manifest, reported by the health endpoints)
+    """
+
+    def __init__(self):
+        self.relations: Dict[str, Dict[str, str]] = {}
+        self.source = None
+        self.fingerprint = None
+        self._load_from_models()
+
+    def _load_from_models(self):
+        relations = {}
+        for table in TABLES:
+            model = Base.metadata.tables.get(table)
+            if model is not None:
+                relations[table] = {
+                    c.name: _display_type(str(c.type)) for c in model.columns if c.name not in HIDDEN_COLUMNS
+                }
+        self._set(relations, "models")
+
+    async def load(self, conn):
+        """Read columns of the allowed tables/views (pg_attribute also covers materialized views)"""
+        rows = await conn.fetch("""
+            SELECT c.relname, a.attname, format_type(a.atttypid, a.atttypmod) AS data_type
+            FROM pg_attribute a
+            JOIN pg_class c ON c.oid = a.attrelid
+            WHERE c.relnamespace = 'public'::regnamespace
+              AND c.relname = ANY($1::text[])
+              AND a.attnum > 0 AND NOT a.attisdropped
+            ORDER BY c.relname, a.attnum
+        """, list(TABLES + VIEWS))
+        found: Dict[str, Dict[str, str]] = {}
+        for row in rows:
+            if row["attname"] not in HIDDEN_COLUMNS:
+                found.setdefault(row["relname"], {})[row["attname"]] = _display_type(row["data_type"])
+        relations = {name: found[name] for name in TABLES + VIEWS if name in found}
+        self._set(relations, "database")
+        logger.info(f"📐 Schema registry loaded: {len(relations)} relations, fingerprint {self.fingerprint}")
+
+    async def ensure_loaded(self):
+        """Load from the database once; keeps the model-derived schema if it is unreachable"""
+        if self.source == "database":
+            return
+        from database.connection import get_async_pool
+        pool = await get_async_pool()
+        if pool is None:
+            return
+        try:
+            async with pool.acquire() as conn:
+                await self.load(conn)
+        except Exception as e:
+            logger.warning(f"⚠️ Schema registry using model definitions: {e}")
+
+    def _set(self, relations, source):
+        self.relations = relations
+        self.source = source
+        canonical = ";".join(
+            f"{name}:" + ",".join(f"{column} {kind}" for column, kind in sorted(columns.items()))
+            for name, columns in sorted(relations.items())
+        )
+        self.fingerprint = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+    def relation_names(self) -> List[str]:
+        return list(self.relations)
+
+    def table_names(self) -> List[str]:
+        return [name for name in self.relations if name in TABLES]
+
+    def columns(self, relation: str) -> Dict[str, str]:
+        return self.relations.get(relation, {})
+
+    def column_owners(self) -> Dict[str, str]:
+        """column -> 'alias.column' of the first base table that has it (ad_sales wins shared columns)"""
+        owners = {}
+        for table in self.table_names():
+            for column in self.relations[table]:
+                owners.setdefault(column, f"{ALIASES[table]}.{column}")
+        return owners
+
+    def render_prompt_schema(self, descriptions: Optional[Dict[str, str]] = None) -> str:
+        """Schema block for the LLM prompt; descriptions adds per-table text such as live row counts"""
+        descriptions = descriptions or {}
+        tables = self.table_names()
+        lines = [
+            "### POSTGRESQL DATABASE SCHEMA",
+            f"You must generate a SQL query that strictly uses ONLY the following {len(tables)} tables.",
+            "",
+        ]
+        for number, table in enumerate(tables, start=1):
+            heading = f"**TABLE {number}: {table}"
+            heading += f" ({descriptions[table]})**" if table in descriptions else "**"
+            lines.append(heading)
+            for column, kind in self.relations[table].items():
+                note = COLUMN_NOTES.get((table, column))
+                lines.append(f"- `{column}`: {kind}" + (f" ({note})" if note else ""))
+            lines.append("")
+        for view in self.relations:
+            if view not in VIEWS:
+                continue
+            notes = VIEW_NOTES.get(view, [])
+            heading = f"**PRE-AGGREGATED VIEW: {view}"
+            heading += f" ({notes[0]})**" if notes else "**"
+            lines.append(heading)
+            if len(notes) > 1:
+                lines.append(f"- {notes[1]}")
+            lines.append("- Columns: " + ", ".join(f"`{c}`" for c in self.relations[view]))
+            lines.extend(f"- {note}" for note in notes[2:])
+            lines.append("")
+        return "\n".join(lines)
+
+
+schema_registry = SchemaRegistry()
@@ -0,0 +1,236 @@
+import logging
+import re
+import time
+import weakref
+from typing import Any, Dict, Sequence
+
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(sql: str) -> str:
+    return re.sub(r"\s+", " ", sql).strip().rstrip(";")
+
+
+class StatementRegistry:
+    """
+    Named SQL statements executed through asyncpg's per-connection statement cache
+    Each statement is parsed/planned once per pooled connection and reused across acquires;
+    parameters ($1, $2 ...) replace f-string interpolation, so one plan serves every threshold/limit
+    Stats count first uses per (connection, statement) - when asyncpg prepares the statement.
+    asyncpg may prepare again after evicting it from its LRU cache or after a schema change,
+    which is not visible here, so first_uses is a lower bound on real prepares.
+    """
+
+    def __init__(self):
+        self.statements: Dict[str, str] = {}
+        self._by_text: Dict[str, str] = {}
+        self._prepared = weakref.WeakKeyDictionary()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def register(self, name: str, sql: str) -> str:
+        sql = _normalize(sql)
+        self.statements[name] = sql
+        self._by_text[sql] = name
+        self._stats[name] = {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "first_uses": 0}
+        return name
+
+    def sql(self, name: str) -> str:
+        return self.statements[name]
+
+    def lookup(self, sql: str):
+        """Name of the registered statement with exactly this text, if any"""
+        return self._by_text.get(_normalize(sql)) if sql else None
+
+    def render(self, name: str, args: Sequence[Any] = ()) -> str:
+        """SQL with numeric parameters inlined, for display and the workload log"""
+        sql = self.statements[name]
+        for position in range(len(args), 0, -1):
+            sql = sql.replace(f"${position}", repr(args[position - 1]))
+        return sql
+
+    async def fetch(self, conn, name: str, *args):
+        """Run a registered statement, reusing the connection's cached prepared plan"""
+        # Pool proxies are unwrapped so tracking follows the real (long-lived) connection
+        raw = getattr(conn, "_con", None) or conn
+        prepared = self._prepared.setdefault(raw, set())
+        if name not in prepared:
+            prepared.add(name)
+            self._stats[name]["first_uses"] += 1
+        start = time.perf_counter()
+        try:
+            return await conn.fetch(self.statements[name], *args)
+        finally:
+            self._record(name, (time.perf_counter() - start) * 1000)
+
+    async def fetchrow(self, conn, name: str, *args):
+        rows = await self.fetch(conn, name, *args)
+        return rows[0] if rows else None
+
+    async def fetchval(self, conn, name: str, *args):
+        row = await self.fetchrow(conn, name, *args)
+        return row[0] if row else None
+
+    async def fetch_sql(self, conn, sql: str):
+        """Fetch arbitrary SQL, using the prepared plan when the text matches a registered statement"""
+        name = self.lookup(sql)
+        if name is not None:
+            return await self.fetch(conn, name)
+        return await conn.fetch(sql)
+
+    def _record(self, name, duration_ms):
+        stats = self._stats[name]
+        stats["calls"] += 1
+        stats["total_ms"] += duration_ms
+        stats["max_ms"] = max(stats["max_ms"], duration_ms)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-statement execution counts, first uses per connection and latencies"""
+        report = {}
+        for name, stats in self._stats.items():
+            calls = stats["calls"]
+            report[name] = {
+                "calls": calls,
+                "first_uses": stats["first_uses"],
+                "total_ms": round(stats["total_ms"], 2),
+                "avg_ms": round(stats["total_ms"] / calls, 2) if calls else 0.0,
+                "max_ms": round(stats["max_ms"], 2),
+            }
+        return report
+
+
+statements = StatementRegistry()
+
+# ── /visualize KPIs ──
+KPI_TOTAL_SALES = statements.register("kpi_total_sales", "SELECT SUM(total_sales) FROM total_sales")
+KPI_ROAS = statements.register("kpi_roas", """
+    SELECT AVG(ad_sales/NULLIF(ad_spend,0)) AS avg_roas,
+           SUM(ad_sales) AS sales, SUM(ad_spend) AS spend
+    FROM ad_sales WHERE ad_spend > 0
+""")
+KPI_HIGHEST_CPC = statements.register("kpi_highest_cpc", """
+    SELECT item_id, MAX(ad_spend/NULLIF(clicks,0)) AS max_cpc,
+           AVG(ad_spend/NULLIF(clicks,0)) AS avg_cpc, COUNT(*) AS campaigns
+    FROM ad_sales WHERE clicks > 0
+    GROUP BY item_id ORDER BY max_cpc DESC LIMIT $1
+""")
+
+# ── query_interface business templates ($n = threshold / limit) ──
+CPC_TOP = statements.register("cpc_top", """
+    SELECT a.item_id, a.ad_spend, a.clicks,
+           ROUND((a.ad_spend / NULLIF(a.clicks, 0))::numeric, 2) as cpc
+    FROM ad_sales a
+    WHERE a.clicks > 0
+    ORDER BY (a.ad_spend / NULLIF(a.clicks, 0)) DESC
+    LIMIT $1
+""")
+CPC_UNDER = statements.register("cpc_under", """
+    SELECT a.item_id, a.ad_spend, a.clicks,
+           ROUND((a.ad_spend / NULLIF(a.clicks, 0))::numeric, 2) as cpc
+    FROM ad_sales a
+    WHERE a.clicks > 0
+    AND (a.ad_spend / NULLIF(a.clicks, 0)) < $1::numeric
+    ORDER BY (a.ad_spend / NULLIF(a.clicks, 0)) ASC
+    LIMIT $2
+""")
+ROAS_TOP = statements.register("roas_top", """
+    SELECT a.item_id, a.ad_sales, a.ad_spend,
+           ROUND((a.ad_sales / NULLIF(a.ad_spend, 0))::numeric, 2) as roas
+    FROM ad_sales a
+    WHERE a.ad_spend > 0
+    ORDER BY (a.ad_sales / NULLIF(a.ad_spend, 0)) DESC
+    LIMIT $1
+""")
+ROI_TOP = statements.register("roi_top", """
+    SELECT a.item_id, t.total_sales, a.ad_spend,
+           ROUND(((t.total_sales - a.ad_spend) / NULLIF(a.ad_spend, 0) * 100)::numeric, 2) as roi_percentage
+    FROM ad_sales a
+    LEFT JOIN total_sales t ON a.item_key = t.item_key
+    WHERE a.ad_spend > 0 AND t.total_sales IS NOT NULL
+    ORDER BY ((t.total_sales - a.ad_spend) / NULLIF(a.ad_spend, 0) * 100) DESC
+    LIMIT $1
+""")
+TOTAL_SALES_TOP = statements.register("total_sales_top", """
+    SELECT t.item_id, t.total_sales, t.total_units_ordered
+    FROM total_sales t
+    ORDER BY t.total_sales DESC
+    LIMIT $1
+""")
+AD_SALES_TOP = statements.register("ad_sales_top", """
+    SELECT a.item_id, a.ad_sales, a.impressions, a.clicks, a.units_sold
+    FROM ad_sales a
+    ORDER BY a.ad_sales DESC
+    LIMIT $1
+""")
+PRODUCTS_TOP = statements.register("products_top", """
+    SELECT a.item_id, a.ad_sales, a.ad_spend, a.impressions, a.clicks
+    FROM ad_sales a
+    ORDER BY a.ad_sales DESC
+    LIMIT $1
+""")
+DEFAULT_TOP = statements.register("default_top", """
+    SELECT a.item_id, a.ad_sales, a.ad_spend, a.clicks
+    FROM ad_sales a
+    ORDER BY a.ad_sales DESC
+    LIMIT $1
+""")
+
+# ── query_interface safe fallbacks ──
+SAFE_CPC = statements.register("safe_cpc", """
+    SELECT a.item_id, a.ad_spend, a.clicks
+    FROM ad_sales a
+    WHERE a.clicks > 0
+    ORDER BY a.ad_spend DESC
+    LIMIT $1
+""")
+SAFE_SALES = statements.register("safe_sales", """
+    SELECT a.item_id, a.ad_sales
+    FROM ad_sales a
+    ORDER BY a.ad_sales DESC
+    LIMIT $1
+""")
+SAFE_DEFAULT = statements.register("safe_default", """
+    SELECT a.item_id, a.ad_sales, a.ad_spend
+    FROM ad_sales a
+    LIMIT $1
+""")
+
+# ── LLMService question-specific fallbacks (returned as SQL text, matched by fetch_sql) ──
+LLM_CPC_HIGHEST = statements.register("llm_cpc_highest", (
+    "SELECT item_id, ad_spend, clicks, "
+    "ROUND((ad_spend / NULLIF(clicks, 0))::numeric, 2) as cpc "
+    "FROM ad_sales WHERE clicks > 0 ORDER BY cpc DESC LIMIT 1"
+))
+LLM_CPC_LOWEST = statements.register("llm_cpc_lowest", (
+    "SELECT item_id, ad_spend, clicks, "
+    "ROUND((ad_spend / NULLIF(clicks, 0))::numeric, 2) as cpc "
+    "FROM ad_sales WHERE clicks > 0 ORDER BY cpc ASC LIMIT 1"
+))
+LLM_CPC_ALL = statements.register("llm_cpc_all", (
+    "SELECT item_id, ad_spend, clicks, "
+    "ROUND((ad_spend / NULLIF(clicks, 0))::numeric, 2) as cpc "
+    "FROM ad_sales WHERE clicks > 0 ORDER BY item_id"
+))
+LLM_ROI = statements.register("llm_roi", (
+    "SELECT a.item_id, t.total_sales, a.ad_spend, "
+    "ROUND(((t.total_sales - a.ad_spend) / NULLIF(a.ad_spend, 0))::numeric * 100, 2) as roi_percentage "
+    "FROM ad_sales a LEFT JOIN total_sales t ON a.item_key = t.item_key "
+    "WHERE a.ad_spend > 0 AND t.total_sales IS NOT NULL ORDER BY roi_percentage DESC"
+))
+LLM_ROAS = statements.register("llm_roas", (
+    "SELECT item_id, ad_sales, ad_spend, "
+    "ROUND((ad_sales / NULLIF(ad_spend, 0))::numeric, 2) as roas "
+    "FROM ad_sales WHERE ad_spend > 0 ORDER BY roas DESC"
+))
+LLM_TOTAL_REVENUE = statements.register(
+    "llm_total_revenue", "SELECT SUM(total_sales) as total_revenue FROM total_sales"
+)
+LLM_TOTAL_AD_SPEND = statements.register(
+    "llm_total_ad_spend", "SELECT SUM(ad_spend) as total_ad_spend FROM ad_sales"
+)
+LLM_DEFAULT = statements.register("llm_default", (
+    "SELECT a.item_id, a.ad_sales, a.ad_spend, t.total_sales, "
+    "ROUND((a.ad_sales / NULLIF(a.ad_spend, 0))::numeric, 2) as roas "
+    "FROM ad_sales a LEFT JOIN total_sales t ON a.item_key = t.item_key "
+    "WHERE a.ad_spend > 0 ORDER BY roas DESC LIMIT 20"
+))
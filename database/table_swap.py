@@ -0,0 +1,294 @@
+import argparse
+import asyncio
+import logging
+import os
+import re
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+import asyncpg
+
+from database.connection import DATABASE_URL, ingest_lock
+from database.dictionary import ENCODED_COLUMNS, key_trigger_sql
+from database.models import Base, BusinessIntelligenceView
+from database.partitions import (LOOKAHEAD_MONTHS, PARTITIONED_TABLES, add_months, default_partition_sql,
+                                 ensure_partitions, month_start)
+
+
+logger = logging.getLogger(__name__)
+
+SWAP_TABLES = ("ad_sales", "total_sales", "eligibility")
+SHADOW_SUFFIX = "_new"
+PREVIOUS_SUFFIX = "_old"
+# The swap waits at most this long for running queries to release the tables, then backs off and retries.
+# Kept below PostgreSQL's deadlock_timeout (1s) so that in a lock cycle the swap gives way, not a reader
+SWAP_LOCK_TIMEOUT = os.getenv("ANARIX_SWAP_LOCK_TIMEOUT", "500ms")
+SWAP_ATTEMPTS = int(os.getenv("ANARIX_SWAP_ATTEMPTS", "10"))
+
+
+def shadow_name(table: str) -> str:
+    return table + SHADOW_SUFFIX
+
+
+def previous_name(table: str) -> str:
+    return table + PREVIOUS_SUFFIX
+
+
+async def _relkind(conn, name: str):
+    return await conn.fetchval(
+        "SELECT relkind::text FROM pg_class WHERE relname = $1 AND relnamespace = 'public'::regnamespace", name
+    )
+
+
+async def _family(conn, name: str) -> List[asyncpg.Record]:
+    """The relation, its partitions, their indexes and owned sequences - everything named after it"""
+    return await conn.fetch("""
+        WITH RECURSIVE family AS (
+            SELECT $1::regclass::oid AS oid
+            UNION
+            SELECT i.inhrelid FROM pg_inherits i JOIN family f ON i.inhparent = f.oid
+        )
+        SELECT c.relname, c.relkind::text AS relkind FROM pg_class c JOIN family f ON c.oid = f.oid
+        UNION ALL
+        SELECT c.relname, c.relkind::text FROM pg_index x
+        JOIN family f ON x.indrelid = f.oid JOIN pg_class c ON c.oid = x.indexrelid
+        UNION ALL
+        SELECT c.relname, c.relkind::text FROM pg_depend d
+        JOIN family f ON d.refobjid = f.oid JOIN pg_class c ON c.oid = d.objid
+        WHERE d.classid = 'pg_class'::regclass AND d.deptype = 'a' AND c.relkind = 'S'
+    """, name)
+
+
+async def _rename_family(conn, name: str, new_name: str):
+    """
+    Rename a table or materialized view together with its partitions, indexes (and so the
+    primary key constraint) and serial sequence, so the next generation can take the names
+    """
+    statements = {"r": "TABLE", "p": "TABLE", "m": "MATERIALIZED VIEW", "i": "INDEX", "I": "INDEX", "S": "SEQUENCE"}
+    for row in await _family(conn, name):
+        if name in row["relname"]:
+            await conn.execute(f"ALTER {statements[row['relkind']]} {row['relname']} "
+                               f"RENAME TO {row['relname'].replace(name, new_name, 1)}")
+
+
+async def _check_dependents(conn, tables: Iterable[str]):
+    """
+    A rename would leave other views reading the old generation - only the business view is rebuilt
+    (its *_old / *_new generations are dropped or renamed along with the tables by _rotate)
+    """
+    rows = await conn.fetch("""
+        SELECT DISTINCT v.relname AS view, t.relname AS table_name
+        FROM pg_depend d
+        JOIN pg_rewrite r ON r.oid = d.objid
+        JOIN pg_class v ON v.oid = r.ev_class
+        JOIN pg_class t ON t.oid = d.refobjid
+        WHERE d.classid = 'pg_rewrite'::regclass AND t.relname = ANY($1::text[]) AND v.oid <> t.oid
+    """, list(tables))
+    view = BusinessIntelligenceView.VIEW_NAME
+    generations = {view, previous_name(view), shadow_name(view)}
+    others = [row for row in rows if row["view"] not in generations]
+    if others:
+        raise RuntimeError("Cannot swap tables with dependent views: "
+                           + ", ".join(f"{row['view']} ({row['table_name']})" for row in others))
+
+
+async def create_shadow(conn, table: str) -> str:
+    """
+    Empty <table>_new with the live table's columns, primary key, partitioning and item_key trigger, but no
+    secondary indexes (build_shadow_indexes adds them after the load, which is faster than
+    maintaining them row by row). A leftover shadow from a failed run is dropped first.
+    """
+    from sqlalchemy.dialects import postgresql
+    from sqlalchemy.schema import CreateTable
+
+    shadow = shadow_name(table)
+    model = Base.metadata.tables[table]
+    ddl = str(CreateTable(model).compile(dialect=postgresql.dialect()))
+    await conn.execute(f"DROP TABLE IF EXISTS {shadow}")
+    await conn.execute(ddl.replace(f"CREATE TABLE {table} ", f"CREATE TABLE {shadow} ", 1))
+    if table in PARTITIONED_TABLES:
+        await conn.execute(default_partition_sql(shadow))
+    if table in ENCODED_COLUMNS:
+        await conn.execute(key_trigger_sql(shadow))
+    if await _relkind(conn, table):
+        # Keep ids increasing across generations
+        await conn.execute(f"SELECT setval(pg_get_serial_sequence('{shadow}', 'id'), "
+                           f"COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)")
+    logger.info(f"🌑 Shadow table {shadow} created")
+    return shadow
+
+
+# pg_get_indexdef() of an index on the live table (ON ONLY for a partitioned parent)
+INDEXDEF_PATTERN = re.compile(r"^CREATE (UNIQUE )?INDEX (\S+) ON (?:ONLY )?\S+ (USING .*)$")
+
+
+async def _live_index_sql(conn, table: str) -> Dict[str, str]:
+    """
+    Index name -> CREATE INDEX for <table>_new, for every secondary index of the live table
+    (model indexes and ones added since, e.g. by the index advisor). Names keep the table name
+    in them so the rename at swap time gives them their live names back.
+    """
+    rows = await conn.fetch("""
+        SELECT c.relname AS name, pg_get_indexdef(x.indexrelid) AS definition
+        FROM pg_index x JOIN pg_class c ON c.oid = x.indexrelid
+        WHERE x.indrelid = $1::regclass AND NOT x.indisprimary
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint k WHERE k.conindid = x.indexrelid)
+    """, table)
+    shadow = shadow_name(table)
+    statements = {}
+    for row in rows:
+        match = INDEXDEF_PATTERN.match(row["definition"])
+        if not match:
+            logger.warning(f"⚠️ Index {row['name']} on {table} is not copied to {shadow}: {row['definition']}")
+            continue
+        name = row["name"]
+        new_name = name.replace(table, shadow, 1) if table in name else f"{shadow}_{name}"[:63]
+        if table not in name:
+            logger.warning(f"⚠️ Index {name} does not carry the table name - it comes back as {new_name.replace(shadow, table, 1)}")
+        statements[name] = f"CREATE {match.group(1) or ''}INDEX {new_name} ON {shadow} {match.group(3)}"
+    return statements
+
+
+async def build_shadow_indexes(conn, table: str):
+    """
+    Secondary indexes, lookahead partitions and planner statistics for a loaded shadow table
+    The indexes are the live table's (so indexes created outside the model survive the swap) plus
+    any model index the live table does not have yet
+    """
+    shadow = shadow_name(table)
+    if table in PARTITIONED_TABLES:
+        this_month = month_start(date.today())
+        await ensure_partitions(conn, shadow, this_month, add_months(this_month, LOOKAHEAD_MONTHS))
+    statements = await _live_index_sql(conn, table) if await _relkind(conn, table) else {}
+    for index in Base.metadata.tables[table].indexes:
+        if index.name not in statements:
+            columns = ", ".join(column.name for column in index.columns)
+            unique = "UNIQUE " if index.unique else ""
+            statements[index.name] = f"CREATE {unique}INDEX {index.name.replace(table, shadow, 1)} ON {shadow} ({columns})"
+    for statement in statements.values():
+        await conn.execute(statement)
+    await conn.execute(f"ANALYZE {shadow}")
+
+
+async def create_shadow_view(conn, tables: Iterable[str] = SWAP_TABLES) -> str:
+    """business_intelligence_complete_new over the shadow tables, ready to be swapped in with them"""
+    view = shadow_name(BusinessIntelligenceView.VIEW_NAME)
+    await conn.execute(f"DROP MATERIALIZED VIEW IF EXISTS {view}")
+    for statement in BusinessIntelligenceView.get_materialized_view_sql(
+            view_name=view, tables={table: shadow_name(table) for table in tables}):
+        await conn.execute(statement)
+    return view
+
+
+async def drop_shadows(conn, tables: Iterable[str] = SWAP_TABLES):
+    """Discard an unfinished generation (failed load); the live tables are untouched"""
+    await conn.execute(f"DROP MATERIALIZED VIEW IF EXISTS {shadow_name(BusinessIntelligenceView.VIEW_NAME)}")
+    for table in tables:
+        await conn.execute(f"DROP TABLE IF EXISTS {shadow_name(table)}")
+
+
+async def _rotate(conn, tables: List[str], steps, drop_suffix: Optional[str] = None):
+    """
+    One transaction: optionally drop the relations named *<drop_suffix>, then apply each
+    (from suffix, to suffix) rename step to the business view and every table.
+    Renames only touch the catalog, so readers are blocked for milliseconds, not for the load.
+    lock_timeout keeps the swap from queueing behind a long query (and everyone from queueing behind it)
+    """
+    view = BusinessIntelligenceView.VIEW_NAME
+    relations = [view] + tables
+    for attempt in range(1, SWAP_ATTEMPTS + 1):
+        try:
+            async with conn.transaction():
+                await conn.execute(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'")
+                # Every table at once, before any DDL, so the swap never holds one lock while waiting for another
+                # (materialized views cannot be LOCKed - the view is locked by its rename)
+                locked = [table + source for source, _ in steps for table in tables
+                          if await _relkind(conn, table + source)]
+                await conn.execute(f"LOCK TABLE {', '.join(dict.fromkeys(locked))} IN ACCESS EXCLUSIVE MODE")
+                if drop_suffix:
+                    await conn.execute(f"DROP MATERIALIZED VIEW IF EXISTS {view + drop_suffix}")
+                    for table in tables:
+                        await conn.execute(f"DROP TABLE IF EXISTS {table + drop_suffix}")
+                for source, target in steps:
+                    for name in relations:
+                        if await _relkind(conn, name + source):
+                            await _rename_family(conn, name + source, name + target)
+            return
+        except (asyncpg.LockNotAvailableError, asyncpg.DeadlockDetectedError):
+            logger.warning(f"⏳ Swap attempt {attempt}/{SWAP_ATTEMPTS}: tables busy, retrying")
+            await asyncio.sleep(0.2 * attempt)
+    raise RuntimeError(f"Could not lock {', '.join(relations)} for the swap after {SWAP_ATTEMPTS} attempts")
+
+
+async def swap_in(conn, tables: Iterable[str] = SWAP_TABLES) -> Dict[str, str]:
+    """
+    Promote the loaded shadow tables (and shadow view) to live in one short transaction
+    The replaced generation is kept as <table>_old until the next swap, for rollback()
+    """
+    tables = list(tables)
+    missing = [shadow_name(table) for table in tables if not await _relkind(conn, shadow_name(table))]
+    if missing:
+        raise RuntimeError(f"Nothing to swap in - missing shadow tables: {', '.join(missing)}")
+    await _check_dependents(conn, tables)
+    await _rotate(conn, tables, [("", PREVIOUS_SUFFIX), (SHADOW_SUFFIX, "")], drop_suffix=PREVIOUS_SUFFIX)
+    logger.info(f"🔁 Swapped in new generation of {', '.join(tables)} (previous kept as *{PREVIOUS_SUFFIX})")
+    return {table: previous_name(table) for table in tables}
+
+
+async def rollback(conn, tables: Iterable[str] = SWAP_TABLES):
+    """
+    Put the previous generation back; the generation being replaced becomes *_old,
+    so running rollback again rolls forward
+    """
+    tables = list(tables)
+    missing = [previous_name(table) for table in tables if not await _relkind(conn, previous_name(table))]
+    if missing:
+        raise RuntimeError(f"No previous generation to roll back to - missing: {', '.join(missing)}")
+    await _check_dependents(conn, tables)
+    await _rotate(conn, tables, [("", "_swap"), (PREVIOUS_SUFFIX, ""), ("_swap", PREVIOUS_SUFFIX)])
+    logger.info(f"⏪ Rolled back {', '.join(tables)} to the previous generation")
+
+
+async def main():
+    """
+    python -m database.table_swap status
+    python -m database.table_swap rollback
+    python -m database.table_swap drop-previous
+    """
+    parser = argparse.ArgumentParser(description="Inspect or roll back the live/previous table generations")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="Row counts of the live, previous and shadow generations")
+    sub.add_parser("rollback", help="Swap the previous generation back in")
+    sub.add_parser("drop-previous", help="Drop the previous generation to reclaim space")
+    args = parser.parse_args()
+
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        if args.command == "status":
+            for table in SWAP_TABLES:
+                counts = []
+                for name in (table, previous_name(table), shadow_name(table)):
+                    if await _relkind(conn, name):
+                        counts.append(f"{name} {await conn.fetchval(f'SELECT COUNT(*) FROM {name}'):,}")
+                print(f"📋 {table}: " + " | ".join(counts))
+        elif args.command == "rollback":
+            from database.post_ingest import post_ingest_hooks
+
+            async with ingest_lock():  # never rotate the generations under a running ingest
+                await rollback(conn)
+                result = await post_ingest_hooks.run(conn, source="rollback", swapped=True)
+            print(f"✅ Previous generation restored (data version {result['data_version']})")
+        elif args.command == "drop-previous":
+            async with ingest_lock():
+                await conn.execute(f"DROP MATERIALIZED VIEW IF EXISTS "
+                                   f"{previous_name(BusinessIntelligenceView.VIEW_NAME)}")
+                for table in SWAP_TABLES:
+                    await conn.execute(f"DROP TABLE IF EXISTS {previous_name(table)}")
+            print("✅ Previous generation dropped")
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,179 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from database.ingest import INGEST_MODES, WORKBOOKS, IngestPipeline
+from database.parquet_cache import parquet_cache
+
+
+logger = logging.getLogger(__name__)
+
+WATCH_DIR = os.getenv("ANARIX_WATCH_DIR", ".")
+# A reload starts once no watched workbook has changed for this long (Excel saves in several writes)
+DEBOUNCE_SECONDS = float(os.getenv("ANARIX_WATCH_DEBOUNCE", "5"))
+POLL_SECONDS = float(os.getenv("ANARIX_WATCH_POLL", "1"))
+STATUS_PATH = os.getenv("ANARIX_INGEST_STATUS", os.path.join("logs", "ingest_status.json"))
+
+
+def _signature(path: str) -> Optional[Tuple[int, int]]:
+    """(size, mtime) of a workbook, None while it is missing"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def read_status(path: str = STATUS_PATH) -> Dict[str, Any]:
+    """Last status written by a running watcher ({} if none has run)"""
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+class WorkbookWatcher:
+    """
+    Long-running auto-ingest for the workbook directory
+    Polls the watched workbooks' size/mtime; once a burst of writes has been quiet for
+    debounce seconds, a change in any workbook's content hash reloads all of them through
+    IngestPipeline: a swap rotates the business view and every table's previous generation
+    together, so reloading only the changed tables would leave *_old tables from different
+    generations (and an *_old view reading live tables). Reloads run one at a time - the pipeline's advisory
+    lock also keeps them apart from manual ingest runs. The outcome of each reload
+    (time, duration, row counts) is written to the status file for /stats/ingest.
+    """
+
+    def __init__(self, directory: str = WATCH_DIR, debounce: float = DEBOUNCE_SECONDS, poll: float = POLL_SECONDS,
+                 workbooks: Dict[str, str] = None, status_path: str = STATUS_PATH, **ingest_options):
+        self.directory = directory
+        self.debounce = debounce
+        self.poll = poll
+        self.workbooks = workbooks or WORKBOOKS
+        self.status_path = status_path
+        self.ingest_options = ingest_options
+        self.signatures: Dict[str, Optional[Tuple[int, int]]] = {}
+        self.hashes: Dict[str, Optional[str]] = {}  # content of the last ingested (or initial) workbook
+        self.changed_at: Dict[str, float] = {}  # table -> monotonic time of its latest write
+        self.lock = asyncio.Lock()
+        self.status: Dict[str, Any] = {
+            "directory": os.path.abspath(directory), "state": "starting", "runs": 0, "failures": 0,
+            "last_ingest_at": None, "last_duration_seconds": None, "last_tables": [], "row_counts": {},
+            "data_version": None, "last_error": None,
+        }
+
+    def _path(self, table: str) -> str:
+        return os.path.join(self.directory, self.workbooks[table])
+
+    def _hash(self, table: str) -> Optional[str]:
+        return parquet_cache.key(self._path(table)) if self.signatures.get(table) else None
+
+    def _write_status(self, **changes):
+        self.status.update(changes)
+        os.makedirs(os.path.dirname(self.status_path) or ".", exist_ok=True)
+        tmp = self.status_path + ".tmp"
+        with open(tmp, "w") as handle:
+            json.dump(self.status, handle, indent=2, default=str)
+        os.replace(tmp, self.status_path)
+
+    def scan(self) -> List[str]:
+        """Record new writes; -> tables whose burst of writes has gone quiet (all of them, or none)"""
+        now = time.monotonic()
+        for table in self.workbooks:
+            signature = _signature(self._path(table))
+            if signature != self.signatures.get(table):
+                self.signatures[table] = signature
+                if signature is not None:
+                    self.changed_at[table] = now
+        if self.changed_at and all(now - at >= self.debounce for at in self.changed_at.values()):
+            due, self.changed_at = list(self.changed_at), {}
+            return due
+        return []
+
+    async def reload(self, tables: List[str]) -> Optional[Dict[str, Any]]:
+        """Ingest every workbook if the content of any of the given tables' workbooks changed since the last ingest"""
+        hashes = {table: self._hash(table) for table in self.workbooks}
+        changed = [table for table in tables if hashes[table] != self.hashes.get(table)]
+        if not changed:
+            logger.info(f"👀 {', '.join(tables)}: touched but unchanged - no reload")
+            return None
+
+        async with self.lock:
+            logger.info(f"🔄 {', '.join(changed)} changed - reloading {', '.join(self.workbooks)}")
+            self._write_status(state="ingesting")
+            started = datetime.now(timezone.utc)
+            start = time.perf_counter()
+            try:
+                result = await IngestPipeline(workbooks=self.workbooks, base_dir=self.directory,
+                                              source="watcher", **self.ingest_options).run()
+                if not result["success"]:
+                    if result.get("failed_hooks"):
+                        raise RuntimeError(f"post-ingest hooks failed: {', '.join(result['failed_hooks'])}")
+                    raise RuntimeError(f"missing workbooks: {', '.join(result['missing'])}")
+            except Exception as e:
+                logger.error(f"❌ Auto-ingest of {', '.join(changed)} failed: {e}")
+                # Left as not ingested: the next write to the workbook retries
+                self._write_status(state="watching", failures=self.status["failures"] + 1,
+                                   last_error={"at": started.isoformat(), "tables": changed, "error": str(e)})
+                return None
+
+            self.hashes.update(hashes)
+            self._write_status(
+                state="watching", runs=self.status["runs"] + 1, last_ingest_at=started.isoformat(),
+                last_duration_seconds=round(time.perf_counter() - start, 3), last_tables=changed,
+                row_counts={**self.status["row_counts"], **result["counts"]},
+                data_version=result["data_version"] or self.status["data_version"],
+            )
+            logger.info(f"✅ Auto-ingest of {', '.join(changed)} done in {self.status['last_duration_seconds']:.1f}s")
+            return result
+
+    async def run(self, ingest_now: bool = False):
+        """Watch until cancelled; ingest_now reloads every workbook once at startup"""
+        for table in self.workbooks:
+            self.signatures[table] = _signature(self._path(table))
+            self.hashes[table] = None if ingest_now else self._hash(table)
+        self._write_status(state="watching", started_at=datetime.now(timezone.utc).isoformat())
+        logger.info(f"👀 Watching {os.path.abspath(self.directory)} for "
+                    f"{', '.join(self.workbooks.values())} (debounce {self.debounce:g}s)")
+        if ingest_now:
+            await self.reload([table for table, signature in self.signatures.items() if signature])
+        try:
+            while True:
+                due = self.scan()
+                if due:
+                    await self.reload(due)
+                await asyncio.sleep(self.poll)
+        finally:
+            self._write_status(state="stopped")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Watch the workbook directory and reload changed workbooks")
+    parser.add_argument("--dir", default=WATCH_DIR, help="directory holding the workbooks")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE_SECONDS,
+                        help="seconds without further writes before a reload starts")
+    parser.add_argument("--poll", type=float, default=POLL_SECONDS)
+    parser.add_argument("--mode", choices=INGEST_MODES, default="replace")
+    parser.add_argument("--ingest-now", action="store_true", help="reload every workbook once at startup")
+    parser.add_argument("--status", action="store_true", help="print the last watcher status and exit")
+    args = parser.parse_args()
+
+    if args.status:
+        print(json.dumps(read_status(), indent=2) if read_status() else "No watcher status yet")
+        return
+    logging.basicConfig(level=logging.INFO)
+    watcher = WorkbookWatcher(args.dir, args.debounce, args.poll, mode=args.mode)
+    await watcher.run(ingest_now=args.ingest_now)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n👋 Watcher stopped")
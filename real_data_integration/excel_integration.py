@@ -1,8 +1,12 @@
-import pandas as pd
 import asyncpg
 import asyncio
-from datetime import datetime
-import os
+from pathlib import Path
+
+# Add the parent directory to the path to import from database
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from database.ingest import run_ingest
 
 
 class RealExcelIntegrator:
@@ -22,14 +26,13 @@ class RealExcelIntegrator:
         print("=" * 70)
         
         try:
-            # Connect to database
-            print("\n🗄️ Connecting to PostgreSQL database...")
-            conn = await asyncpg.connect(**self.db_params)
-            print("✅ Database connection established")
-            
-            # Clear existing data and reload from Excel files
-            await self.refresh_existing_tables(conn)
+            # Parse the workbooks in parallel and reload ad_sales, total_sales, eligibility
+            result = await run_ingest(source='excel_integration')
+            if not result["success"]:
+                return False
             
+            conn = await asyncpg.connect(**self.db_params)
+            await self.verify_integration(conn)
             await conn.close()
             
             print("\n🎉 REAL EXCEL DATA INTEGRATION COMPLETED!")
@@ -42,112 +45,6 @@ class RealExcelIntegrator:
             print(f"❌ Integration failed: {e}")
             return False
     
-    async def refresh_existing_tables(self, conn):
-        """Refresh your existing ad_sales, total_sales, eligibility tables"""
-        
-        print("\n📊 Loading Excel files...")
-        
-        # Load Excel files (adjust filenames as needed)
-        excel_files = {
-            'ad_sales': 'Copy of Product-Level Ad Sales and Metrics (mapped).xlsx',
-            'total_sales': 'Copy of Product-Level Total Sales and Metrics (mapped).xlsx', 
-            'eligibility': 'Copy of Product-Level Eligibility Table (mapped).xlsx'
-        }
-        
-        for table_name, filename in excel_files.items():
-            if os.path.exists(filename):
-                print(f"📂 Processing {filename}...")
-                
-                # Load Excel data
-                df = pd.read_excel(filename)
-                
-                # Clean column names for PostgreSQL
-                df.columns = [
-                    str(col).strip().lower()
-                    .replace(' ', '_')
-                    .replace('-', '_')
-                    .replace('(', '')
-                    .replace(')', '')
-                    .replace('.', '_')
-                    .replace('%', 'percent')
-                    for col in df.columns
-                ]
-                
-                # Replace NaN with None
-                df = df.where(pd.notnull(df), None)
-                
-                # Clear existing table
-                await conn.execute(f"DELETE FROM {table_name}")
-                
-                # Insert new data
-                if table_name == 'ad_sales':
-                    await self.insert_ad_sales_data(conn, df)
-                elif table_name == 'total_sales':
-                    await self.insert_total_sales_data(conn, df)
-                elif table_name == 'eligibility':
-                    await self.insert_eligibility_data(conn, df)
-                    
-                print(f"✅ {table_name}: {len(df)} records refreshed")
-            else:
-                print(f"⚠️ File not found: {filename}")
-        
-        # Verify data integration
-        await self.verify_integration(conn)
-    
-    async def insert_ad_sales_data(self, conn, df):
-        """Insert ad sales data into existing table structure"""
-        for _, row in df.iterrows():
-            try:
-                await conn.execute("""
-                    INSERT INTO ad_sales (item_id, date, ad_sales, impressions, ad_spend, clicks, units_sold)
-                    VALUES ($1, $2, $3, $4, $5, $6, $7)
-                """, 
-                    str(row.get('item_id', '')),
-                    row.get('date'),
-                    float(row.get('ad_sales', 0)) if row.get('ad_sales') else 0,
-                    int(row.get('impressions', 0)) if row.get('impressions') else 0,
-                    float(row.get('ad_spend', 0)) if row.get('ad_spend') else 0,
-                    int(row.get('clicks', 0)) if row.get('clicks') else 0,
-                    int(row.get('units_sold', 0)) if row.get('units_sold') else 0
-                )
-            except Exception as e:
-                print(f"⚠️ Skipped row in ad_sales: {e}")
-                continue
-    
-    async def insert_total_sales_data(self, conn, df):
-        """Insert total sales data into existing table structure"""
-        for _, row in df.iterrows():
-            try:
-                await conn.execute("""
-                    INSERT INTO total_sales (item_id, date, total_sales, total_units_ordered)
-                    VALUES ($1, $2, $3, $4)
-                """, 
-                    str(row.get('item_id', '')),
-                    row.get('date'),
-                    float(row.get('total_sales', 0)) if row.get('total_sales') else 0,
-                    int(row.get('total_units_ordered', 0)) if row.get('total_units_ordered') else 0
-                )
-            except Exception as e:
-                print(f"⚠️ Skipped row in total_sales: {e}")
-                continue
-    
-    async def insert_eligibility_data(self, conn, df):
-        """Insert eligibility data into existing table structure"""
-        for _, row in df.iterrows():
-            try:
-                await conn.execute("""
-                    INSERT INTO eligibility (item_id, eligibility_datetime_utc, eligibility, message)
-                    VALUES ($1, $2, $3, $4)
-                """, 
-                    str(row.get('item_id', '')),
-                    row.get('eligibility_datetime_utc'),
-                    str(row.get('eligibility', 'eligible')),
-                    str(row.get('message', ''))
-                )
-            except Exception as e:
-                print(f"⚠️ Skipped row in eligibility: {e}")
-                continue
-    
     async def verify_integration(self, conn):
         """Verify data was loaded correctly"""
         print("\n🔍 Verifying data integration...")
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+CHART_CACHE_MAX_BYTES = int(float(os.getenv("ANARIX_CHART_CACHE_MB", "64")) * 1024 * 1024)
+CHART_CACHE_MAX_ENTRIES = int(os.getenv("ANARIX_CHART_CACHE_ENTRIES", "2000"))
+
+
+def spec_key(spec: Dict[str, Any]) -> str:
+    """
+    Content address of a chart: SHA-256 over the canonical JSON of its spec
+    The spec holds everything the render depends on (chart kind, engine, format, labels and
+    the plotted values), so equal keys always mean byte-identical output
+    """
+    canonical = json.dumps(spec, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ChartCache:
+    """
+    Size-bounded LRU of rendered chart payloads (Plotly JSON, base64 PNG, SVG) keyed by spec_key
+    Evicts least recently used charts once max_bytes of payload or max_entries are exceeded;
+    a single payload larger than max_bytes is not stored
+    """
+
+    def __init__(self, max_bytes: int = CHART_CACHE_MAX_BYTES, max_entries: int = CHART_CACHE_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, str]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        payload = self.entries.get(key)
+        if payload is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return payload
+
+    def put(self, key: str, payload: str):
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self.bytes -= len(self.entries.pop(key))
+        self.entries[key] = payload
+        self.bytes += size
+        while self.bytes > self.max_bytes or len(self.entries) > self.max_entries:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= len(evicted)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+        }
+
+
+chart_cache = ChartCache()
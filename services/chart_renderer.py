@@ -0,0 +1,280 @@
+import asyncio
+import base64
+import io
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from services.chart_cache import ChartCache, chart_cache, spec_key
+
+
+logger = logging.getLogger(__name__)
+
+CHART_WORKERS = int(os.getenv("ANARIX_CHART_WORKERS", str(min(2, os.cpu_count() or 1))))
+# Renders waiting or running at once; beyond that a request gets the text chart instead of queueing
+CHART_QUEUE_LIMIT = int(os.getenv("ANARIX_CHART_QUEUE", "32"))
+# Each worker is replaced after this many renders (matplotlib/plotly caches only grow)
+CHART_RECYCLE_AFTER = int(os.getenv("ANARIX_CHART_RECYCLE", "200"))
+CHART_TIMEOUT_SECONDS = float(os.getenv("ANARIX_CHART_TIMEOUT", "10"))
+
+BAR_LIMITS = {"plotly": 15, "matplotlib": 10}
+
+
+class ChartQueueFull(RuntimeError):
+    """More renders pending than CHART_QUEUE_LIMIT"""
+
+
+def _is_number(value) -> bool:
+    # Same rule as pandas' select_dtypes('number'): ints and floats, not bools or Decimals (object columns)
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def chart_spec(data: List[Dict[str, Any]], engine: str = "plotly", fmt: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Query rows -> compact chart spec with plain data arrays, cheap to pickle to a worker
+    Bar of the first numeric column per item (first BAR_LIMITS[engine] rows), or a record-count
+    bar when no column is numeric
+    """
+    fmt = fmt or ("json" if engine == "plotly" else "png")
+    columns = list(data[0].keys()) if data else []
+    numeric = [c for c in columns
+               if any(row.get(c) is not None for row in data)
+               and all(row.get(c) is None or _is_number(row.get(c)) for row in data)]
+    if not numeric:
+        return {"engine": engine, "format": fmt, "kind": "count", "records": len(data)}
+    x_col = "item_id" if "item_id" in columns else columns[0]
+    y_col = numeric[0]
+    rows = data[:BAR_LIMITS[engine]]
+    return {
+        "engine": engine, "format": fmt, "kind": "bar", "records": len(data),
+        "x_label": x_col.replace("_", " ").title(), "y_label": y_col.replace("_", " ").title(),
+        "x": [str(row.get(x_col)) for row in rows],
+        "y": [row.get(y_col) for row in rows],
+    }
+
+
+def _warm_worker():
+    """
+    Worker initializer: pay the matplotlib/plotly imports, template and font loading once
+    per process (a throwaway render of each kind), not on the first request
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    for engine in BAR_LIMITS:
+        render_spec({"engine": engine, "format": "png", "kind": "bar", "records": 1,
+                     "x_label": "X", "y_label": "Y", "x": ["warm-up"], "y": [1]})
+
+
+def _number(value) -> float:
+    return float("nan") if value is None else value
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _render_plotly(spec):
+    import plotly.graph_objects as go
+
+    if spec["kind"] == "count":
+        fig = go.Figure(data=go.Bar(x=["Records Found"], y=[spec["records"]], marker_color="#007bff",
+                                    text=[str(spec["records"])], textposition="outside"))
+        fig.update_layout(title="Query Results Summary", template="plotly_white", height=400)
+    else:
+        fig = go.Figure(data=go.Bar(x=spec["x"], y=spec["y"], marker_color="#1f77b4",
+                                    text=[f"{_number(value):.2f}" for value in spec["y"]], textposition="outside"))
+        fig.update_layout(title=f"{spec['y_label']} Analysis", xaxis_title=spec["x_label"],
+                          yaxis_title=spec["y_label"], template="plotly_white", height=500, xaxis_tickangle=45)
+    return fig.to_json()
+
+
+def _render_matplotlib(spec):
+    # Figure objects, not pyplot: no global figure state shared between renders
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    if spec["kind"] == "count":
+        ax.bar(["Data Records"], [spec["records"]], color="green")
+        ax.set_title("Query Results Summary")
+        ax.set_ylabel("Record Count")
+    else:
+        bars = ax.bar(range(len(spec["y"])), [_number(value) for value in spec["y"]], color="steelblue", alpha=0.8)
+        ax.set_title(f"{spec['y_label']} Analysis", fontsize=14, fontweight="bold")
+        ax.set_xlabel(spec["x_label"])
+        ax.set_ylabel(spec["y_label"])
+        ax.set_xticks(range(len(spec["x"])), spec["x"], rotation=45)
+        for bar in bars:
+            height = bar.get_height()
+            ax.text(bar.get_x() + bar.get_width() / 2., height, f"{height:.1f}", ha="center", va="bottom")
+    ax.grid(axis="y", alpha=0.3)
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=spec["format"], dpi=150, bbox_inches="tight")
+    if spec["format"] == "svg":
+        return buffer.getvalue().decode()
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def render_spec(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Worker side: spec -> {"payload" (Plotly JSON / base64 PNG / SVG text), "seconds", "pid"}"""
+    start = time.perf_counter()
+    payload = _render_plotly(spec) if spec["engine"] == "plotly" else _render_matplotlib(spec)
+    return {"payload": payload, "seconds": time.perf_counter() - start, "pid": os.getpid()}
+
+
+class ChartRenderer:
+    """
+    Chart rendering off the event loop, in a pool of pre-warmed worker processes
+    Requests send a compact spec (chart_spec) instead of rows; workers import matplotlib/plotly
+    at start, are replaced after recycle_after renders, and at most queue_limit renders are
+    pending at once (ChartQueueFull beyond that). A render that times out still counts as pending
+    until its worker is done with it; once every worker is stuck on one, the pool is replaced.
+    Render and queue times are kept for stats().
+    Finished charts are kept in a content-addressed cache (services.chart_cache), and identical
+    specs requested while one is rendering share that render, so repeated questions and
+    dashboard refreshes never reach a worker.
+    """
+
+    def __init__(self, workers: int = CHART_WORKERS, queue_limit: int = CHART_QUEUE_LIMIT,
+                 recycle_after: int = CHART_RECYCLE_AFTER, timeout: float = CHART_TIMEOUT_SECONDS,
+                 cache: Optional[ChartCache] = chart_cache):
+        self.workers = workers
+        self.cache = cache
+        self.inflight: Dict[str, asyncio.Future] = {}
+        self.queue_limit = queue_limit
+        self.recycle_after = recycle_after
+        self.timeout = timeout
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.pending = 0
+        self.overdue = set()  # timed-out renders still occupying a worker
+        self.counts = {"rendered": 0, "failed": 0, "timed_out": 0, "rejected": 0, "shared": 0, "pool_restarts": 0}
+        self.render_ms: Dict[str, float] = {"total": 0.0, "max": 0.0}
+        self.wait_ms: Dict[str, float] = {"total": 0.0, "max": 0.0}
+        self.worker_pids = set()
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        if self.pool is None:
+            # spawn: workers start clean (no copy of the API's event loop and pools); also required
+            # by max_tasks_per_child, which retires a worker after recycle_after renders
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=_warm_worker, max_tasks_per_child=self.recycle_after)
+        return self.pool
+
+    async def start(self):
+        """Start and warm every worker now, so the first charts do not pay for process start and imports"""
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        pool = self._ensure_pool()
+        pids = await asyncio.gather(*(loop.run_in_executor(pool, _ping) for _ in range(self.workers)))
+        self.worker_pids.update(pids)
+        logger.info(f"🎨 Chart renderer: {len(set(pids))} warm workers in {time.perf_counter() - start:.1f}s")
+
+    async def render(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        -> {"payload", "render_ms", "wait_ms", "cached"}; raises ChartQueueFull / TimeoutError
+        Served from the cache or an identical in-flight render when possible, else rendered in a worker
+        """
+        if self.cache is None:
+            return {**await self._render(spec), "cached": False}
+        key = spec_key(spec)
+        payload = self.cache.get(key)
+        if payload is not None:
+            return {"payload": payload, "render_ms": 0.0, "wait_ms": 0.0, "cached": True}
+        task = self.inflight.get(key)
+        if task is not None:
+            self.counts["shared"] += 1
+            return {**await asyncio.shield(task), "cached": True}
+
+        task = asyncio.ensure_future(self._render(spec))
+        self.inflight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        # shield: a cancelled request (client gone) leaves the render running for the cache and other waiters
+        return {**await asyncio.shield(task), "cached": False}
+
+    def _finish(self, key: str, task: asyncio.Future):
+        self.inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is None:
+            self.cache.put(key, task.result()["payload"])
+
+    def _release(self, future):
+        self.pending -= 1
+        self.overdue.discard(future)
+
+    def _restart_pool(self):
+        """Replace a pool whose workers are all stuck on timed-out renders; their futures fail and are released"""
+        pool, self.pool = self.pool, None
+        self.overdue.clear()  # still released (and pending decremented) as the old pool fails them
+        self.counts["pool_restarts"] += 1
+        logger.warning(f"🎨 All {self.workers} chart workers stuck on timed-out renders - restarting the pool")
+        # ProcessPoolExecutor cannot cancel a running task; stop its worker processes instead
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _render(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        if self.pending >= self.queue_limit:
+            self.counts["rejected"] += 1
+            raise ChartQueueFull(f"{self.pending} charts already pending")
+        loop = asyncio.get_running_loop()
+
+        def on_done(done):
+            # Released when the worker is done with it - not when the caller stops waiting
+            try:
+                loop.call_soon_threadsafe(self._release, done)
+            except RuntimeError:
+                pass  # event loop already closed (shutdown)
+
+        submitted = time.perf_counter()
+        pool = self._ensure_pool()
+        future = pool.submit(render_spec, spec)
+        self.pending += 1
+        future.add_done_callback(on_done)
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.counts["timed_out"] += 1
+            if not future.done():
+                self.overdue.add(future)
+                if len(self.overdue) >= self.workers and pool is self.pool:
+                    self._restart_pool()
+            raise
+        except Exception:
+            self.counts["failed"] += 1
+            raise
+        render_ms = result["seconds"] * 1000
+        wait_ms = max(0.0, (time.perf_counter() - submitted) * 1000 - render_ms)
+        self.counts["rendered"] += 1
+        self.worker_pids.add(result["pid"])
+        for totals, value in ((self.render_ms, render_ms), (self.wait_ms, wait_ms)):
+            totals["total"] += value
+            totals["max"] = max(totals["max"], value)
+        return {"payload": result["payload"], "render_ms": round(render_ms, 1), "wait_ms": round(wait_ms, 1)}
+
+    def stats(self) -> Dict[str, Any]:
+        rendered = self.counts["rendered"] or 1
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "overdue": len(self.overdue),
+            "queue_limit": self.queue_limit,
+            "recycle_after": self.recycle_after,
+            "worker_processes_seen": len(self.worker_pids),
+            **self.counts,
+            "avg_render_ms": round(self.render_ms["total"] / rendered, 1),
+            "max_render_ms": round(self.render_ms["max"], 1),
+            "avg_wait_ms": round(self.wait_ms["total"] / rendered, 1),
+            "max_wait_ms": round(self.wait_ms["max"], 1),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+    async def stop(self):
+        if self.pool is not None:
+            pool, self.pool = self.pool, None
+            await asyncio.to_thread(pool.shutdown, cancel_futures=True)
+
+
+chart_renderer = ChartRenderer()
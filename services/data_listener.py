@@ -0,0 +1,59 @@
+import asyncio
+import json
+import os
+from typing import Callable, List, Optional
+
+from services.kpi_cache import DATA_CHANGED_CHANNEL
+
+
+LISTENER_CHECK_SECONDS = int(os.getenv("ANARIX_LISTENER_CHECK_SECONDS", "30"))
+
+
+class DataChangeListener:
+    """
+    LISTEN anarix_data_changed for API processes without a KPI cache (app/query_interface.py)
+    Calls each data-changed callback with the NOTIFY payload, like KPICache.data_changed_callbacks;
+    the dedicated connection is re-attached every check_interval seconds if it dropped
+    """
+
+    def __init__(self, connect: Callable, callbacks: List[Callable] = None,
+                 check_interval: int = LISTENER_CHECK_SECONDS):
+        self.connect = connect
+        self.callbacks: List[Callable] = list(callbacks or [])
+        self.check_interval = check_interval
+        self.data_version: Optional[int] = None
+        self._conn = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+
+    async def _run(self):
+        while True:
+            try:
+                if self._conn is None or self._conn.is_closed():
+                    self._conn = await self.connect()
+                    if self._conn is not None:
+                        await self._conn.add_listener(DATA_CHANGED_CHANNEL, self._on_data_changed)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Data change listener failed: {e}")
+            await asyncio.sleep(self.check_interval)
+
+    def _on_data_changed(self, connection, pid, channel, payload):
+        source = payload or "ingest"
+        try:
+            message = json.loads(payload)  # {"source", "version"} from database.post_ingest
+            source, self.data_version = message["source"], message["version"]
+        except (TypeError, ValueError, KeyError):
+            pass
+        print(f"🔔 Data changed ({source}, data version {self.data_version}) - dropping cached table state")
+        for callback in self.callbacks:
+            callback(payload)
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import os
+from typing import Awaitable, Dict
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+
+logger = logging.getLogger(__name__)
+
+DISCONNECT_POLL_SECONDS = float(os.getenv("ANARIX_DISCONNECT_POLL_SECONDS", "0.5"))
+
+# nginx's "client closed request" - never seen by the client, but shows up in access logs
+CLIENT_CLOSED_STATUS = 499
+
+
+class ClientDisconnected(asyncio.CancelledError):
+    """Raised by checkpoint() when the client has gone away"""
+
+
+class DisconnectGuard:
+    """
+    Cancels request work when the HTTP client disconnects (tab closed, question re-submitted)
+    Cancelling the handler task aborts the pending await: aiohttp closes the Ollama connection
+    (Ollama stops generating), asyncpg sends a PostgreSQL cancel request for the running
+    statement before the connection goes back to the pool, DuckDB queries are interrupted
+    """
+
+    def __init__(self, poll_seconds: float = DISCONNECT_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self.completed = 0
+        self.cancelled: Dict[str, int] = {}
+
+    async def run(self, request: Request, work: Awaitable, endpoint: str):
+        """Await work, cancelling it as soon as the client disconnects"""
+        task = asyncio.ensure_future(work)
+        watcher = asyncio.create_task(self._watch(request, task))
+        try:
+            result = await task
+            self.completed += 1
+            return result
+        except asyncio.CancelledError:
+            watched = watcher.done() and not watcher.cancelled() and watcher.result()
+            if not (watched or await request.is_disconnected()):
+                raise  # server shutdown, not a client disconnect
+            self.cancelled[endpoint] = self.cancelled.get(endpoint, 0) + 1
+            logger.info(f"🛑 Client disconnected - cancelled {endpoint} request")
+            return JSONResponse(status_code=CLIENT_CLOSED_STATUS,
+                                content={"success": False, "error": "Client disconnected"})
+        finally:
+            if not watcher.done():
+                watcher.cancel()
+            if not task.done():
+                task.cancel()
+
+    async def _watch(self, request: Request, task: asyncio.Future) -> bool:
+        while not task.done():
+            if await request.is_disconnected():
+                task.cancel()
+                return True
+            await asyncio.sleep(self.poll_seconds)
+        return False
+
+    async def checkpoint(self, request: Request):
+        """Stop before CPU-bound steps (chart rendering) nobody will see; call inside run()"""
+        if await request.is_disconnected():
+            raise ClientDisconnected()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "completed": self.completed,
+            "cancelled": sum(self.cancelled.values()),
+            "cancelled_by_endpoint": dict(self.cancelled),
+        }
+
+
+disconnect_guard = DisconnectGuard()
@@ -0,0 +1,182 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from database.statements import statements, KPI_TOTAL_SALES, KPI_ROAS, KPI_HIGHEST_CPC
+
+
+DATA_CHANGED_CHANNEL = "anarix_data_changed"
+KPI_REFRESH_SECONDS = int(os.getenv("ANARIX_KPI_REFRESH_SECONDS", "300"))
+
+
+class KPICache:
+    """
+    Precomputed /visualize KPIs and their chart payloads
+    Refreshed by a background task on a schedule and whenever an ingest sends
+    NOTIFY anarix_data_changed; requests are served from memory (stale-while-revalidate)
+    """
+
+    def __init__(self, connect: Callable, get_pool: Callable, viz_service, mock_data,
+                 refresh_interval: int = KPI_REFRESH_SECONDS):
+        self.connect = connect  # dedicated LISTEN connection
+        self.get_pool = get_pool  # KPI queries run on pooled, prepared connections
+        self.viz_service = viz_service
+        self.mock_data = mock_data
+        self.refresh_interval = refresh_interval
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.version = 0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._refresh_pending = False
+        self._scheduler_task: Optional[asyncio.Task] = None
+        self._listener_conn = None
+        self.data_changed_callbacks: List[Callable] = []  # e.g. TableStatsService.invalidate
+        self.data_version: Optional[int] = None  # last version broadcast by the post-ingest hooks
+
+    async def start(self):
+        """Warm the cache and start the periodic refresh loop"""
+        self._scheduler_task = asyncio.create_task(self._run_scheduler())
+
+    async def stop(self):
+        for task in (self._scheduler_task, self._refresh_task):
+            if task and not task.done():
+                task.cancel()
+        if self._listener_conn is not None and not self._listener_conn.is_closed():
+            await self._listener_conn.close()
+
+    async def get(self, name: str) -> Dict[str, Any]:
+        """
+        Return the cached KPI, triggering a background refresh when it is stale
+        On a cold start whose refresh fails, returns {"success": False, "error"} instead
+        """
+        entry = self.entries.get(name)
+        if entry is None:
+            # Cold start - nothing to serve yet, so wait for the first computation.
+            # Shielded: a disconnecting client cancels its own wait, not the refresh other requests share
+            try:
+                await asyncio.shield(self.schedule_refresh())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ KPI refresh failed: {e}")
+                return {"success": False, "error": f"KPI refresh failed: {e}"}
+            entry = self.entries.get(name)
+            if entry is None:
+                return {"success": False, "error": f"KPI {name} is not available yet"}
+        stale = time.monotonic() - entry["_computed_monotonic"] > self.refresh_interval
+        if stale:
+            self.schedule_refresh()
+        result = {k: v for k, v in entry.items() if not k.startswith("_")}
+        result["stale"] = stale
+        return result
+
+    def schedule_refresh(self, follow_up: bool = False):
+        """
+        Start a refresh unless one is already running (single flight)
+        With follow_up (data changed) a running refresh is followed by exactly one more,
+        so an ingest that commits while we are computing is never missed
+        """
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_until_current())
+        elif follow_up:
+            self._refresh_pending = True
+        return self._refresh_task
+
+    async def _refresh_until_current(self):
+        while True:
+            self._refresh_pending = False
+            await self.refresh()
+            if not self._refresh_pending:
+                break
+
+    async def refresh(self):
+        """Recompute every KPI and its chart, then swap them in under a new version"""
+        start = time.perf_counter()
+        pool = await self.get_pool()
+        if pool is None:
+            results = {
+                "total_sales": (self.mock_data.get_total_sales(), "Mock"),
+                "roas": (self.mock_data.get_roas(), "Mock"),
+                "highest_cpc": (self.mock_data.get_highest_cpc_product(), "Mock"),
+            }
+        else:
+            async with pool.acquire() as conn:
+                results = {
+                    "total_sales": (await self._compute_total_sales(conn), "PostgreSQL"),
+                    "roas": (await self._compute_roas(conn), "PostgreSQL"),
+                    "highest_cpc": (await self._compute_highest_cpc(conn), "PostgreSQL"),
+                }
+
+        titles = {
+            "total_sales": "Total Sales Overview",
+            "roas": "Return on Ad Spend",
+            "highest_cpc": "Products by Cost Per Click",
+        }
+        version = self.version + 1
+        computed_at = datetime.now(timezone.utc).isoformat()
+        entries = {}
+        for name, (data, source) in results.items():
+            # Chart building is CPU-bound - keep it off the event loop
+            chart = await asyncio.to_thread(self.viz_service.create_visualization, titles[name], data)
+            entries[name] = {
+                "data_source": source,
+                "data": data,
+                "visualization": chart,
+                "version": version,
+                "computed_at": computed_at,
+                "_computed_monotonic": time.monotonic(),
+            }
+        self.entries = entries
+        self.version = version
+        print(f"📊 KPI cache refreshed: version {version} in {time.perf_counter() - start:.2f}s")
+
+    async def _compute_total_sales(self, conn):
+        total = await statements.fetchval(conn, KPI_TOTAL_SALES)
+        return [{"total_sales": float(total) if total else 0}]
+
+    async def _compute_roas(self, conn):
+        row = await statements.fetchrow(conn, KPI_ROAS)
+        return [{
+            "avg_roas": float(row["avg_roas"]) if row["avg_roas"] else 0,
+            "total_sales": float(row["sales"]) if row["sales"] else 0,
+            "total_ad_spend": float(row["spend"]) if row["spend"] else 0
+        }]
+
+    async def _compute_highest_cpc(self, conn):
+        rows = await statements.fetch(conn, KPI_HIGHEST_CPC, 5)
+        return [{"product_name": r["item_id"], "highest_cpc": float(r["max_cpc"]),
+                 "avg_cpc": float(r["avg_cpc"]), "campaign_count": r["campaigns"]}
+                for r in rows]
+
+    async def _run_scheduler(self):
+        """Periodic refresh; also (re)attaches the ingest NOTIFY listener"""
+        while True:
+            try:
+                await self._ensure_listener()
+                await self.schedule_refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ KPI cache refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def _ensure_listener(self):
+        if self._listener_conn is not None and not self._listener_conn.is_closed():
+            return
+        self._listener_conn = await self.connect()
+        if self._listener_conn is not None:
+            await self._listener_conn.add_listener(DATA_CHANGED_CHANNEL, self._on_data_changed)
+
+    def _on_data_changed(self, connection, pid, channel, payload):
+        source = payload or "ingest"
+        try:
+            message = json.loads(payload)  # {"source", "version"} from database.post_ingest
+            source, self.data_version = message["source"], message["version"]
+        except (TypeError, ValueError, KeyError):
+            pass  # plain-text payload from older ingest scripts
+        print(f"🔔 Data changed ({source}, data version {self.data_version}) - refreshing KPI cache")
+        for callback in self.data_changed_callbacks:
+            callback(payload)
+        self.schedule_refresh(follow_up=True)
@@ -1,37 +1,17 @@
-import aiohttp
 import asyncio
 import re
+from services.table_stats import TRACKED_TABLES, table_stats, describe_table
+from database.schema_registry import schema_registry
+from database.statements import (
+    statements, LLM_CPC_HIGHEST, LLM_CPC_LOWEST, LLM_CPC_ALL, LLM_ROI, LLM_ROAS,
+    LLM_TOTAL_REVENUE, LLM_TOTAL_AD_SPEND, LLM_DEFAULT
+)
 
 
 class LLMService:
     def __init__(self):
         self.url = "http://127.0.0.1:11434/api/generate"
         self.model = "llama3.1:8b"
-        self.schema = """
-### POSTGRESQL DATABASE SCHEMA
-You must generate a SQL query that strictly uses ONLY the following 3 tables.
-
-**TABLE 1: ad_sales (3,696 records)**
-- `item_id`: TEXT (Primary key for joins)
-- `date`: DATE
-- `ad_sales`: DECIMAL(15,2) (Revenue from ads)
-- `impressions`: INTEGER
-- `ad_spend`: DECIMAL(12,2) (Cost of ads)
-- `clicks`: INTEGER
-- `units_sold`: INTEGER (Units sold via ads)
-
-**TABLE 2: total_sales (702 records)**
-- `item_id`: TEXT (Foreign key for joins)
-- `date`: DATE
-- `total_sales`: DECIMAL(15,2) (Total product revenue)
-- `total_units_ordered`: INTEGER (Total units sold)
-
-**TABLE 3: eligibility (4,381 records)**
-- `item_id`: TEXT (Foreign key for joins)
-- `eligibility_datetime_utc`: TIMESTAMP
-- `eligibility`: TEXT (Status: 'eligible' or 'ineligible')
-- `message`: TEXT (Reason for eligibility status)
-"""
         # Prompt to guide the LLM in generating SQL
         self.prompt_template = """system
 You are an expert PostgreSQL analyst. Your ONLY task is to generate an accurate SQL query that directly answers the user's specific question. You MUST NOT generate any other query except the one that answers the exact question asked.
@@ -88,6 +68,7 @@ You are an expert PostgreSQL analyst. Your ONLY task is to generate an accurate
 7. **"Lowest" or "Minimum"** → Use MIN() or ORDER BY ASC LIMIT 1
 8. **"Compare" or "Between"** → Show multiple items for comparison
 9. **"All products"** → Return all relevant records, NO LIMIT
+10. **Time periods ("in June", "last week")** → Filter with plain date ranges, e.g. date >= '2025-06-01' AND date < '2025-07-01' (never wrap `date` in a function - ad_sales and total_sales are partitioned by month on `date`)
 
 **EXACT QUERY MATCHING EXAMPLES:**
 
@@ -101,7 +82,7 @@ Example 3 - Calculate/Show Questions (No Limit):
 SELECT item_id, ad_sales, ad_spend, ROUND((ad_sales / NULLIF(ad_spend, 0))::numeric, 2) as roas FROM ad_sales WHERE ad_spend > 0 ORDER BY item_id
 
 Example 4 - ROI Questions:
-SELECT a.item_id, t.total_sales, a.ad_spend, ROUND(((t.total_sales - a.ad_spend) / NULLIF(a.ad_spend, 0))::numeric * 100, 2) as roi_percentage FROM ad_sales a LEFT JOIN total_sales t ON a.item_id = t.item_id WHERE a.ad_spend > 0 AND t.total_sales IS NOT NULL ORDER BY roi_percentage DESC
+SELECT a.item_id, t.total_sales, a.ad_spend, ROUND(((t.total_sales - a.ad_spend) / NULLIF(a.ad_spend, 0))::numeric * 100, 2) as roi_percentage FROM ad_sales a LEFT JOIN total_sales t ON a.item_key = t.item_key WHERE a.ad_spend > 0 AND t.total_sales IS NOT NULL ORDER BY roi_percentage DESC
 
 Example 5 - Total/Sum Questions:
 SELECT SUM(total_sales) as total_revenue FROM total_sales
@@ -112,7 +93,7 @@ Before generating ANY query, check:
 2. Am I using the correct metric formula for what they asked?
 3. If they said "top X", do I have LIMIT X?
 4. If they said "calculate" or "show", do I have NO LIMIT?
-5. Am I using only the 3 allowed tables?
+5. Am I using only the allowed tables?
 6. Do I have NULLIF protection for divisions?
 
 **DATABASE SCHEMA:**
@@ -123,11 +104,18 @@ Before generating ANY query, check:
 User Question: "{question}"
 """
 
+    def build_schema(self, stats=None) -> str:
+        """Schema text from the schema registry with live row counts, item counts and date ranges"""
+        return schema_registry.render_prompt_schema(
+            {table: describe_table(stats, table) for table in schema_registry.table_names() if table in TRACKED_TABLES}
+        )
+
     async def convert_to_sql(self, question: str) -> str:
         print(f"🔍 GENERATING EXACT SQL FOR: {question}")
-        prompt = self.prompt_template.format(schema=self.schema, question=question)
+        prompt = self.prompt_template.format(schema=self.build_schema(await table_stats.get()), question=question)
 
         try:
+            import aiohttp  # deferred - only needed once a question reaches Ollama
             async with aiohttp.ClientSession() as session:
                 payload = {
                     "model": self.model,
@@ -237,7 +225,7 @@ User Question: "{question}"
             return False
 
         sql_upper = sql.upper()
-        required_tables = ['AD_SALES', 'TOTAL_SALES', 'ELIGIBILITY']
+        required_tables = [name.upper() for name in schema_registry.relation_names()]
         forbidden_tables = [
             'SALES_DATA', 'PRODUCT', 'CAMPAIGN', 'USER', 'CUSTOMER', 'CLIENT',
             'ORDER', 'TRANSACTION', 'INVENTORY', 'CATEGORY', 'BRAND', 'ITEM',
@@ -246,6 +234,8 @@ User Question: "{question}"
         ]
 
         for forbidden in forbidden_tables:
+            if forbidden in required_tables:
+                continue
             if f' {forbidden} ' in f' {sql_upper} ' or f'{forbidden}.' in sql_upper:
                 print(f"❌ Forbidden table: {forbidden}")
                 return False
@@ -253,57 +243,31 @@ User Question: "{question}"
         return any(t in sql_upper for t in required_tables)
 
     def _get_question_specific_fallback(self, question: str) -> str:
+        """Registered fallback SQL (database/statements.py) - executed as a prepared statement"""
         q = question.lower()
 
         if 'cpc' in q or 'cost per click' in q:
             if 'highest' in q:
-                return (
-                    "SELECT item_id, ad_spend, clicks, "
-                    "ROUND((ad_spend / NULLIF(clicks, 0))::numeric, 2) as cpc "
-                    "FROM ad_sales WHERE clicks > 0 ORDER BY cpc DESC LIMIT 1"
-                )
+                return statements.sql(LLM_CPC_HIGHEST)
             elif 'lowest' in q:
-                return (
-                    "SELECT item_id, ad_spend, clicks, "
-                    "ROUND((ad_spend / NULLIF(clicks, 0))::numeric, 2) as cpc "
-                    "FROM ad_sales WHERE clicks > 0 ORDER BY cpc ASC LIMIT 1"
-                )
+                return statements.sql(LLM_CPC_LOWEST)
             else:
-                return (
-                    "SELECT item_id, ad_spend, clicks, "
-                    "ROUND((ad_spend / NULLIF(clicks, 0))::numeric, 2) as cpc "
-                    "FROM ad_sales WHERE clicks > 0 ORDER BY item_id"
-                )
+                return statements.sql(LLM_CPC_ALL)
 
         elif 'roi' in q:
-            return (
-                "SELECT a.item_id, t.total_sales, a.ad_spend, "
-                "ROUND(((t.total_sales - a.ad_spend) / NULLIF(a.ad_spend, 0))::numeric * 100, 2) as roi_percentage "
-                "FROM ad_sales a LEFT JOIN total_sales t ON a.item_id = t.item_id "
-                "WHERE a.ad_spend > 0 AND t.total_sales IS NOT NULL ORDER BY roi_percentage DESC"
-            )
+            return statements.sql(LLM_ROI)
 
         elif 'roas' in q:
-            return (
-                "SELECT item_id, ad_sales, ad_spend, "
-                "ROUND((ad_sales / NULLIF(ad_spend, 0))::numeric, 2) as roas "
-                "FROM ad_sales WHERE ad_spend > 0 ORDER BY roas DESC"
-            )
+            return statements.sql(LLM_ROAS)
 
         elif 'total revenue' in q or 'total sales' in q:
-            return "SELECT SUM(total_sales) as total_revenue FROM total_sales"
+            return statements.sql(LLM_TOTAL_REVENUE)
 
         elif 'ad spend' in q:
-            return "SELECT SUM(ad_spend) as total_ad_spend FROM ad_sales"
+            return statements.sql(LLM_TOTAL_AD_SPEND)
 
         # Default fallback: Return ROAS top 20 products
-        return (
-            "SELECT a.item_id, a.ad_sales, a.ad_spend, t.total_sales, "
-            "ROUND((a.ad_sales / NULLIF(a.ad_spend, 0))::numeric, 2) as roas "
-            "FROM ad_sales a LEFT JOIN total_sales t ON a.item_id = t.item_id "
-            "WHERE a.ad_spend > 0 ORDER BY roas DESC LIMIT 20"
-        )
-
+        return statements.sql(LLM_DEFAULT)
 
 async def main():
     llm_service = LLMService()
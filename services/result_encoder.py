@@ -0,0 +1,81 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Sequence
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # orjson is optional - fall back to the standard library encoder
+    orjson = None
+
+
+def _default(value):
+    """Fallback conversions for values the JSON encoder does not know"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def column_type(values: Sequence[Any]) -> str:
+    """Logical type of a result column, taken from its first non-null value"""
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            return "boolean"
+        if isinstance(value, int):
+            return "integer"
+        if isinstance(value, (Decimal, float)):
+            return "number"
+        if isinstance(value, datetime):
+            return "datetime"
+        if isinstance(value, date):
+            return "date"
+        return "string"
+    return "null"
+
+
+def to_columnar(records: Sequence[Any], columns: List[str] = None) -> Dict[str, Any]:
+    """
+    Convert asyncpg Records (or dicts) into a compact columnar payload:
+    {"columns": [...], "types": [...], "values": [[col 1 values], [col 2 values], ...], "row_count": n}
+    Column names are sent once instead of once per row, and Decimals become floats per column
+    """
+    if columns is None:
+        columns = list(records[0].keys()) if records else []
+
+    values = []
+    types = []
+    for index, name in enumerate(columns):
+        if records and isinstance(records[0], dict):
+            column = [record[name] for record in records]
+        else:
+            column = [record[index] for record in records]
+        kind = column_type(column)
+        if kind == "number":
+            column = [float(v) if v is not None else None for v in column]
+        values.append(column)
+        types.append(kind)
+
+    return {
+        "columns": columns,
+        "types": types,
+        "values": values,
+        "row_count": len(records),
+    }
+
+
+def dumps(payload: Any) -> bytes:
+    """Serialize with orjson when available (native date/datetime, numpy support)"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def json_response(payload: Any) -> Response:
+    """Pre-serialized JSON response that bypasses FastAPI's generic jsonable_encoder"""
+    return Response(content=dumps(payload), media_type="application/json")
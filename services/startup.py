@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from fastapi import HTTPException
+
+
+logger = logging.getLogger(__name__)
+
+STARTUP_BUDGET_SECONDS = float(os.getenv("ANARIX_STARTUP_BUDGET_SECONDS", "1.0"))
+READY_WAIT_SECONDS = float(os.getenv("ANARIX_READY_WAIT_SECONDS", "10"))
+STARTUP_RETRY_SECONDS = float(os.getenv("ANARIX_STARTUP_RETRY_SECONDS", "30"))
+
+
+class StartupState:
+    """
+    Boot timing and readiness gate for an API worker
+    The worker starts accepting traffic immediately; slow setup (DDL, schema introspection,
+    cache warm-up) runs as background steps and requests needing the database wait on ready.
+    Failed steps leave the worker degraded (/ready answers 503) and are retried every
+    retry_seconds until they succeed
+    """
+
+    def __init__(self, started: float = None, budget_seconds: float = STARTUP_BUDGET_SECONDS,
+                 ready_wait_seconds: float = READY_WAIT_SECONDS, retry_seconds: float = STARTUP_RETRY_SECONDS):
+        self.budget_seconds = budget_seconds
+        self.ready_wait_seconds = ready_wait_seconds
+        self.retry_seconds = retry_seconds
+        self.started = started if started is not None else time.perf_counter()  # start of the app's import
+        self.serving_seconds = None
+        self.ready_seconds = None
+        self.steps: Dict[str, Dict[str, object]] = {}
+        self.ready = asyncio.Event()
+        self._task = None
+
+    def mark_serving(self):
+        """Called when the lifespan yields - uvicorn accepts connections from here on"""
+        self.serving_seconds = time.perf_counter() - self.started
+        status = "✅" if self.serving_seconds <= self.budget_seconds else "⚠️ over budget"
+        logger.info(f"🚀 Serving after {self.serving_seconds:.3f}s (budget {self.budget_seconds:.1f}s) {status}")
+
+    def start(self, steps: List[Tuple[str, Callable[[], Awaitable]]]):
+        """Run setup steps in order in the background; ready is set when they finish"""
+        self._task = asyncio.create_task(self._run(steps))
+        return self._task
+
+    async def _run_steps(self, steps):
+        """Run steps in order -> the ones that failed"""
+        failed = []
+        for name, step in steps:
+            step_start = time.perf_counter()
+            try:
+                await step()
+                self.steps[name] = {"ok": True, "seconds": round(time.perf_counter() - step_start, 3)}
+            except Exception as e:
+                self.steps[name] = {"ok": False, "seconds": round(time.perf_counter() - step_start, 3),
+                                    "error": str(e)}
+                logger.error(f"❌ Startup step {name} failed: {e}")
+                failed.append((name, step))
+        return failed
+
+    async def _run(self, steps):
+        failed = await self._run_steps(steps)
+        # A failed step does not keep gated requests waiting forever - they run (and report
+        # their own errors) while /ready shows the worker as degraded
+        self.ready_seconds = time.perf_counter() - self.started
+        self.ready.set()
+        if failed:
+            logger.warning(f"⚠️ Degraded after {self.ready_seconds:.3f}s - retrying "
+                           f"{', '.join(name for name, _ in failed)} every {self.retry_seconds:.0f}s")
+        else:
+            logger.info(f"✅ Ready after {self.ready_seconds:.3f}s")
+        while failed:
+            await asyncio.sleep(self.retry_seconds)
+            failed = await self._run_steps(failed)
+            if not failed:
+                logger.info("✅ Startup steps recovered - worker ready")
+
+    @property
+    def degraded(self) -> bool:
+        return any(not step["ok"] for step in self.steps.values())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+    async def wait_ready(self):
+        """
+        FastAPI dependency: wait up to ready_wait_seconds for setup, then fail fast with 503
+        (no parameters - FastAPI would expose them as query parameters of every gated route)
+        """
+        if self.ready.is_set():
+            return
+        try:
+            await asyncio.wait_for(self.ready.wait(), self.ready_wait_seconds)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail="Service is starting up")
+
+    def report(self) -> Dict[str, object]:
+        if not self.ready.is_set():
+            status = "starting"
+        else:
+            status = "degraded" if self.degraded else "ready"
+        return {
+            "ready": status == "ready",
+            "status": status,
+            "serving_seconds": round(self.serving_seconds, 3) if self.serving_seconds is not None else None,
+            "ready_seconds": round(self.ready_seconds, 3) if self.ready_seconds is not None else None,
+            "budget_seconds": self.budget_seconds,
+            "steps": self.steps,
+        }
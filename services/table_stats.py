@@ -0,0 +1,123 @@
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+TABLE_STATS_TTL_SECONDS = int(os.getenv("ANARIX_TABLE_STATS_TTL_SECONDS", "600"))
+
+# Table -> the column describing its time range
+TRACKED_TABLES = {
+    "ad_sales": "date",
+    "total_sales": "date",
+    "eligibility": "eligibility_datetime_utc",
+}
+
+
+class TableStatsService:
+    """
+    Live row counts, distinct items and date ranges of the three business tables
+    Read from planner statistics (pg_class.reltuples, pg_stats.n_distinct) plus index-backed
+    MIN/MAX, cached for TABLE_STATS_TTL_SECONDS and invalidated when an ingest reports new data
+    """
+
+    def __init__(self, get_pool: Callable = None, ttl: int = TABLE_STATS_TTL_SECONDS):
+        if get_pool is None:
+            from database.connection import get_async_pool
+            get_pool = get_async_pool
+        self.get_pool = get_pool
+        self.ttl = ttl
+        self._stats: Optional[Dict[str, Any]] = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self, *args):
+        """Drop the cached stats (signature fits asyncpg/KPICache data-changed callbacks)"""
+        self._stats = None
+
+    async def get(self) -> Optional[Dict[str, Any]]:
+        """Cached stats, or None when the database is unreachable"""
+        if self._stats is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return self._stats
+        async with self._lock:
+            if self._stats is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return self._stats
+            pool = await self.get_pool()
+            if pool is None:
+                return self._stats
+            try:
+                async with pool.acquire() as conn:
+                    self._stats = await self.collect(conn)
+                    self._loaded_at = time.monotonic()
+            except Exception as e:
+                print(f"⚠️ Table statistics unavailable: {e}")
+        return self._stats
+
+    async def collect(self, conn) -> Dict[str, Any]:
+        stats = {}
+        for table, time_column in TRACKED_TABLES.items():
+            if not await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", table):
+                continue
+            rows, analyzed = await self._estimated_rows(conn, table)
+            bounds = await conn.fetchrow(
+                f"SELECT MIN({time_column}) AS first, MAX({time_column}) AS last FROM {table}"
+            )
+            stats[table] = {
+                "estimated_rows": rows,
+                "distinct_items": await self._distinct_items(conn, table, rows),
+                "date_from": bounds["first"].isoformat() if bounds["first"] else None,
+                "date_to": bounds["last"].isoformat() if bounds["last"] else None,
+                "analyzed": analyzed,
+            }
+        return stats
+
+    async def _estimated_rows(self, conn, table):
+        """reltuples of the table (summed over its partitions); never-analyzed relations are counted exactly"""
+        relations = await conn.fetch("""
+            SELECT c.relname, c.reltuples
+            FROM pg_class c
+            WHERE c.relkind <> 'p'
+              AND (c.oid = $1::regclass
+                   OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = $1::regclass))
+        """, table)
+        rows, analyzed = 0, True
+        for relation in relations:
+            if relation["reltuples"] >= 0:
+                rows += int(relation["reltuples"])
+            else:
+                # reltuples is -1 until the first VACUUM/ANALYZE (e.g. new, usually empty partitions)
+                rows += await conn.fetchval(f"SELECT COUNT(*) FROM {relation['relname']}")
+                analyzed = False
+        return rows, analyzed
+
+    async def _distinct_items(self, conn, table, rows):
+        """n_distinct of item_id from pg_stats (negative = fraction of rows), else COUNT(DISTINCT)"""
+        n_distinct = await conn.fetchval("""
+            SELECT n_distinct FROM pg_stats
+            WHERE schemaname = 'public' AND tablename = $1 AND attname = 'item_id'
+            ORDER BY inherited DESC
+            LIMIT 1
+        """, table)
+        if n_distinct is None:
+            return await conn.fetchval(f"SELECT COUNT(DISTINCT item_id) FROM {table}")
+        return int(round(-n_distinct * rows)) if n_distinct < 0 else int(n_distinct)
+
+    def estimated_rows(self, table: str) -> Optional[int]:
+        """Last known row estimate for a table (no I/O)"""
+        if not self._stats or table not in self._stats:
+            return None
+        return self._stats[table]["estimated_rows"]
+
+
+def describe_table(stats: Optional[Dict[str, Any]], table: str) -> str:
+    """Short prompt-friendly summary, e.g. '~3,696 rows, 248 items, 2025-06-01 to 2025-06-14'"""
+    if not stats or table not in stats:
+        return "row count unknown"
+    s = stats[table]
+    text = f"~{s['estimated_rows']:,} rows, {s['distinct_items']:,} items"
+    if s["date_from"]:
+        text += f", {s['date_from'][:10]} to {s['date_to'][:10]}"
+    return text
+
+
+table_stats = TableStatsService()
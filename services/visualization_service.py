@@ -1,12 +1,12 @@
-import plotly.graph_objects as go
-import plotly.express as px
-import pandas as pd
 import json
-from typing import Dict, List, Any
-import numpy as np
+from typing import Dict, List, Any, TYPE_CHECKING
+
+# pandas/plotly/numpy are imported on first chart, not at worker start
+if TYPE_CHECKING:
+    import pandas as pd
 
 class VisualizationService:
-    def _init_(self):
+    def __init__(self):
         self.business_colors = {
             'primary': '#1f77b4',
             'success': '#2ca02c',
@@ -24,6 +24,10 @@ class VisualizationService:
             if not results:
                 return {'success': False, 'reason': 'No data to visualize'}
             
+            import numpy as np
+            import pandas as pd
+            import plotly.graph_objects as go
+            
             print(f"🎨 Starting visualization creation for {len(results)} records")
             
             # Convert to DataFrame
@@ -66,8 +70,9 @@ class VisualizationService:
             traceback.print_exc()
             return {'success': False, 'reason': f'Chart creation failed: {str(e)}'}
     
-    def _create_simple_bar_chart(self, df: pd.DataFrame, numeric_cols: List[str], question: str):
+    def _create_simple_bar_chart(self, df: 'pd.DataFrame', numeric_cols: List[str], question: str):
         """Create a simple bar chart that WILL work"""
+        import plotly.graph_objects as go
         
         # Determine x and y columns
         x_col = 'item_id' if 'item_id' in df.columns else df.columns[0]
@@ -122,7 +127,7 @@ class VisualizationService:
         else:
             return "Business Intelligence Analysis"
     
-    def _generate_recommendations(self, df: pd.DataFrame, question: str) -> List[str]:
+    def _generate_recommendations(self, df: 'pd.DataFrame', question: str) -> List[str]:
         """Generate simple recommendations"""
         recommendations = [
             f"Analyzed {len(df)} products for business insights",